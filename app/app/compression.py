@@ -0,0 +1,119 @@
+"""
+Negotiated gzip and brotli compression of responses.
+
+CompressionMiddleware compresses responses of at least
+COMPRESSION_MIN_BYTES in the best encoding the client accepts. Views
+that cache their responses can keep the compressed bytes too: a
+response with a ``compressed_cache`` attribute is handed to that
+callable as (encoding, compressed bytes) once it has been compressed.
+"""
+import gzip
+import re
+
+import brotli
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+
+# Supported encodings, preferred first when the client rates them equally
+ENCODINGS = ('br', 'gzip')
+
+COMPRESSIBLE_TYPES = (
+    'application/json',
+    'application/msgpack',
+    'application/javascript',
+    'text/',
+)
+
+_CODING = re.compile(r'^\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*$')
+
+
+def negotiate(request):
+    """Return the best encoding in the request's Accept-Encoding, or None."""
+
+    qualities = {}
+    for coding in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        match = _CODING.match(coding)
+        if match is None:
+            continue
+        try:
+            quality = float(match.group(2) or 1)
+        except ValueError:
+            continue
+        qualities[match.group(1).lower()] = quality
+
+    best, best_quality = None, 0
+    for encoding in ENCODINGS:
+        quality = qualities.get(encoding, qualities.get('*', 0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+
+    return best
+
+
+def compress(content, encoding):
+    """Return content compressed with an encoding from ENCODINGS."""
+
+    if encoding == 'br':
+        return brotli.compress(
+            content, quality=settings.COMPRESSION_BROTLI_QUALITY
+        )
+    return gzip.compress(
+        content, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0
+    )
+
+
+def compressible(response):
+    """Return True if a response is worth compressing."""
+
+    if response.streaming or response.has_header('Content-Encoding'):
+        return False
+
+    content_type = response.get('Content-Type', '')
+    return content_type.startswith(COMPRESSIBLE_TYPES) and \
+        len(response.content) >= settings.COMPRESSION_MIN_BYTES
+
+
+def set_encoded(response, content, encoding):
+    """Replace a response's content with its compressed form."""
+
+    response.content = content
+    response['Content-Length'] = str(len(content))
+    response['Content-Encoding'] = encoding
+
+    # The compressed bytes are a different representation of the same
+    # resource, so a strong ETag no longer applies
+    etag = response.get('ETag')
+    if etag and etag.startswith('"'):
+        response['ETag'] = f'W/{etag}'
+
+
+class CompressionMiddleware:
+    """Compress responses in the encoding the client prefers."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        if response.streaming:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        encoding = negotiate(request)
+        if encoding is None or not compressible(response):
+            return response
+
+        compressed = compress(response.content, encoding)
+        if len(compressed) >= len(response.content):
+            return response
+
+        store = getattr(response, 'compressed_cache', None)
+        if store is not None:
+            store(encoding, compressed)
+
+        set_encoded(response, compressed, encoding)
+        return response
@@ -0,0 +1,46 @@
+"""
+Faster parsers for the REST API, matching the renderers in
+app.renderers.
+"""
+import codecs
+
+import msgpack
+import orjson
+
+from django.conf import settings
+from rest_framework import parsers
+from rest_framework.exceptions import ParseError
+
+from app.renderers import ORJSONRenderer, MessagePackRenderer
+
+
+class ORJSONParser(parsers.JSONParser):
+    """Parse UTF-8 JSON with orjson, falling back to DRF otherwise."""
+
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+
+        # orjson only reads UTF-8 and always rejects NaN and Infinity
+        if codecs.lookup(encoding).name != 'utf-8' or not self.strict:
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except ValueError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
+
+
+class MessagePackParser(parsers.BaseParser):
+    """Parse MessagePack request bodies."""
+
+    media_type = 'application/msgpack'
+    renderer_class = MessagePackRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, msgpack.UnpackException) as exc:
+            raise ParseError(f'MessagePack parse error - {exc}')
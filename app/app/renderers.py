@@ -0,0 +1,70 @@
+"""
+Faster renderers for the REST API.
+
+ORJSONRenderer is a drop-in replacement for DRF's JSONRenderer that
+encodes with orjson and produces the same bytes for the data our
+serializers return. MessagePackRenderer renders the same data as
+MessagePack for clients that ask for it with
+``Accept: application/msgpack``.
+"""
+import msgpack
+import orjson
+
+from rest_framework import renderers
+from rest_framework.settings import api_settings
+from rest_framework.utils import encoders
+
+
+ORJSON_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS |
+    # Leave these to DRF's encoder, which formats them differently
+    orjson.OPT_PASSTHROUGH_DATETIME |
+    orjson.OPT_PASSTHROUGH_DATACLASS
+)
+
+
+def encode_default(obj):
+    """Encode the types orjson leaves to us the way DRF does."""
+
+    return encoders.JSONEncoder().default(obj)
+
+
+class ORJSONRenderer(renderers.JSONRenderer):
+    """Render JSON with orjson, falling back to DRF for indented output."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context) or \
+                not api_settings.COMPACT_JSON or \
+                not api_settings.UNICODE_JSON or \
+                not api_settings.STRICT_JSON:
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+
+        ret = orjson.dumps(
+            data, default=encode_default, option=ORJSON_OPTIONS
+        )
+
+        # Escape the separators DRF escapes, which are valid JSON but
+        # not valid JavaScript
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028') \
+            .replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class MessagePackRenderer(renderers.BaseRenderer):
+    """Render the same data as the JSON renderer, as MessagePack."""
+
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        return msgpack.packb(data, default=encode_default, use_bin_type=True)
@@ -51,6 +51,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     # Custom Apps
     'core',
@@ -71,6 +72,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'app.compression.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -118,6 +120,22 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# Local memory by default; point CACHE_BACKEND and CACHE_LOCATION at a
+# shared backend such as memcached to share entries between workers.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -173,6 +191,117 @@ DEFAULT_FILE_STORAGE = 'storages.backends.s3boto3.S3Boto3Storage'
 AWS_ACCESS_KEY_ID = os.environ.get('AWS_ACCESS_KEY_ID')
 AWS_SECRET_ACCESS_KEY = os.environ.get('AWS_SECRET_ACCESS_KEY')
 
+# Size of the connection pool shared by every thread of a worker process
+AWS_S3_MAX_POOL_CONNECTIONS = int(
+    os.environ.get('AWS_S3_MAX_POOL_CONNECTIONS', 32)
+)
+
+# Threads used to fetch exercise code concurrently within a worker.
+# Keep this at or below the connection pool size.
+AWS_S3_MAX_CONCURRENT_REQUESTS = int(
+    os.environ.get('AWS_S3_MAX_CONCURRENT_REQUESTS', 16)
+)
+
+# Timeouts (seconds) and attempts per S3 call. Retries use botocore's
+# standard mode, which also enforces a client-wide retry quota.
+AWS_S3_CONNECT_TIMEOUT = float(os.environ.get('AWS_S3_CONNECT_TIMEOUT', 2))
+AWS_S3_READ_TIMEOUT = float(os.environ.get('AWS_S3_READ_TIMEOUT', 5))
+AWS_S3_MAX_ATTEMPTS = int(os.environ.get('AWS_S3_MAX_ATTEMPTS', 3))
+
+# Circuit breaker for S3 reads: opens when at least MIN_CALLS of the last
+# WINDOW reads were made and FAILURE_RATE of them failed, then retries
+# after RESET_TIMEOUT seconds
+AWS_S3_BREAKER_FAILURE_RATE = float(
+    os.environ.get('AWS_S3_BREAKER_FAILURE_RATE', 0.5)
+)
+AWS_S3_BREAKER_WINDOW = int(os.environ.get('AWS_S3_BREAKER_WINDOW', 20))
+AWS_S3_BREAKER_MIN_CALLS = int(
+    os.environ.get('AWS_S3_BREAKER_MIN_CALLS', 10)
+)
+AWS_S3_BREAKER_RESET_TIMEOUT = float(
+    os.environ.get('AWS_S3_BREAKER_RESET_TIMEOUT', 30)
+)
+
+# Per-worker in-memory cache for exercise code objects, in bytes
+AWS_S3_CODE_CACHE_MAX_BYTES = int(
+    os.environ.get('AWS_S3_CODE_CACHE_MAX_BYTES', 32 * 1024 * 1024)
+)
+
+# Shared on-disk cache for exercise code, used by every worker on the
+# host. Disabled unless a directory is configured.
+AWS_S3_CODE_DISK_CACHE_DIR = os.environ.get('AWS_S3_CODE_DISK_CACHE_DIR')
+AWS_S3_CODE_DISK_CACHE_MAX_BYTES = int(
+    os.environ.get('AWS_S3_CODE_DISK_CACHE_MAX_BYTES', 512 * 1024 * 1024)
+)
+
+# Code objects of at least this many bytes are stored gzip compressed
+AWS_S3_CODE_COMPRESSION_MIN_BYTES = int(
+    os.environ.get('AWS_S3_CODE_COMPRESSION_MIN_BYTES', 1024)
+)
+
+# Exercise code up to this size (UTF-8 bytes) is stored in the database
+# row instead of S3
+EXERCISE_INLINE_CODE_MAX_BYTES = int(
+    os.environ.get('EXERCISE_INLINE_CODE_MAX_BYTES', 4096)
+)
+
+# How exercise code is delivered by default: 'inline', 'presigned' or
+# 'public'. Clients can override this with ?code_delivery=
+EXERCISE_CODE_DELIVERY = os.environ.get('EXERCISE_CODE_DELIVERY', 'inline')
+
+# Lifetime of presigned code URLs, in seconds
+AWS_S3_PRESIGNED_URL_EXPIRY = int(
+    os.environ.get('AWS_S3_PRESIGNED_URL_EXPIRY', 300)
+)
+
+# Largest page a client can ask for with ?page_size=
+LESSON_MAX_PAGE_SIZE = int(os.environ.get('LESSON_MAX_PAGE_SIZE', 200))
+
+# Most textblocks accepted by one bulk textblock request
+LESSON_BULK_MAX_TEXTBLOCKS = int(
+    os.environ.get('LESSON_BULK_MAX_TEXTBLOCKS', 500)
+)
+
+# Text search configuration used to build and query search vectors;
+# changing it needs the vectors rebuilt
+LESSON_SEARCH_CONFIG = os.environ.get('LESSON_SEARCH_CONFIG', 'english')
+
+# Longest snippet returned with a search hit, in words
+LESSON_SEARCH_SNIPPET_WORDS = int(
+    os.environ.get('LESSON_SEARCH_SNIPPET_WORDS', 35)
+)
+
+# Serve module and topic reads from precomputed curriculum documents,
+# rebuilt whenever the curriculum changes
+CURRICULUM_DOCUMENTS_ENABLED = os.environ.get(
+    'CURRICULUM_DOCUMENTS_ENABLED', 'true'
+).lower() == 'true'
+
+# Render read endpoints from .values() rows instead of the serializers
+CURRICULUM_FAST_READS_ENABLED = os.environ.get(
+    'CURRICULUM_FAST_READS_ENABLED', 'true'
+).lower() == 'true'
+
+# Cache curriculum read responses by their ETag in the named cache,
+# for at most TIMEOUT seconds
+LESSON_RESPONSE_CACHE_ENABLED = os.environ.get(
+    'LESSON_RESPONSE_CACHE_ENABLED', 'true'
+).lower() == 'true'
+LESSON_RESPONSE_CACHE_ALIAS = os.environ.get(
+    'LESSON_RESPONSE_CACHE_ALIAS', 'default'
+)
+LESSON_RESPONSE_CACHE_TIMEOUT = int(
+    os.environ.get('LESSON_RESPONSE_CACHE_TIMEOUT', 3600)
+)
+
+# Responses of at least MIN_BYTES are compressed with gzip or brotli,
+# whichever the client prefers
+COMPRESSION_MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', 1024))
+COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', 6))
+COMPRESSION_BROTLI_QUALITY = int(
+    os.environ.get('COMPRESSION_BROTLI_QUALITY', 5)
+)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -187,6 +316,21 @@ REST_FRAMEWORK = {
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.TokenAuthentication',
     ),
+    'DEFAULT_PAGINATION_CLASS':
+        'lesson.pagination.CurriculumCursorPagination',
+    'PAGE_SIZE': int(os.environ.get('LESSON_PAGE_SIZE', 50)),
+    # orjson for JSON, and MessagePack for clients that ask for it
+    'DEFAULT_RENDERER_CLASSES': (
+        'app.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+        'app.renderers.MessagePackRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'app.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+        'app.parsers.MessagePackParser',
+    ),
 
 }
 
@@ -0,0 +1,192 @@
+"""
+Compare the uwsgi (sync) and ASGI (async) curriculum read paths.
+
+Seeds a topic of exercises, serves code from a moto S3 stand-in with
+simulated latency, and times the same burst of concurrent topic list
+requests against each path: the sync views on a pool of worker threads
+standing in for the uwsgi workers, each handling one request at a time,
+and the async views on a single event loop. The data is seeded into a
+throwaway test database, created and destroyed like the test runner's,
+so the real database is never touched.
+"""
+import asyncio
+import queue
+import threading
+import time
+
+import boto3
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.db import connections
+from django.test import AsyncClient, Client, override_settings
+from django.test.utils import setup_databases, teardown_databases
+from django.urls import reverse
+from moto import mock_s3
+from rest_framework.authtoken.models import Token
+
+from core import models
+from lesson.client import S3Client as s3_client
+
+
+class Command(BaseCommand):
+    """Benchmark sync views under uwsgi against the async views."""
+
+    help = 'Compare sync (uwsgi) and async (ASGI) lesson read endpoints.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--exercises', type=int, default=20)
+        parser.add_argument('--requests', type=int, default=40)
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Number of uwsgi workers, as in scripts/run.sh.'
+        )
+        parser.add_argument(
+            '--latency',
+            type=float,
+            default=50,
+            help='Simulated S3 latency per call, in milliseconds.'
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+
+        # Measure S3 access rather than the in-memory code cache
+        cache_max_bytes = s3_client.code_cache.max_bytes
+        s3_client.code_cache.max_bytes = 0
+
+        # Worker threads use their own database connections, so the
+        # data has to be committed; it goes to a test database instead
+        old_config = setup_databases(verbosity=0, interactive=False)
+
+        with mock_s3():
+            s3_client.reset_clients()
+            try:
+                user = self.seed()
+                # Compare the work each path does per request, not the
+                # caches in front of the sync views
+                with override_settings(
+                    CURRICULUM_DOCUMENTS_ENABLED=False,
+                    LESSON_RESPONSE_CACHE_ENABLED=False
+                ):
+                    self.run(user)
+            finally:
+                connections.close_all()
+                teardown_databases(old_config, verbosity=0)
+                s3_client.reset_clients()
+                s3_client.code_cache.clear()
+                s3_client.code_cache.max_bytes = cache_max_bytes
+
+    def run(self, user):
+        options = self.options
+        latency = options['latency'] / 1000
+
+        token = Token.objects.create(user=user)
+        headers = {
+            'HTTP_HOST': '127.0.0.1',
+            'HTTP_AUTHORIZATION': f'Token {token.key}',
+        }
+        # Django 3.2's AsyncClient takes raw ASGI headers
+        asgi_headers = [
+            (b'host', b'127.0.0.1'),
+            (b'authorization', f'Token {token.key}'.encode()),
+        ]
+
+        client = s3_client.get_default_client()
+        client.client.meta.events.register(
+            'before-call.s3', lambda **kwargs: time.sleep(latency)
+        )
+
+        sync_url = reverse('lesson:topic-list')
+        async_url = reverse('lesson:async-topic-list')
+
+        # Warm both paths up so neither is timed with cold imports
+        Client().get(sync_url, **headers)
+        async_to_sync(AsyncClient().get)(async_url, headers=asgi_headers)
+
+        pending = queue.Queue()
+        for _ in range(options['requests']):
+            pending.put(None)
+
+        def worker():
+            sync_client = Client()
+            try:
+                while True:
+                    try:
+                        pending.get_nowait()
+                    except queue.Empty:
+                        return
+                    sync_client.get(sync_url, **headers)
+            finally:
+                connections.close_all()
+
+        # Each uwsgi worker handles one request at a time
+        threads = [
+            threading.Thread(target=worker)
+            for _ in range(options['workers'])
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        sync_elapsed = time.perf_counter() - start
+
+        async def burst():
+            async_client = AsyncClient()
+            await asyncio.gather(*(
+                async_client.get(async_url, headers=asgi_headers)
+                for _ in range(options['requests'])
+            ))
+
+        start = time.perf_counter()
+        async_to_sync(burst)()
+        async_elapsed = time.perf_counter() - start
+
+        self.stdout.write(
+            f'{options["requests"]} concurrent topic list requests, '
+            f'{options["exercises"]} exercises, '
+            f'{options["latency"]:.0f} ms S3 latency'
+        )
+        self.stdout.write(
+            f'uwsgi, {options["workers"]} sync workers: '
+            f'{sync_elapsed * 1000:10.1f} ms'
+        )
+        self.stdout.write(
+            f'ASGI, 1 process:          '
+            f'{async_elapsed * 1000:10.1f} ms'
+        )
+
+    def seed(self):
+        bucket_name = settings.AWS_STORAGE_BUCKET_NAME
+        s3 = boto3.client('s3')
+        s3.create_bucket(Bucket=bucket_name)
+
+        language = models.Language.objects.create(language_name='Bench')
+        module = models.Module.objects.create(
+            language=language,
+            module_name='Bench Module'
+        )
+        topic = models.Topic.objects.create(
+            module=module,
+            topic_name='Bench Topic'
+        )
+
+        for i in range(self.options['exercises']):
+            for key in (f'bench-starter-{i}', f'bench-expected-{i}'):
+                s3.put_object(Bucket=bucket_name, Body=key, Key=f'{key}.txt')
+
+            models.Exercise.objects.create(
+                topic=topic,
+                exercise_name=f'Bench Exercise {i}',
+                starter_code=f'bench-starter-{i}',
+                expected_output=f'bench-expected-{i}'
+            )
+
+        user = models.User.objects.create_user(
+            email='benchmark@example.com',
+            password='benchmark'
+        )
+        return user
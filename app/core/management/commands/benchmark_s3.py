@@ -0,0 +1,93 @@
+"""
+Benchmark S3 client overhead against a moto S3 stand-in.
+"""
+import time
+
+import boto3
+from django.conf import settings
+from django.core.management import BaseCommand
+from moto import mock_s3
+
+from lesson.client import S3Client as s3_client
+
+
+class Command(BaseCommand):
+    """
+    Compare a boto3 Session per read with the pooled client, and
+    serial code uploads with the concurrent uploads used on POST.
+    """
+
+    help = 'Benchmark S3 client overhead using moto.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument(
+            '--latency',
+            type=float,
+            default=0,
+            help='Simulated network latency per S3 call, in milliseconds.'
+        )
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        latency = options['latency'] / 1000
+
+        with mock_s3():
+            s3_client.reset_clients()
+            s3_client.code_cache.clear()
+            bucket_name = settings.AWS_STORAGE_BUCKET_NAME
+            boto3.client('s3').create_bucket(Bucket=bucket_name)
+
+            client = s3_client.get_default_client()
+            if latency:
+                client.client.meta.events.register(
+                    'before-call.s3', lambda **kwargs: time.sleep(latency)
+                )
+
+            key = f'{client.write_object("print(1)")}.txt'
+            counter = iter(range(10 ** 9))
+
+            def session_per_call():
+                session = boto3.Session(
+                    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY
+                )
+                s3 = session.resource('s3')
+                if latency:
+                    time.sleep(latency)
+                obj = s3.meta.client.get_object(Bucket=bucket_name, Key=key)
+                return obj['Body'].read().decode('utf-8')
+
+            def pooled():
+                s3_client.code_cache.clear()
+                return client.read_object(key)
+
+            def serial_upload():
+                i = next(counter)
+                client.store_object(f'starter {i}')
+                client.store_object(f'expected {i}')
+
+            def concurrent_upload():
+                i = next(counter)
+                client.write_objects([f'starter {i}', f'expected {i}'])
+
+            for name, func in (
+                ('session per read', session_per_call),
+                ('pooled read', pooled),
+                ('serial upload', serial_upload),
+                ('concurrent upload', concurrent_upload),
+            ):
+                elapsed = self._time(func, iterations)
+                self.stdout.write(
+                    f'{name:<20} {elapsed / iterations * 1000:8.3f} ms/call'
+                )
+
+            s3_client.reset_clients()
+            s3_client.code_cache.clear()
+
+    def _time(self, func, iterations):
+        func()
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        return time.perf_counter() - start
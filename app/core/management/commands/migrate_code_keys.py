@@ -0,0 +1,65 @@
+"""
+Move exercise code stored under random UUID keys to content-hash keys.
+"""
+from django.core.management import BaseCommand
+
+from core.models import Exercise
+from lesson.client.S3Client import get_default_client, is_content_hash
+
+
+CODE_FIELDS = ['starter_code', 'expected_output']
+
+
+class Command(BaseCommand):
+    """Rewrite UUID-keyed exercise code under content-hash keys."""
+
+    help = 'Migrate exercise code objects to content-addressed keys.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would be migrated without writing anything.'
+        )
+        parser.add_argument(
+            '--delete-old',
+            action='store_true',
+            help='Delete the UUID-keyed objects once rows are updated.'
+        )
+
+    def handle(self, *args, **options):
+        client = get_default_client()
+        migrated = {}
+
+        for exercise in Exercise.objects.order_by('id').iterator():
+            updates = {}
+
+            for field in CODE_FIELDS:
+                file_id = getattr(exercise, field)
+                if not file_id or is_content_hash(file_id):
+                    continue
+
+                if file_id not in migrated:
+                    if options['dry_run']:
+                        migrated[file_id] = None
+                    else:
+                        code = client.read_object(f'{file_id}.txt')
+                        migrated[file_id] = client.write_object(code)
+
+                updates[field] = migrated[file_id]
+
+            if updates and not options['dry_run']:
+                Exercise.objects.filter(pk=exercise.pk).update(**updates)
+
+            if updates:
+                self.stdout.write(
+                    f'Exercise {exercise.pk}: {", ".join(updates)}'
+                )
+
+        if options['delete_old'] and not options['dry_run']:
+            for file_id in migrated:
+                client.delete_object(f'{file_id}.txt')
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Migrated {len(migrated)} code objects.')
+        )
@@ -0,0 +1,63 @@
+"""
+Move exercise code between inline database storage and S3 according
+to EXERCISE_INLINE_CODE_MAX_BYTES.
+"""
+from django.core.management import BaseCommand
+
+from core.models import Exercise
+from lesson.client.S3Client import get_default_client
+from lesson.serializers import (
+    INLINE_CODE_FIELDS,
+    code_object_key,
+    fits_inline
+)
+
+
+class Command(BaseCommand):
+    """Inline small S3 code and upload oversized inline code."""
+
+    help = 'Migrate exercise code between the database and S3 tiers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would be migrated without writing anything.'
+        )
+
+    def handle(self, *args, **options):
+        client = get_default_client()
+        inlined = uploaded = 0
+
+        for exercise in Exercise.objects.order_by('id').iterator():
+            updates = {}
+
+            for field, inline_field in INLINE_CODE_FIELDS.items():
+                code_id = getattr(exercise, field)
+                inline_code = getattr(exercise, inline_field)
+
+                if inline_code is not None and not fits_inline(inline_code):
+                    if not options['dry_run']:
+                        file_id, _ = client.store_object(inline_code)
+                        updates[field] = file_id
+                        updates[inline_field] = None
+                    uploaded += 1
+
+                elif inline_code is None and code_id:
+                    code = client.read_object(code_object_key(code_id))
+                    if fits_inline(code):
+                        # The S3 object is content addressed and may be
+                        # shared, so it is left in place.
+                        updates[field] = None
+                        updates[inline_field] = code
+                        inlined += 1
+
+            if updates and not options['dry_run']:
+                Exercise.objects.filter(pk=exercise.pk).update(**updates)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Moved {inlined} code fields inline and '
+                f'{uploaded} code fields to S3.'
+            )
+        )
@@ -0,0 +1,39 @@
+"""
+Recompute the denormalized module and topic counts from the rows they
+count, reporting every count that had drifted.
+"""
+from django.core.management import BaseCommand
+from django.db import transaction
+
+from lesson import counters
+
+
+class Command(BaseCommand):
+    """Check and repair the module and topic counts."""
+
+    help = 'Recount the rows under each module and topic.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report drifted counts without repairing them.'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            drifted = counters.drift()
+
+            for model, pk, field, stored, actual in drifted:
+                self.stdout.write(
+                    f'{model.__name__} {pk} {field}: '
+                    f'stored {stored}, actual {actual}'
+                )
+
+            if not options['dry_run']:
+                counters.recount(drifted)
+
+        verb = 'Found' if options['dry_run'] else 'Repaired'
+        self.stdout.write(
+            self.style.SUCCESS(f'{verb} {len(drifted)} drifted counts.')
+        )
@@ -0,0 +1,86 @@
+"""
+Delete content-addressed exercise code objects that no exercise
+references.
+
+Objects can be left behind when an exercise create fails after its
+code was uploaded, or when code is changed or deleted. They are never
+deleted at that point, because the same content address may already
+be in use by another request. Only objects older than --min-age-hours
+are swept, which leaves in-flight creates time to commit their rows,
+and references are checked again just before each delete. Writing code
+that is already stored renews its object, so code reused by a create
+counts as freshly written.
+
+The deploy stack runs this daily from scripts/sweep.sh.
+"""
+import datetime
+
+from django.core.management import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from core.models import Exercise
+from lesson.client.S3Client import get_default_client, is_content_hash
+
+
+class Command(BaseCommand):
+    """Delete unreferenced exercise code objects."""
+
+    help = 'Delete exercise code objects that no exercise references.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age-hours',
+            type=float,
+            default=24,
+            help='Only sweep objects last written at least this long ago.'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would be deleted without deleting anything.'
+        )
+
+    def referenced(self, file_ids):
+        """Return the file ids in file_ids that an exercise uses."""
+
+        rows = Exercise.objects.filter(
+            Q(starter_code__in=file_ids) | Q(expected_output__in=file_ids)
+        ).values_list('starter_code', 'expected_output')
+
+        return {file_id for row in rows for file_id in row} & set(file_ids)
+
+    def handle(self, *args, **options):
+        client = get_default_client()
+        cutoff = timezone.now() - datetime.timedelta(
+            hours=options['min_age_hours']
+        )
+        swept = 0
+
+        pages = client.client.get_paginator('list_objects_v2').paginate(
+            Bucket=client.bucket_name
+        )
+        for page in pages:
+            candidates = [
+                obj['Key'][:-len('.txt')] for obj in page.get('Contents', [])
+                if obj['Key'].endswith('.txt')
+                and is_content_hash(obj['Key'][:-len('.txt')])
+                and obj['LastModified'] <= cutoff
+            ]
+            if not candidates:
+                continue
+
+            for file_id in set(candidates) - self.referenced(candidates):
+                if options['dry_run']:
+                    self.stdout.write(f'Would delete {file_id}.txt')
+                elif not self.referenced([file_id]):
+                    client.delete_object(f'{file_id}.txt')
+                    self.stdout.write(f'Deleted {file_id}.txt')
+                else:
+                    continue
+                swept += 1
+
+        verb = 'Found' if options['dry_run'] else 'Deleted'
+        self.stdout.write(
+            self.style.SUCCESS(f'{verb} {swept} unreferenced code objects.')
+        )
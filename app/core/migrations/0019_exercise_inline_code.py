@@ -0,0 +1,23 @@
+# Generated by Django 3.2.18 on 2026-10-18 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_alter_textblock_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exercise',
+            name='expected_output_inline',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='exercise',
+            name='starter_code_inline',
+            field=models.TextField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 3.2.18 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_exercise_inline_code'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CurriculumDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('module', 'Module')], max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('document', models.TextField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='curriculumdocument',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_curriculum_document'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 3.2.18 on 2026-10-18 14:00
+
+from django.db import migrations, models
+
+
+POSITION_STEP = 1 << 16
+BATCH_SIZE = 1000
+
+
+def number_textblocks(apps, schema_editor):
+    """
+    Give every textblock a position in the order it was served in
+    before: by paragraph number, then id, within its lesson or exercise.
+    """
+    TextBlock = apps.get_model('core', 'TextBlock')
+
+    textblocks = TextBlock.objects.order_by(
+        'lesson_id',
+        'exercise_id',
+        models.F('paragraph_number').asc(nulls_last=True),
+        'id'
+    ).only('id', 'lesson_id', 'exercise_id', 'position')
+
+    parent = None
+    position = 0
+    batch = []
+
+    for textblock in textblocks.iterator():
+        block_parent = (textblock.lesson_id,) if textblock.lesson_id \
+            else (None, textblock.exercise_id)
+        if block_parent != parent:
+            parent = block_parent
+            position = 0
+
+        position += POSITION_STEP
+        textblock.position = position
+        batch.append(textblock)
+
+        if len(batch) >= BATCH_SIZE:
+            TextBlock.objects.bulk_update(batch, ['position'])
+            batch = []
+
+    TextBlock.objects.bulk_update(batch, ['position'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_curriculum_revisions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='textblock',
+            name='position',
+            field=models.BigIntegerField(editable=False, null=True),
+        ),
+        migrations.RunPython(
+            number_textblocks,
+            migrations.RunPython.noop
+        ),
+    ]
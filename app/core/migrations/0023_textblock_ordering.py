@@ -0,0 +1,30 @@
+# Generated by Django 3.2.18 on 2026-10-18 14:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_textblock_position'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='textblock',
+            name='position',
+            field=models.BigIntegerField(editable=False),
+        ),
+        migrations.AlterModelOptions(
+            name='textblock',
+            options={'ordering': ['position', 'id']},
+        ),
+        migrations.AddIndex(
+            model_name='textblock',
+            index=models.Index(condition=models.Q(('lesson__isnull', False)), fields=['lesson', 'position'], name='textblock_lesson_position'),
+        ),
+        migrations.AddIndex(
+            model_name='textblock',
+            index=models.Index(condition=models.Q(('exercise__isnull', False)), fields=['exercise', 'position'], name='textblock_exercise_position'),
+        ),
+    ]
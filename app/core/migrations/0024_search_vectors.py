@@ -0,0 +1,78 @@
+# Generated by Django 3.2.18 on 2026-10-18 16:00
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery, TextField
+
+
+def build_vectors(apps, schema_editor):
+    """Build the search vector of every existing lesson and exercise."""
+
+    Topic = apps.get_model('core', 'Topic')
+    TextBlock = apps.get_model('core', 'TextBlock')
+    config = settings.LESSON_SEARCH_CONFIG
+
+    topic_name = Subquery(
+        Topic.objects.filter(pk=OuterRef('topic_id')).values('topic_name')
+    )
+
+    for model_name, name_field, parent_field in (
+        ('Lesson', 'lesson_name', 'lesson'),
+        ('Exercise', 'exercise_name', 'exercise'),
+    ):
+        text = Subquery(
+            TextBlock.objects.filter(**{parent_field: OuterRef('pk')})
+            .order_by()
+            .values(parent_field)
+            .annotate(text=StringAgg(
+                'text',
+                ' ',
+                ordering=['position', 'id'],
+                output_field=TextField()
+            ))
+            .values('text')
+        )
+
+        apps.get_model('core', model_name).objects.update(
+            search_vector=(
+                SearchVector(name_field, weight='A', config=config) +
+                SearchVector(topic_name, weight='B', config=config) +
+                SearchVector(text, weight='C', config=config)
+            )
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_textblock_ordering'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exercise',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='exercise',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='exercise_search_vector'),
+        ),
+        migrations.AddIndex(
+            model_name='lesson',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='lesson_search_vector'),
+        ),
+        migrations.RunPython(
+            build_vectors,
+            migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 3.2.18 on 2026-10-18 17:00
+
+from django.db import migrations, models
+from django.db.models import F, Func, OuterRef, Q, Subquery
+
+
+def count(queryset):
+    return Subquery(
+        queryset.order_by()
+        .annotate(count=Func(F('pk'), function='COUNT'))
+        .values('count')
+    )
+
+
+def count_rows(apps, schema_editor):
+    """Count the rows under every existing module and topic."""
+
+    Module = apps.get_model('core', 'Module')
+    Topic = apps.get_model('core', 'Topic')
+    Lesson = apps.get_model('core', 'Lesson')
+    Exercise = apps.get_model('core', 'Exercise')
+    TextBlock = apps.get_model('core', 'TextBlock')
+
+    parent = OuterRef('pk')
+
+    Module.objects.update(
+        topic_count=count(Topic.objects.filter(module=parent))
+    )
+    Topic.objects.update(
+        lesson_count=count(Lesson.objects.filter(topic=parent)),
+        exercise_count=count(Exercise.objects.filter(topic=parent)),
+        textblock_count=count(TextBlock.objects.filter(
+            Q(exercise__topic=parent) |
+            Q(exercise__isnull=True, lesson__topic=parent)
+        )),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_search_vectors'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='module',
+            name='topic_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='topic',
+            name='exercise_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='topic',
+            name='lesson_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='topic',
+            name='textblock_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(
+            count_rows,
+            migrations.RunPython.noop
+        ),
+    ]
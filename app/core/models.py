@@ -1,4 +1,6 @@
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth.models import (
     AbstractBaseUser, 
     PermissionsMixin,
@@ -107,6 +109,9 @@ class Language(models.Model):
     """Model to represent a single coding language."""
 
     language_name = models.CharField(max_length=100)
+    # Bumped whenever this row or any row below it in the curriculum
+    # changes, and used to build ETags
+    revision = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.language_name
@@ -120,6 +125,9 @@ class Module(models.Model):
 
     language = models.ForeignKey(Language, on_delete=models.CASCADE, related_name='modules')
     module_name = models.CharField(max_length=255)
+    revision = models.PositiveIntegerField(default=0, editable=False)
+    # Maintained by lesson.counters
+    topic_count = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.module_name
@@ -133,6 +141,11 @@ class Topic(models.Model):
 
     module = models.ForeignKey(Module, on_delete=models.CASCADE, related_name='topics')
     topic_name = models.CharField(max_length=255)
+    revision = models.PositiveIntegerField(default=0, editable=False)
+    # Maintained by lesson.counters
+    lesson_count = models.PositiveIntegerField(default=0, editable=False)
+    exercise_count = models.PositiveIntegerField(default=0, editable=False)
+    textblock_count = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.topic_name
@@ -146,6 +159,14 @@ class Lesson(models.Model):
 
     topic = models.ForeignKey(Topic, on_delete=models.CASCADE, related_name='lessons')
     lesson_name = models.CharField(max_length=255)
+    revision = models.PositiveIntegerField(default=0, editable=False)
+    # Maintained by lesson.search.reindex
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='lesson_search_vector'),
+        ]
 
     def __str__(self):
         return self.lesson_name
@@ -162,6 +183,19 @@ class Exercise(models.Model):
     starter_code = models.CharField(max_length=255, null=True)
     expected_output = models.CharField(max_length=255, null=True)
 
+    # Code small enough to be stored in the row rather than in S3
+    starter_code_inline = models.TextField(null=True, blank=True)
+    expected_output_inline = models.TextField(null=True, blank=True)
+
+    revision = models.PositiveIntegerField(default=0, editable=False)
+    # Maintained by lesson.search.reindex
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='exercise_search_vector'),
+        ]
+
     def __str__(self):
         return self.exercise_name
    
@@ -203,6 +237,135 @@ class TextBlock(models.Model):
 
     text_format = models.IntegerField(choices=FORMAT_CHOICES)
     paragraph_number = models.IntegerField(null=True)
+    # Sparse ordering key within the lesson or exercise; see place_after
+    position = models.BigIntegerField(editable=False)
+    revision = models.PositiveIntegerField(default=0, editable=False)
+
+    # Gap left between neighbouring positions, so that inserting or
+    # moving a block only updates its own row
+    POSITION_STEP = 1 << 16
+
+    class Meta:
+        ordering = ['position', 'id']
+        indexes = [
+            models.Index(
+                fields=['lesson', 'position'],
+                name='textblock_lesson_position',
+                condition=models.Q(lesson__isnull=False)
+            ),
+            models.Index(
+                fields=['exercise', 'position'],
+                name='textblock_exercise_position',
+                condition=models.Q(exercise__isnull=False)
+            ),
+        ]
 
     def __str__(self):
         return f'Paragraph {self.paragraph_number}'
+
+    def save(self, *args, **kwargs):
+        if self.position is None:
+            self.place_by_paragraph_number()
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'position'}
+
+        super().save(*args, **kwargs)
+
+    def siblings(self):
+        """Return the other textblocks of this block's lesson or exercise."""
+
+        if self.lesson_id is not None:
+            parent = {'lesson_id': self.lesson_id}
+        else:
+            parent = {'lesson_id': None, 'exercise_id': self.exercise_id}
+
+        return TextBlock.objects.filter(**parent).exclude(pk=self.pk)
+
+    def place_by_paragraph_number(self):
+        """
+        Place this block after the last sibling whose paragraph number
+        is not greater than its own, or last if it has no number.
+        """
+        siblings = self.siblings()
+        if self.paragraph_number is not None:
+            siblings = siblings.filter(
+                paragraph_number__lte=self.paragraph_number
+            )
+
+        self.place_after(siblings.order_by('-position', '-id').first())
+
+    def place_after(self, anchor):
+        """
+        Set this block's position to just after ``anchor``, a sibling,
+        or first if ``anchor`` is None. Only when there is no room
+        between the anchor and the next sibling are the siblings
+        renumbered.
+        """
+        siblings = self.siblings()
+
+        while True:
+            following = siblings
+            if anchor is not None:
+                following = siblings.filter(
+                    models.Q(position__gt=anchor.position) |
+                    models.Q(position=anchor.position, id__gt=anchor.id)
+                )
+            after = following.order_by('position', 'id') \
+                .values_list('position', flat=True).first()
+
+            if after is None:
+                self.position = self.POSITION_STEP if anchor is None \
+                    else anchor.position + self.POSITION_STEP
+                return
+            if anchor is None:
+                self.position = after - self.POSITION_STEP
+                return
+            if after - anchor.position > 1:
+                self.position = (anchor.position + after) // 2
+                return
+
+            self.renumber(siblings)
+            anchor.refresh_from_db(fields=['position'])
+
+    @classmethod
+    def renumber(cls, textblocks):
+        """Spread out the positions of textblocks, keeping their order."""
+
+        textblocks = list(
+            textblocks.order_by('position', 'id').only('id', 'position')
+        )
+        for i, textblock in enumerate(textblocks, start=1):
+            textblock.position = i * cls.POSITION_STEP
+
+        cls.objects.bulk_update(textblocks, ['position'])
+
+
+class CurriculumDocument(models.Model):
+    """
+    Precomputed, serialized curriculum tree for a single Module,
+    rebuilt whenever a row in its tree changes.
+    """
+
+    MODULE = 'module'
+
+    KIND_CHOICES = (
+        (MODULE, 'Module'),
+    )
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    # Rendered JSON, kept as text so key order is preserved
+    document = models.TextField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['kind', 'object_id'],
+                name='unique_curriculum_document'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.get_kind_display()} {self.object_id} document'
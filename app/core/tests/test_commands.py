@@ -1,11 +1,19 @@
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, TestCase
+from django.conf import settings
 from psycopg2 import OperationalError as Psycopg2Error
 from django.db.utils import OperationalError
 
 from unittest.mock import patch
+from io import StringIO
 
 from django.core.management import call_command
 
+from moto import mock_s3
+import boto3
+
+from core import models
+from lesson.client import S3Client as s3_client
+
 @patch('core.management.commands.wait_for_db.Command.check')
 class CommandTests(SimpleTestCase):
     """Tests for management commands..."""
@@ -32,3 +40,149 @@ class CommandTests(SimpleTestCase):
         patched_check.assert_called_with(
             databases=['default']
         )
+
+
+@mock_s3
+class CodeStorageCommandTests(TestCase):
+    """Tests for commands that migrate stored exercise code."""
+
+    def setUp(self):
+        s3_client.reset_clients()
+        s3_client.code_cache.clear()
+
+        self.s3 = boto3.client('s3')
+        self.bucket_name = settings.AWS_STORAGE_BUCKET_NAME
+        self.s3.create_bucket(Bucket=self.bucket_name)
+
+        language = models.Language.objects.create(language_name='Test')
+        module = models.Module.objects.create(
+            language=language,
+            module_name='Test Module'
+        )
+        self.topic = models.Topic.objects.create(
+            module=module,
+            topic_name='Test Topic'
+        )
+
+    def test_migrate_code_keys(self):
+        """Test UUID-keyed code is rewritten under content hashes."""
+
+        for key, body in (('uuid-starter', 'code'), ('uuid-output', 'out')):
+            self.s3.put_object(
+                Bucket=self.bucket_name,
+                Body=body,
+                Key=f'{key}.txt'
+            )
+
+        exercise = models.Exercise.objects.create(
+            topic=self.topic,
+            exercise_name='Test Exercise',
+            starter_code='uuid-starter',
+            expected_output='uuid-output'
+        )
+
+        call_command('migrate_code_keys', '--delete-old', stdout=StringIO())
+
+        exercise.refresh_from_db()
+        self.assertEqual(exercise.starter_code, s3_client.content_hash('code'))
+        self.assertEqual(
+            exercise.expected_output,
+            s3_client.content_hash('out')
+        )
+
+        keys = [
+            obj['Key'] for obj in
+            self.s3.list_objects_v2(Bucket=self.bucket_name)['Contents']
+        ]
+        self.assertNotIn('uuid-starter.txt', keys)
+        self.assertIn(f'{exercise.starter_code}.txt', keys)
+
+    def test_sweep_code_objects(self):
+        """Test only unreferenced code objects are swept."""
+
+        client = s3_client.get_default_client()
+        used = client.write_object('used code')
+        orphan = client.write_object('orphaned code')
+        models.Exercise.objects.create(
+            topic=self.topic,
+            exercise_name='Test Exercise',
+            starter_code=used
+        )
+
+        call_command(
+            'sweep_code_objects', '--min-age-hours', '0', stdout=StringIO()
+        )
+
+        keys = [
+            obj['Key'] for obj in
+            self.s3.list_objects_v2(Bucket=self.bucket_name)['Contents']
+        ]
+        self.assertIn(f'{used}.txt', keys)
+        self.assertNotIn(f'{orphan}.txt', keys)
+
+    def test_migrate_code_tiers(self):
+        """Test small S3 code moves inline and large inline code to S3."""
+
+        self.s3.put_object(
+            Bucket=self.bucket_name,
+            Body='small',
+            Key='small-key.txt'
+        )
+
+        exercise = models.Exercise.objects.create(
+            topic=self.topic,
+            exercise_name='Test Exercise',
+            starter_code='small-key',
+            expected_output_inline='x' * 20
+        )
+
+        with self.settings(EXERCISE_INLINE_CODE_MAX_BYTES=10):
+            call_command('migrate_code_tiers', stdout=StringIO())
+
+        exercise.refresh_from_db()
+        self.assertIsNone(exercise.starter_code)
+        self.assertEqual(exercise.starter_code_inline, 'small')
+        self.assertIsNone(exercise.expected_output_inline)
+        self.assertEqual(
+            exercise.expected_output,
+            s3_client.content_hash('x' * 20)
+        )
+
+
+class RecountCommandTests(TestCase):
+    """Tests for the command that repairs curriculum counts."""
+
+    def test_recount_curriculum(self):
+        """Test drifted counts are reported, then repaired."""
+
+        module = models.Module.objects.create(
+            language=models.Language.objects.create(language_name='Test'),
+            module_name='Test Module'
+        )
+        topic = models.Topic.objects.create(
+            module=module,
+            topic_name='Test Topic'
+        )
+        models.Lesson.objects.create(topic=topic, lesson_name='Test Lesson')
+        models.Topic.objects.filter(pk=topic.pk).update(lesson_count=5)
+
+        out = StringIO()
+        call_command('recount_curriculum', '--dry-run', stdout=out)
+
+        self.assertIn(
+            f'Topic {topic.pk} lesson_count: stored 5, actual 1',
+            out.getvalue()
+        )
+        topic.refresh_from_db()
+        self.assertEqual(topic.lesson_count, 5)
+
+        call_command('recount_curriculum', stdout=StringIO())
+
+        topic.refresh_from_db()
+        module.refresh_from_db()
+        self.assertEqual(topic.lesson_count, 1)
+        self.assertEqual(module.topic_count, 1)
+
+        out = StringIO()
+        call_command('recount_curriculum', stdout=out)
+        self.assertIn('Repaired 0 drifted counts.', out.getvalue())
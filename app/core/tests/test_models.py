@@ -349,3 +349,60 @@ class LMSModelTests(TestCase):
         )
 
         self.assertEqual(str(exercise), exercise_name)
+
+
+class TextBlockOrderingTests(TestCase):
+    """Tests for the ordering key of textblocks."""
+
+    def setUp(self):
+        module = Module.objects.create(
+            language=create_language(),
+            module_name='Test Module'
+        )
+        topic = Topic.objects.create(module=module, topic_name='Test Topic')
+        self.lesson = Lesson.objects.create(
+            topic=topic,
+            lesson_name='Test Lesson'
+        )
+
+    def create_textblock(self, text, paragraph_number=None):
+        return TextBlock.objects.create(
+            lesson=self.lesson,
+            text=text,
+            text_format=1,
+            paragraph_number=paragraph_number
+        )
+
+    def texts(self):
+        return [
+            textblock.text for textblock in self.lesson.lesson_textblocks.all()
+        ]
+
+    def test_placed_by_paragraph_number(self):
+        """Test new blocks are placed by their paragraph number."""
+
+        self.create_textblock('Third', 3)
+        self.create_textblock('Unnumbered')
+        self.create_textblock('First', 1)
+        self.create_textblock('Second', 2)
+
+        self.assertEqual(
+            self.texts(),
+            ['First', 'Second', 'Third', 'Unnumbered']
+        )
+
+    def test_repeated_inserts_renumber(self):
+        """Test inserting into the same gap keeps working once it fills."""
+
+        first = self.create_textblock('First', 1)
+        self.create_textblock('Last', 2)
+
+        for i in range(40):
+            textblock = self.create_textblock(f'Inserted {i}', 3)
+            textblock.place_after(first)
+            textblock.save()
+
+        self.assertEqual(
+            self.texts(),
+            ['First', *(f'Inserted {i}' for i in reversed(range(40))), 'Last']
+        )
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class LessonConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'lesson'
+
+    def ready(self):
+        from lesson import signals  # noqa: F401
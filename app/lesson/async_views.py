@@ -0,0 +1,204 @@
+"""
+Async read-only views for the curriculum, for serving under ASGI.
+
+Each request loads the rows it needs to find exercise code, then loads
+the remaining related rows and fetches the code from S3 concurrently,
+so a worker is never blocked while waiting on S3.
+
+Responses match the sync views: lists are paged by the same keyset
+cursor, ``?fields=`` and ``?expand=`` are honoured, and responses carry
+ETags built the same way, so a matching If-None-Match is answered with
+304 before any related rows or code are loaded.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.db.models import prefetch_related_objects
+from django.http import HttpResponse, HttpResponseNotAllowed
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.request import Request
+
+from app.renderers import ORJSONRenderer
+from core.models import Module, Topic, Exercise
+from lesson import serializers, prefetch, views
+from lesson.client.S3Client import get_default_client
+from lesson.fields import FieldSpec, FIELD_SPEC_CONTEXT_KEY
+from lesson.pagination import CurriculumCursorPagination
+
+
+def json_response(data, status=200):
+    """Render data exactly as the DRF views would."""
+
+    return HttpResponse(
+        ORJSONRenderer().render(data),
+        content_type='application/json',
+        status=status
+    )
+
+
+class AsyncCurriculumView:
+    """
+    Base async view listing or retrieving curriculum objects.
+
+    ``code_prefetch`` holds the lookups needed to find exercise code;
+    ``related_prefetch`` holds every lookup for the serializer, and any
+    not already loaded are fetched alongside the S3 reads.
+    """
+
+    queryset = None
+    serializer_class = None
+    code_prefetch = []
+    related_prefetch = []
+
+    @classmethod
+    def as_view(cls):
+        """Return an async function view (Django 3.2 has no async CBVs)."""
+
+        async def view(request, pk=None):
+            if request.method != 'GET':
+                return HttpResponseNotAllowed(['GET'])
+            return await cls().get(request, pk)
+
+        return view
+
+    async def get(self, request, pk=None):
+        try:
+            await sync_to_async(self.authenticate)(request)
+        except exceptions.APIException as e:
+            res = json_response({'detail': e.detail}, status=e.status_code)
+            if e.status_code == 401:
+                res['WWW-Authenticate'] = 'Token'
+            return res
+
+        spec = FieldSpec.from_request(request)
+        context = {'request': request, FIELD_SPEC_CONTEXT_KEY: spec}
+        delivery = serializers.get_code_delivery(context)
+
+        rows, paginator = await sync_to_async(self.get_rows)(request, pk)
+        if not rows and pk is not None:
+            return json_response({'detail': 'Not found.'}, status=404)
+
+        # Presigned code URLs expire, so those responses get no ETag
+        etag = None
+        if delivery != serializers.CODE_DELIVERY_PRESIGNED:
+            etag = views.curriculum_etag(
+                request,
+                self.queryset.model,
+                self.revisions(rows, pk, paginator)
+            )
+            if views.etag_matches(request, etag):
+                res = HttpResponse(status=304)
+                res['ETag'] = etag
+                return res
+
+        instances, keys = await sync_to_async(self.get_instances)(
+            [row['id'] for row in rows], spec
+        )
+        if delivery != serializers.CODE_DELIVERY_INLINE:
+            keys = []
+
+        _, code = await asyncio.gather(
+            sync_to_async(prefetch_related_objects)(
+                instances, *self.lookups(self.related_prefetch, spec)
+            ),
+            get_default_client().read_objects_async(keys)
+        )
+
+        context[serializers.EXERCISE_CODE_CONTEXT_KEY] = code
+        data = await sync_to_async(self.serialize)(instances, pk, context)
+
+        if paginator is not None:
+            data = {
+                'next': paginator.get_next_link(),
+                'previous': paginator.get_previous_link(),
+                'results': data,
+            }
+
+        res = json_response(data)
+        if etag is not None and not views.has_unavailable_code(data):
+            res['ETag'] = etag
+        return res
+
+    def authenticate(self, request):
+        """Authenticate the request with the API's token authentication."""
+
+        res = TokenAuthentication().authenticate(request)
+        if res is None:
+            raise exceptions.NotAuthenticated()
+
+        request.user, request.auth = res
+
+    def get_rows(self, request, pk):
+        """
+        Return the ids and revisions of the requested rows, and the
+        paginator for a list.
+        """
+        rows = self.queryset.values('id', 'revision')
+
+        if pk is not None:
+            return list(rows.filter(pk=pk)), None
+
+        paginator = CurriculumCursorPagination()
+        page = paginator.paginate_queryset(rows, Request(request))
+        return page, paginator
+
+    def revisions(self, rows, pk, paginator):
+        """Return the revisions an ETag is built from, as the sync views."""
+
+        if pk is not None:
+            return rows[0]['revision']
+
+        return [
+            [(row['id'], row['revision']) for row in rows],
+            paginator.has_next,
+            paginator.has_previous,
+        ]
+
+    def lookups(self, lookups, spec):
+        """Return the prefetch lookups for the relations a spec renders."""
+
+        if spec is None:
+            return lookups
+
+        return [
+            lookup for lookup in lookups
+            if spec.allows(lookup.prefetch_through.split('__'))
+        ]
+
+    def get_instances(self, ids, spec):
+        """Return the instances with ids and the S3 keys of their code."""
+
+        instances = list(
+            self.queryset.filter(pk__in=ids)
+            .prefetch_related(*self.lookups(self.code_prefetch, spec))
+        )
+        return instances, serializers.exercise_code_keys(instances, spec)
+
+    def serialize(self, instances, pk, context):
+        if pk is not None:
+            return self.serializer_class(instances[0], context=context).data
+
+        return self.serializer_class(
+            instances, many=True, context=context
+        ).data
+
+
+class ModuleView(AsyncCurriculumView):
+    queryset = Module.objects.order_by('id')
+    serializer_class = serializers.ModuleSerializer
+    code_prefetch = prefetch.module_lookups(code_only=True)
+    related_prefetch = prefetch.module_lookups()
+
+
+class TopicView(AsyncCurriculumView):
+    queryset = Topic.objects.order_by('id')
+    serializer_class = serializers.TopicSerializer
+    code_prefetch = prefetch.topic_lookups(code_only=True)
+    related_prefetch = prefetch.topic_lookups()
+
+
+class ExerciseView(AsyncCurriculumView):
+    queryset = Exercise.objects.order_by('id').defer('search_vector')
+    serializer_class = serializers.ExerciseSerializer
+    related_prefetch = prefetch.exercise_lookups()
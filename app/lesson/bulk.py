@@ -0,0 +1,85 @@
+"""
+Bulk changes to the textblocks of a lesson or exercise.
+
+Blocks are written with bulk ORM operations in a single transaction.
+Those send no model signals, so the revisions and documents of the
+affected tree are invalidated once for the whole batch rather than once
+per block.
+"""
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from core.models import TextBlock
+from lesson import counters, prefetch, search, signals
+
+
+UPDATE_FIELDS = ['text', 'text_format', 'paragraph_number', 'position']
+
+
+def replace_textblocks(parent_field, parent, items):
+    """
+    Make ``items`` the complete, ordered list of a parent's textblocks.
+
+    Items with an id update that block and items without one create a
+    block; blocks of the parent that are not listed are deleted. Blocks
+    are numbered from 1 in list order, and their positions are spread
+    out again. Returns the parent's blocks.
+    """
+    with transaction.atomic():
+        # Bumping the tree first locks its rows from the top down, like
+        # every other write, and serializes bulk changes to one parent
+        path = signals.curriculum_path(parent)
+        signals.curriculum_changed([path])
+
+        existing = TextBlock.objects.filter(**{parent_field: parent}) \
+            .in_bulk()
+
+        listed = {item['id'] for item in items if 'id' in item}
+        if listed - existing.keys():
+            raise ValidationError({
+                'textblocks': 'Textblocks were deleted while the '
+                              'change was being made.'
+            })
+
+        created = []
+        updated = []
+
+        for number, item in enumerate(items, start=1):
+            values = {
+                field: item[field] for field in ('text', 'text_format')
+                if field in item
+            }
+            values['paragraph_number'] = number
+            values['position'] = number * TextBlock.POSITION_STEP
+
+            if 'id' not in item:
+                created.append(
+                    TextBlock(**{parent_field: parent}, **values)
+                )
+                continue
+
+            textblock = existing[item['id']]
+            if any(
+                getattr(textblock, field) != value
+                for field, value in values.items()
+            ):
+                for field, value in values.items():
+                    setattr(textblock, field, value)
+                updated.append(textblock)
+
+        unlisted = existing.keys() - listed
+        with signals.suspended():
+            TextBlock.objects.filter(pk__in=unlisted).delete()
+
+        TextBlock.objects.bulk_update(updated, UPDATE_FIELDS)
+        TextBlock.objects.bulk_create(created)
+
+        signals.bump_revisions(
+            [{'textblock': textblock.pk} for textblock in updated]
+        )
+        # The parent's vector was rebuilt above from the old blocks
+        search.reindex([path])
+        counters.adjust('textblock', path, len(created) - len(unlisted))
+
+    return TextBlock.objects.filter(**{parent_field: parent}) \
+        .order_by(*prefetch.TEXTBLOCK_ORDERING)
@@ -1,10 +1,199 @@
+import asyncio
 import boto3
-import uuid
+import gzip
+import hashlib
+import re
+import threading
 
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
 from django.conf import settings
 
-def generate_uuid():
-    return uuid.uuid4()
+from lesson.client.breaker import CircuitBreaker
+from lesson.client.cache import CodeCache
+from lesson.client.disk_cache import DiskCodeCache
+
+
+_boto_clients = {}
+_boto_clients_lock = threading.Lock()
+
+_default_client = None
+
+_executor = None
+_executor_lock = threading.Lock()
+
+NOT_FOUND_CODES = ('404', 'NoSuchKey', 'NotFound')
+
+
+class S3WriteError(Exception):
+    """Raised when code could not be stored in S3."""
+
+
+class S3ReadError(Exception):
+    """Raised when code could not be read from S3."""
+
+
+# Fails S3 reads fast once they start erroring, instead of tying up
+# workers waiting on timeouts
+read_breaker = CircuitBreaker(
+    failure_rate=settings.AWS_S3_BREAKER_FAILURE_RATE,
+    window=settings.AWS_S3_BREAKER_WINDOW,
+    min_calls=settings.AWS_S3_BREAKER_MIN_CALLS,
+    reset_timeout=settings.AWS_S3_BREAKER_RESET_TIMEOUT
+)
+
+# Code objects are written once under a fresh key and never modified,
+# so they can be cached for the lifetime of the worker.
+code_cache = CodeCache(max_bytes=settings.AWS_S3_CODE_CACHE_MAX_BYTES)
+
+# Optional second tier on local disk, shared by all workers on the host
+disk_cache = None
+if settings.AWS_S3_CODE_DISK_CACHE_DIR:
+    disk_cache = DiskCodeCache(
+        directory=settings.AWS_S3_CODE_DISK_CACHE_DIR,
+        max_bytes=settings.AWS_S3_CODE_DISK_CACHE_MAX_BYTES
+    )
+
+
+def read_cached(key):
+    """
+    Return code from the in-memory cache, then the disk cache, or None.
+    Disk hits are promoted to the in-memory cache.
+    """
+    txt_data = code_cache.get(key)
+    if txt_data is not None or disk_cache is None:
+        return txt_data
+
+    txt_data = disk_cache.get(key)
+    if txt_data is not None:
+        code_cache.set(key, txt_data)
+
+    return txt_data
+
+
+def add_to_cache(key, txt_data, size=None):
+    """Add code to the in-memory cache and the disk cache."""
+
+    code_cache.set(key, txt_data, size=size)
+
+    if disk_cache is not None:
+        try:
+            disk_cache.set(key, txt_data)
+        except OSError:
+            pass
+
+
+CONTENT_HASH_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+
+def encode_body(txt_data):
+    """
+    Return put_object arguments for some text, gzip compressing it when
+    it is large enough for compression to pay off.
+    """
+    body = txt_data.encode('utf-8')
+    params = {
+        'Body': body,
+        'ContentType': 'text/plain; charset=utf-8',
+    }
+
+    if len(body) >= settings.AWS_S3_CODE_COMPRESSION_MIN_BYTES:
+        compressed = gzip.compress(body)
+        if len(compressed) < len(body):
+            params['Body'] = compressed
+            params['ContentEncoding'] = 'gzip'
+
+    return params
+
+
+def content_hash(txt_data):
+    """Return the content address (SHA-256 hex digest) of some text."""
+
+    return hashlib.sha256(txt_data.encode('utf-8')).hexdigest()
+
+
+def is_content_hash(file_id):
+    """Return True if a file id is a content address, not a UUID."""
+
+    return bool(CONTENT_HASH_PATTERN.match(str(file_id)))
+
+
+def get_boto_client(access_key, secret_key, region):
+    """
+    Return the process-wide boto3 S3 client for a set of credentials.
+
+    The client is built lazily on first use and then shared by every
+    thread in the worker, so credential resolution, endpoint loading
+    and TLS connections are paid once rather than on every call.
+    """
+    credentials = (access_key, secret_key, region)
+    client = _boto_clients.get(credentials)
+
+    if client is None:
+        with _boto_clients_lock:
+            client = _boto_clients.get(credentials)
+            if client is None:
+                session = boto3.session.Session(
+                    aws_access_key_id=access_key,
+                    aws_secret_access_key=secret_key,
+                    region_name=region
+                )
+                # Standard retry mode caps retries with a shared retry
+                # quota, so a struggling S3 does not multiply our load
+                config = Config(
+                    max_pool_connections=settings.AWS_S3_MAX_POOL_CONNECTIONS,
+                    connect_timeout=settings.AWS_S3_CONNECT_TIMEOUT,
+                    read_timeout=settings.AWS_S3_READ_TIMEOUT,
+                    retries={
+                        'mode': 'standard',
+                        'max_attempts': settings.AWS_S3_MAX_ATTEMPTS,
+                    }
+                )
+                client = session.client('s3', config=config)
+                _boto_clients[credentials] = client
+
+    return client
+
+
+def get_executor():
+    """Return the bounded thread pool used for concurrent S3 calls."""
+
+    global _executor
+
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.AWS_S3_MAX_CONCURRENT_REQUESTS,
+                    thread_name_prefix='s3'
+                )
+    return _executor
+
+
+def get_default_client():
+    """Return an S3Client configured from the project settings."""
+
+    global _default_client
+
+    if _default_client is None:
+        _default_client = S3Client(
+            region=settings.AWS_S3_REGION_NAME,
+            access_key=settings.AWS_ACCESS_KEY_ID,
+            secret_key=settings.AWS_SECRET_ACCESS_KEY
+        )
+    return _default_client
+
+
+def reset_clients():
+    """Drop the pooled clients, e.g. between tests or after a fork."""
+
+    global _default_client
+
+    with _boto_clients_lock:
+        _boto_clients.clear()
+    _default_client = None
 
 
 class S3Client:
@@ -15,45 +204,236 @@ class S3Client:
         self.bucket_name = settings.AWS_STORAGE_BUCKET_NAME
 
         self.region = region
-    
-    def create_s3_session(self):
-        return boto3.Session(
-            aws_access_key_id=self.access_key,
-            aws_secret_access_key=self.secret_key
-        )
-    
-    def create_s3_resource(self):
-        session = self.create_s3_session()
-        return session.resource('s3')
-    
+
+    @property
+    def client(self):
+        return get_boto_client(self.access_key, self.secret_key, self.region)
+
     def write_object(self, txt_data):
-        s3 = self.create_s3_resource()
-        file_id = generate_uuid()
+        """
+        Store text under its content hash and return the hash.
+
+        Identical code is only stored once: an object with the same
+        content is refreshed in place instead of uploaded again.
+        """
+        try:
+            file_id, _ = self.store_object(txt_data)
+        except S3WriteError:
+            return None
+
+        return file_id
+
+    def store_object(self, txt_data):
+        """
+        Store text under its content hash.
+
+        Returns a (file_id, created) tuple, where created is False if the
+        object already existed and was only refreshed.
+        """
+        file_id = content_hash(txt_data)
 
         key = f'{file_id}.txt'
+        params = encode_body(txt_data)
 
-        print('BUCKET NAME:', self.bucket_name)
+        # The code cache is not proof the object still exists, as the
+        # sweep may have deleted it since, so S3 is always asked
+        if self.refresh_object(key, params):
+            add_to_cache(key, txt_data)
+            return file_id, False
 
-        res = s3.meta.client.put_object(
-            Body=txt_data,
+        res = self.client.put_object(
             Bucket=self.bucket_name,
-            Key=key
+            Key=key,
+            **params
         )
 
         meta_data = res.get('ResponseMetadata')
-        
+
         status = meta_data.get('HTTPStatusCode')
 
-        if status == 200:
-            return file_id
-        else:
-            return None
+        if status != 200:
+            raise S3WriteError(f'Unexpected status {status} writing {key}')
+
+        add_to_cache(key, txt_data)
+        return file_id, True
+
+    def write_objects(self, txt_data_list):
+        """
+        Store several texts concurrently, returning their
+        (file_id, created) tuples.
+
+        If any write fails S3WriteError is raised. Objects this call did
+        store are left in place: keys are content addresses that other
+        requests may already have decided to reuse, so unreferenced
+        objects are only removed by the sweep_code_objects command.
+        """
+        executor = get_executor()
+        futures = [
+            executor.submit(self.store_object, txt_data)
+            for txt_data in txt_data_list
+        ]
+
+        results = []
+        error = None
+
+        for future in futures:
+            try:
+                results.append(future.result())
+            except (S3WriteError, BotoCoreError, ClientError) as e:
+                error = e
+
+        if error is not None:
+            raise S3WriteError(str(error)) from error
+
+        return results
+
+    def refresh_object(self, key, params):
+        """
+        Copy an object onto itself so its LastModified is renewed and
+        sweep_code_objects treats it as freshly written.
+
+        Returns False if the object does not exist.
+        """
+        headers = {
+            name: value for name, value in params.items() if name != 'Body'
+        }
+
+        try:
+            self.client.copy_object(
+                Bucket=self.bucket_name,
+                Key=key,
+                CopySource={'Bucket': self.bucket_name, 'Key': key},
+                MetadataDirective='REPLACE',
+                **headers
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] in NOT_FOUND_CODES:
+                return False
+            raise
+
+        return True
+
+    def presigned_url(self, key):
+        """Return a short-lived URL that allows anyone to GET an object."""
+
+        return self.client.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': self.bucket_name, 'Key': key},
+            ExpiresIn=settings.AWS_S3_PRESIGNED_URL_EXPIRY
+        )
+
+    def delete_object(self, key):
+        self.client.delete_object(Bucket=self.bucket_name, Key=key)
+        code_cache.delete(key)
+        if disk_cache is not None:
+            disk_cache.delete(key)
 
     def read_object(self, key):
-        s3 = self.create_s3_resource()
-        obj = s3.meta.client.get_object(
-            Bucket=self.bucket_name,
-            Key=key
+        cached = read_cached(key)
+        if cached is not None:
+            return cached
+
+        return self._fetch_object(key)
+
+    def read_object_or_none(self, key):
+        """Read an object, returning None if it could not be read."""
+
+        try:
+            return self.read_object(key)
+        except S3ReadError:
+            return None
+
+    def _fetch_object(self, key):
+        """
+        Read an object from S3 and add it to the code caches.
+
+        Raises S3ReadError if the object is missing, S3 fails, or the
+        read circuit breaker is open.
+        """
+        if not read_breaker.allow():
+            raise S3ReadError(f'Circuit open, skipping read of {key}')
+
+        try:
+            obj = self.client.get_object(
+                Bucket=self.bucket_name,
+                Key=key
+            )
+            body = obj['Body'].read()
+        except ClientError as e:
+            if e.response['Error']['Code'] in NOT_FOUND_CODES:
+                read_breaker.record_success()
+            else:
+                read_breaker.record_failure()
+            raise S3ReadError(f'Error reading {key}') from e
+        except BotoCoreError as e:
+            read_breaker.record_failure()
+            raise S3ReadError(f'Error reading {key}') from e
+
+        read_breaker.record_success()
+
+        if obj.get('ContentEncoding') == 'gzip':
+            body = gzip.decompress(body)
+
+        txt_data = body.decode('utf-8')
+        add_to_cache(key, txt_data, size=len(body))
+
+        return txt_data
+
+    def _fetch_object_or_none(self, key):
+        try:
+            return self._fetch_object(key)
+        except S3ReadError:
+            return None
+
+    def read_objects(self, keys):
+        """
+        Read several objects concurrently.
+
+        Returns a dict mapping each key to its decoded contents, or to
+        None if it could not be read. Total latency tracks the slowest
+        read rather than the sum of reads.
+        """
+        keys = list(dict.fromkeys(keys))
+        res = {}
+
+        for key in keys:
+            cached = read_cached(key)
+            if cached is not None:
+                res[key] = cached
+
+        keys = [key for key in keys if key not in res]
+
+        if not keys:
+            return res
+
+        if len(keys) == 1:
+            res[keys[0]] = self._fetch_object_or_none(keys[0])
+            return res
+
+        executor = get_executor()
+        futures = {
+            key: executor.submit(self._fetch_object_or_none, key)
+            for key in keys
+        }
+
+        res.update(
+            (key, future.result()) for key, future in futures.items()
         )
+        return res
+
+    async def read_objects_async(self, keys):
+        """
+        Read several objects concurrently from an asyncio event loop,
+        without blocking the loop on S3 I/O. Keys that could not be read
+        map to None.
+        """
+        keys = list(dict.fromkeys(keys))
+        loop = asyncio.get_running_loop()
+        executor = get_executor()
+
+        values = await asyncio.gather(*(
+            loop.run_in_executor(executor, self.read_object_or_none, key)
+            for key in keys
+        ))
 
-        return obj['Body'].read().decode('utf-8')
+        return dict(zip(keys, values))
@@ -0,0 +1,104 @@
+import threading
+import time
+
+from collections import deque
+
+
+class CircuitBreaker:
+    """
+    Thread-safe circuit breaker over a sliding window of recent calls.
+
+    The circuit opens once at least ``min_calls`` calls have been made
+    in the window and the share of failures reaches ``failure_rate``.
+    While open, calls are rejected without being attempted. After
+    ``reset_timeout`` seconds a single trial call is let through: if it
+    succeeds the circuit closes, otherwise it opens again.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_rate, window, min_calls, reset_timeout):
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+
+        self.state = self.CLOSED
+        self.opened_at = None
+        self.times_opened = 0
+        self.rejected = 0
+
+        self._outcomes = deque(maxlen=window)
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Return True if a call may be attempted."""
+
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    self.rejected += 1
+                    return False
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+
+            if self.state == self.HALF_OPEN:
+                if self._trial_in_flight:
+                    self.rejected += 1
+                    return False
+                self._trial_in_flight = True
+
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.CLOSED
+                self._trial_in_flight = False
+                self._outcomes.clear()
+            self._outcomes.append(True)
+
+    def record_failure(self):
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._open()
+                return
+
+            self._outcomes.append(False)
+            calls = len(self._outcomes)
+            failures = calls - sum(self._outcomes)
+
+            if calls >= self.min_calls and \
+                    failures / calls >= self.failure_rate:
+                self._open()
+
+    def _open(self):
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.times_opened += 1
+        self._trial_in_flight = False
+        self._outcomes.clear()
+
+    def reset(self):
+        """Close the circuit and forget recent calls."""
+
+        with self._lock:
+            self.state = self.CLOSED
+            self.opened_at = None
+            self._trial_in_flight = False
+            self._outcomes.clear()
+
+    def stats(self):
+        """Return the breaker state and counters."""
+
+        with self._lock:
+            calls = len(self._outcomes)
+            return {
+                'state': self.state,
+                'window_calls': calls,
+                'window_failures': calls - sum(self._outcomes),
+                'times_opened': self.times_opened,
+                'rejected': self.rejected,
+            }
@@ -0,0 +1,186 @@
+import fcntl
+import hashlib
+import mmap
+import os
+import tempfile
+import threading
+import time
+
+
+# Only refresh a file's mtime on read if it is older than this, so hot
+# entries are not touched on every hit
+TOUCH_INTERVAL = 60
+
+# Temporary files older than this were left by a writer that died, and
+# are removed on eviction
+STALE_TEMP_AGE = 3600
+
+TEMP_SUFFIX = '.tmp'
+
+
+class DiskCodeCache:
+    """
+    Cache for immutable code objects in a local directory, shared by
+    every worker process on the host.
+
+    Entries are written atomically (write to a temporary file, then
+    rename), read through mmap, and evicted oldest-first by mtime once
+    the directory grows past ``max_bytes``.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._written_bytes = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def get(self, key):
+        """Return the cached text for a key, or None."""
+
+        path = self._path(key)
+
+        try:
+            with open(path, 'rb') as f:
+                stat = os.fstat(f.fileno())
+                if stat.st_size:
+                    with mmap.mmap(
+                        f.fileno(), 0, access=mmap.ACCESS_READ
+                    ) as mm:
+                        txt_data = mm[:].decode('utf-8')
+                else:
+                    txt_data = ''
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+
+        if time.time() - stat.st_mtime > TOUCH_INTERVAL:
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                pass
+
+        self.hits += 1
+        return txt_data
+
+    def set(self, key, txt_data):
+        """Atomically write an entry, evicting old entries if needed."""
+
+        path = self._path(key)
+        body = txt_data.encode('utf-8')
+
+        if len(body) > self.max_bytes:
+            return
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Written next to its entry, so the size scan sees it
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(path), suffix=TEMP_SUFFIX
+        )
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(body)
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+        with self._lock:
+            self._written_bytes += len(body)
+            check = self._written_bytes >= self.max_bytes // 10
+            if check:
+                self._written_bytes = 0
+
+        if check:
+            self.evict()
+
+    def delete(self, key):
+        """Remove an entry if present."""
+
+        self._unlink(self._path(key))
+
+    def evict(self):
+        """Remove the oldest entries until the cache is within its limit."""
+
+        lock_path = os.path.join(self.directory, '.lock')
+
+        with open(lock_path, 'w') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # Another worker is already evicting
+                return
+
+            entries = []
+            total = 0
+
+            now = time.time()
+
+            for entry in self._scan():
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+
+                if entry.name.endswith(TEMP_SUFFIX):
+                    # Files still being written count towards the size
+                    # but are not evicted
+                    if now - stat.st_mtime > STALE_TEMP_AGE:
+                        self._unlink(entry.path)
+                    else:
+                        total += stat.st_size
+                    continue
+
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+            if total <= self.max_bytes:
+                return
+
+            target = self.max_bytes * 0.9
+            entries.sort()
+
+            for _, size, path in entries:
+                if total <= target:
+                    break
+                self._unlink(path)
+                total -= size
+                self.evictions += 1
+
+    def _unlink(self, path):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+    def _scan(self):
+        for shard in os.scandir(self.directory):
+            if shard.is_dir():
+                for entry in os.scandir(shard.path):
+                    if entry.is_file():
+                        yield entry
+
+    def stats(self):
+        """Return the cache counters for this process."""
+
+        return {
+            'directory': self.directory,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
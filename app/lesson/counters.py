@@ -0,0 +1,173 @@
+"""
+Denormalized counts of the rows under each module and topic.
+
+Counts are adjusted with a single ``UPDATE ... SET count = count + n``
+in the transaction that creates, moves or deletes a row, after the
+revision bump has locked the rows above it. drift() and recount()
+check and rebuild them from the rows themselves.
+"""
+from django.db.models import Count, F, Func, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from core.models import Module, Topic, Lesson, Exercise, TextBlock
+
+
+# Counted level, as keyed in curriculum paths: (model holding the
+# count, count field, level of the row holding it)
+COUNTED = {
+    'topic': (Module, 'topic_count', 'module'),
+    'lesson': (Topic, 'lesson_count', 'topic'),
+    'exercise': (Topic, 'exercise_count', 'topic'),
+    'textblock': (Topic, 'textblock_count', 'topic'),
+}
+
+# Filters for the textblocks counted under a lesson or exercise; a block
+# with both belongs to its exercise's topic, as in its curriculum path
+TEXTBLOCK_PARENTS = {
+    'lesson': lambda pk: {'lesson': pk, 'exercise__isnull': True},
+    'exercise': lambda pk: {'exercise': pk},
+}
+
+# Filters for the topics deleted with a row of each level
+TOPICS_BELOW = {
+    'topic': lambda pk: {'pk': pk},
+    'module': lambda pk: {'module': pk},
+    'language': lambda pk: {'module__language': pk},
+}
+
+COUNTER_FIELDS = {
+    Module: ['topic_count'],
+    Topic: ['lesson_count', 'exercise_count', 'textblock_count'],
+}
+
+
+def adjust(level, path, delta):
+    """Add ``delta`` to the count of ``level`` rows above a path."""
+
+    # A zero delta still runs its UPDATE, so bulk changes run the same
+    # queries whatever they add or remove
+    if level not in COUNTED:
+        return
+
+    model, field, parent_level = COUNTED[level]
+    parent_id = path.get(parent_level)
+    if parent_id is None:
+        return
+
+    # Clamped so a count that has drifted low cannot fail a delete
+    model.objects.filter(pk=parent_id).update(
+        **{field: Greatest(F(field) + delta, Value(0))}
+    )
+
+
+def moved(level, previous, path):
+    """Move a row's count when it has moved to another parent."""
+
+    if level not in COUNTED:
+        return
+
+    parent_level = COUNTED[level][2]
+    if previous.get(parent_level) == path.get(parent_level):
+        return
+
+    adjust(level, previous, -1)
+    adjust(level, path, 1)
+
+    # A lesson or exercise takes its blocks to the new topic with it
+    if level in TEXTBLOCK_PARENTS:
+        blocks = TextBlock.objects.filter(
+            **TEXTBLOCK_PARENTS[level](path[level])
+        ).count()
+        adjust('textblock', previous, -blocks)
+        adjust('textblock', path, blocks)
+
+
+def removed(level, path, blocks):
+    """
+    Take a row that is about to be deleted, and ``blocks``, the
+    textblocks deleted with it, off the counts of the rows that stay.
+    """
+    adjust(level, path, -1)
+    if level == 'textblock':
+        return
+
+    # A block counts towards its exercise's topic if it has one, as in
+    # its curriculum path
+    blocks = blocks.order_by().annotate(
+        counted_topic=Coalesce('exercise__topic', 'lesson__topic')
+    )
+    if level in TOPICS_BELOW:
+        blocks = blocks.exclude(counted_topic__in=Topic.objects.filter(
+            **TOPICS_BELOW[level](path[level])
+        ))
+
+    for row in blocks.values('counted_topic').annotate(count=Count('pk')):
+        adjust('textblock', {'topic': row['counted_topic']}, -row['count'])
+
+
+def _count(queryset):
+    """Return a subquery counting the rows of a queryset."""
+
+    return Subquery(
+        queryset.order_by()
+        .annotate(count=Func(F('pk'), function='COUNT'))
+        .values('count')
+    )
+
+
+def expected_counts():
+    """Return {model: {count field: expression counting its rows}}."""
+
+    topic = OuterRef('pk')
+
+    return {
+        Module: {
+            'topic_count': _count(Topic.objects.filter(module=topic)),
+        },
+        Topic: {
+            'lesson_count': _count(Lesson.objects.filter(topic=topic)),
+            'exercise_count': _count(Exercise.objects.filter(topic=topic)),
+            # A block belongs to its exercise's topic if it has one, as
+            # in its curriculum path
+            'textblock_count': _count(TextBlock.objects.filter(
+                Q(exercise__topic=topic) |
+                Q(exercise__isnull=True, lesson__topic=topic)
+            )),
+        },
+    }
+
+
+def drift():
+    """
+    Return (model, pk, field, stored count, actual count) for every
+    count that does not match the rows it counts.
+    """
+    found = []
+
+    for model, counts in expected_counts().items():
+        actual = {f'actual_{field}': count for field, count in counts.items()}
+        rows = model.objects.annotate(**actual).filter(
+            Q(*(
+                ~Q(**{field: F(f'actual_{field}')}) for field in counts
+            ), _connector=Q.OR)
+        ).order_by('id').values('id', *counts, *actual)
+
+        for row in rows:
+            found += [
+                (model, row['id'], field, row[field], row[f'actual_{field}'])
+                for field in counts
+                if row[field] != row[f'actual_{field}']
+            ]
+
+    return found
+
+
+def recount(drifted):
+    """Rebuild the counts of the rows listed by drift()."""
+
+    counts = expected_counts()
+
+    for model in counts:
+        ids = {pk for row_model, pk, *_ in drifted if row_model is model}
+        if ids:
+            model.objects.filter(pk__in=ids).update(**counts[model])
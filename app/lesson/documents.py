@@ -0,0 +1,213 @@
+"""
+Materialized curriculum documents.
+
+The serialized tree of every Module is stored in a CurriculumDocument
+row, so a page of modules or topics is a single row lookup instead of
+a walk over the whole tree and its exercise code.
+
+Documents are deleted as soon as a row in their tree changes and rebuilt
+once the transaction commits. A read that finds a document missing
+builds it on the spot; such lazily built documents are only inserted,
+never overwritten, so a read racing a write can't replace the
+rebuilt document with one made from older data.
+"""
+import logging
+import threading
+
+import orjson
+
+from django.conf import settings
+from django.db import transaction
+
+from app.renderers import ORJSONRenderer
+from core.models import CurriculumDocument, Module, Topic
+from lesson import readers, serializers
+
+
+logger = logging.getLogger(__name__)
+
+# Ids waiting to be rebuilt when the current transaction commits
+_pending = threading.local()
+
+
+def documents_enabled(context):
+    """Return True if a response can be served from documents."""
+
+    return settings.CURRICULUM_DOCUMENTS_ENABLED and \
+        serializers.get_code_delivery(context) == \
+        serializers.CODE_DELIVERY_INLINE
+
+
+def _render(data):
+    return ORJSONRenderer().render(data).decode('utf-8')
+
+
+def _store(kind, texts, overwrite):
+    if overwrite:
+        for object_id, text in texts.items():
+            CurriculumDocument.objects.update_or_create(
+                kind=kind,
+                object_id=object_id,
+                defaults={'document': text}
+            )
+    else:
+        CurriculumDocument.objects.bulk_create(
+            [
+                CurriculumDocument(
+                    kind=kind,
+                    object_id=object_id,
+                    document=text
+                )
+                for object_id, text in texts.items()
+            ],
+            ignore_conflicts=True
+        )
+
+
+def _build_module_documents(module_ids, overwrite=False):
+    """
+    Serialize modules in one batch, returning (texts, stored) where
+    texts maps module id to rendered JSON and stored is the set of ids
+    whose document was saved.
+
+    Modules with exercise code that could not be read are returned but
+    not stored, so a degraded tree is never served after S3 recovers.
+    """
+    reader = readers.ModuleReader({
+        'code_delivery': serializers.CODE_DELIVERY_INLINE
+    })
+    data = reader.read(Module.objects.filter(pk__in=module_ids).order_by('id'))
+
+    texts = {}
+    storable = {}
+
+    for module in data:
+        text = _render(module)
+        texts[module['id']] = text
+
+        degraded = any(
+            exercise.get('code_unavailable')
+            for topic in module['topics']
+            for exercise in topic['topic_exercises']
+        )
+        if not degraded:
+            storable[module['id']] = text
+
+    _store(CurriculumDocument.MODULE, storable, overwrite)
+    return texts, set(storable)
+
+
+def module_document_texts(module_ids):
+    """
+    Return (texts, stored) for the given modules, building any missing
+    documents. Ids of modules that don't exist are left out.
+    """
+    texts = dict(
+        CurriculumDocument.objects.filter(
+            kind=CurriculumDocument.MODULE,
+            object_id__in=module_ids
+        ).values_list('object_id', 'document')
+    )
+    stored = set(texts)
+
+    missing = [pk for pk in module_ids if pk not in texts]
+    if missing:
+        built, built_stored = _build_module_documents(missing)
+        texts.update(built)
+        stored |= built_stored
+
+    return texts, stored
+
+
+def module_list(module_ids):
+    """Return the trees of the given modules, in the order given."""
+
+    texts, _ = module_document_texts(module_ids)
+    return [orjson.loads(texts[pk]) for pk in module_ids if pk in texts]
+
+
+def module_detail(pk):
+    """Return a module's tree, or None if it does not exist."""
+
+    if not Module.objects.filter(pk=pk).exists():
+        return None
+
+    texts, _ = module_document_texts([pk])
+    if pk not in texts:
+        return None
+    return orjson.loads(texts[pk])
+
+
+def topic_list(topic_ids):
+    """Return the trees of the given topics, in the order given."""
+
+    module_ids = {}
+    for topic_id, module_id in Topic.objects.filter(
+        pk__in=topic_ids
+    ).values_list('id', 'module_id'):
+        module_ids[topic_id] = module_id
+
+    texts, _ = module_document_texts(sorted(set(module_ids.values())))
+
+    topics = {
+        topic['id']: topic
+        for text in texts.values()
+        for topic in orjson.loads(text)['topics']
+    }
+    return [topics[pk] for pk in topic_ids if pk in topics]
+
+
+def topic_detail(pk):
+    """Return a topic's tree, or None if it does not exist."""
+
+    module_id = Module.objects.filter(topics=pk) \
+        .values_list('id', flat=True).first()
+    if module_id is None:
+        return None
+
+    texts, _ = module_document_texts([module_id])
+    if module_id not in texts:
+        return None
+
+    for topic in orjson.loads(texts[module_id])['topics']:
+        if topic['id'] == pk:
+            return topic
+    return None
+
+
+def invalidate(module_ids):
+    """
+    Delete the documents of the given modules, and rebuild them once
+    the current transaction commits.
+    """
+    module_ids = set(module_ids)
+    if not module_ids:
+        return
+
+    CurriculumDocument.objects.filter(
+        kind=CurriculumDocument.MODULE,
+        object_id__in=module_ids
+    ).delete()
+
+    if not hasattr(_pending, 'modules'):
+        _pending.modules = set()
+    _pending.modules |= module_ids
+
+    transaction.on_commit(rebuild_pending)
+
+
+def rebuild_pending():
+    """Rebuild every document invalidated since the last rebuild."""
+
+    module_ids = getattr(_pending, 'modules', set())
+    if not module_ids:
+        return
+
+    _pending.modules = set()
+
+    try:
+        _build_module_documents(module_ids, overwrite=True)
+    except Exception:
+        # The data is already committed; documents left missing are
+        # built by the next read
+        logger.exception('Failed to rebuild curriculum documents')
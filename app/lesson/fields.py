@@ -0,0 +1,93 @@
+"""
+Sparse fieldsets and nesting control for curriculum reads.
+
+``?fields=`` limits the fields returned; dotted names reach into nested
+relations, e.g. ``fields=id,topic_name,lessons.lesson_name``.
+
+``?expand=`` names the nested relations to include, e.g.
+``expand=lessons,topic_exercises.exercise_textblocks``. Relations that
+are not named are left out, so ``expand=`` on its own returns no
+nesting at all. Without either parameter the full tree is returned.
+
+Unknown names are ignored.
+"""
+
+
+FIELD_SPEC_CONTEXT_KEY = 'field_spec'
+
+
+def parse_paths(value):
+    """Parse 'a.b,a.c,d' into {'a': {'b': {}, 'c': {}}, 'd': {}}."""
+
+    tree = {}
+    for path in value.split(','):
+        node = tree
+        for name in path.strip().split('.'):
+            if name:
+                node = node.setdefault(name, {})
+    return tree
+
+
+class FieldSpec:
+    """
+    The fields and nested relations to render at one level of a tree.
+
+    ``fields`` and ``expand`` are trees from ``parse_paths``, or None
+    for no limit.
+    """
+
+    def __init__(self, fields=None, expand=None):
+        self.fields = fields
+        self.expand = expand
+
+    @classmethod
+    def from_request(cls, request):
+        """Return the spec for a request, or None if it has none."""
+
+        if request is None:
+            return None
+
+        query_params = getattr(request, 'query_params', request.GET)
+        fields = query_params.get('fields')
+        expand = query_params.get('expand')
+
+        if fields is None and expand is None:
+            return None
+
+        return cls(
+            parse_paths(fields) if fields is not None else None,
+            parse_paths(expand) if expand is not None else None
+        )
+
+    def includes(self, name, nested=False):
+        """Return True if a field, or a nested relation, is rendered."""
+
+        if self.fields is not None and name not in self.fields:
+            return False
+        if nested and self.expand is not None and name not in self.expand:
+            return False
+        return True
+
+    def child(self, name):
+        """Return the spec for the items of a nested relation."""
+
+        fields = None
+        if self.fields is not None:
+            # A bare relation name selects all of its fields
+            fields = self.fields.get(name) or None
+
+        expand = None
+        if self.expand is not None:
+            expand = self.expand.get(name, {})
+
+        return FieldSpec(fields, expand)
+
+    def allows(self, path):
+        """Return True if every relation along a path is rendered."""
+
+        spec = self
+        for name in path:
+            if not spec.includes(name, nested=True):
+                return False
+            spec = spec.child(name)
+        return True
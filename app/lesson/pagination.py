@@ -0,0 +1,105 @@
+import base64
+import json
+
+from django.conf import settings
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, CursorPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+from lesson import search
+
+
+class CurriculumCursorPagination(CursorPagination):
+    """
+    Keyset pagination on the primary key.
+
+    Each page is a single indexed range scan (``id > cursor``) and no
+    ``COUNT(*)`` is run, so the cost of a page does not grow with the
+    size of the catalogue. Nested relations are prefetched for the rows
+    of the current page only.
+    """
+
+    ordering = 'id'
+    page_size_query_param = 'page_size'
+
+    def get_page_size(self, request):
+        # Read at request time so settings overrides apply
+        self.page_size = api_settings.PAGE_SIZE
+        self.max_page_size = settings.LESSON_MAX_PAGE_SIZE
+        return super().get_page_size(request)
+
+
+class SearchPagination(BasePagination):
+    """
+    Keyset pagination of search hits on (rank, type, id).
+
+    Hits are not a queryset, so the cursor holds the key of the last
+    hit on the page and the next page is searched for from there. Only
+    forward paging is supported.
+    """
+
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return api_settings.PAGE_SIZE
+
+        if page_size < 1:
+            return api_settings.PAGE_SIZE
+        return min(page_size, settings.LESSON_MAX_PAGE_SIZE)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            rank, kind, pk = json.loads(base64.urlsafe_b64decode(encoded))
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(rank, (int, float)) or \
+                kind not in search.SEARCHABLE or not isinstance(pk, int):
+            raise NotFound(self.invalid_cursor_message)
+
+        return rank, kind, pk
+
+    def encode_cursor(self, hit):
+        key = [hit['rank'], hit['type'], hit['id']]
+        return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+    def paginate_search(self, find, request):
+        """
+        Return a page of hits from ``find(cursor, limit)``, one more
+        than a page being asked for to tell if another page follows.
+        """
+        self.request = request
+        page_size = self.get_page_size(request)
+
+        hits = find(self.decode_cursor(request), page_size + 1)
+        self.has_next = len(hits) > page_size
+        self.page = hits[:page_size]
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(self.page[-1])
+        )
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': None,
+            'results': data,
+        })
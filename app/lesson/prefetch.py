@@ -0,0 +1,69 @@
+"""
+Prefetch lookups for the nested curriculum serializers.
+
+Each function returns the lookups needed to serialize one level of the
+curriculum and everything nested under it, so that a whole tree loads
+in one query per relation regardless of its size. ``prefix`` is the
+relation path from the queryset's model, and ``code_only`` limits the
+lookups to those needed to find exercise code.
+"""
+from django.db.models import Prefetch
+
+from core.models import Topic, Lesson, Exercise, TextBlock
+
+
+TEXTBLOCK_ORDERING = ['position', 'id']
+
+
+def exercise_lookups(prefix='', code_only=False):
+    if code_only:
+        return []
+
+    return [
+        Prefetch(
+            f'{prefix}exercise_textblocks',
+            queryset=TextBlock.objects.order_by(*TEXTBLOCK_ORDERING)
+        ),
+    ]
+
+
+def lesson_lookups(prefix=''):
+    return [
+        Prefetch(
+            f'{prefix}lesson_textblocks',
+            queryset=TextBlock.objects.order_by(*TEXTBLOCK_ORDERING)
+        ),
+    ]
+
+
+def topic_lookups(prefix='', code_only=False):
+    lookups = [
+        Prefetch(
+            f'{prefix}topic_exercises',
+            queryset=Exercise.objects.order_by('id')
+            .defer('search_vector')
+        ),
+        *exercise_lookups(f'{prefix}topic_exercises__', code_only),
+    ]
+
+    if not code_only:
+        lookups += [
+            Prefetch(
+                f'{prefix}lessons',
+                queryset=Lesson.objects.order_by('id')
+                .defer('search_vector')
+            ),
+            *lesson_lookups(f'{prefix}lessons__'),
+        ]
+
+    return lookups
+
+
+def module_lookups(prefix='', code_only=False):
+    return [
+        Prefetch(
+            f'{prefix}topics',
+            queryset=Topic.objects.order_by('id')
+        ),
+        *topic_lookups(f'{prefix}topics__', code_only),
+    ]
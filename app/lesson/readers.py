@@ -0,0 +1,275 @@
+"""
+Fast read-only rendering for the curriculum read endpoints.
+
+Readers load rows with ``.values()`` and build each item from accessors
+compiled once from the matching serializer's own fields, so the output
+has the same keys, order and values as the serializer without running
+DRF's field machinery for every row. Nested lists are loaded with one
+query per relation. The serializers are still used for writes.
+
+Only plain model fields and the fields named in ``computed`` and
+``nested`` are supported; any other field on the serializer raises
+ImproperlyConfigured rather than silently rendering differently.
+"""
+from operator import itemgetter
+
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import serializers as drf_serializers
+
+from core.models import Language, Module, Topic, Lesson, Exercise, TextBlock
+from lesson import prefetch, serializers
+from lesson.client.S3Client import get_default_client
+
+
+# Serializer fields whose representation of a non-null database value
+# is that value unchanged
+PLAIN_FIELDS = (
+    drf_serializers.CharField,
+    drf_serializers.IntegerField,
+    drf_serializers.ChoiceField,
+    drf_serializers.PrimaryKeyRelatedField,
+)
+
+PLAIN = 'plain'
+COMPUTED = 'computed'
+NESTED = 'nested'
+
+
+class RowReader:
+    """
+    Render rows of ``model`` exactly as ``serializer_class`` does.
+
+    ``computed`` maps method field names to the columns they need; the
+    value comes from ``get_<name>(row)``. ``nested`` maps list field
+    names to (reader class, foreign key on the child model).
+
+    ``field_spec`` limits the fields and relations rendered; columns
+    and relations that are left out are not loaded at all.
+    """
+
+    model = None
+    serializer_class = None
+    ordering = ['id']
+    computed = {}
+    nested = {}
+
+    _compiled = {}
+
+    def __init__(self, context, field_spec=None):
+        self.context = context
+        self.field_spec = field_spec
+
+        self.fields = [
+            field for field in self.compiled()
+            if field_spec is None or
+            field_spec.includes(field[0], nested=field[1] == NESTED)
+        ]
+        self.field_names = {field[0] for field in self.fields}
+
+        columns = ['id']
+        for _, _, _, field_columns in self.fields:
+            columns += field_columns
+        self.columns = list(dict.fromkeys(columns))
+
+    @classmethod
+    def compiled(cls):
+        """
+        Return the serializer's fields as (name, kind, accessor,
+        columns) tuples, compiled on first use.
+        """
+        if cls not in RowReader._compiled:
+            RowReader._compiled[cls] = cls.compile()
+        return RowReader._compiled[cls]
+
+    @classmethod
+    def compile(cls):
+        fields = []
+
+        for name, field in cls.serializer_class().fields.items():
+            if field.write_only:
+                continue
+            if name in cls.nested:
+                fields.append((name, NESTED, None, []))
+            elif name in cls.computed:
+                fields.append(
+                    (name, COMPUTED, f'get_{name}', cls.computed[name])
+                )
+            elif isinstance(field, PLAIN_FIELDS) and \
+                    field.source != '*' and '.' not in field.source:
+                fields.append(
+                    (name, PLAIN, itemgetter(field.source), [field.source])
+                )
+            else:
+                raise ImproperlyConfigured(
+                    f'{cls.__name__} cannot render field {name!r}'
+                )
+
+        return fields
+
+    def rows(self, queryset):
+        """Return a queryset of the rows needed to render ``queryset``."""
+
+        return queryset.prefetch_related(None).values(*self.columns)
+
+    def read(self, queryset):
+        """Return the rendered items for a queryset."""
+
+        return self.render(list(self.rows(queryset)))
+
+    def read_children(self, rows):
+        """Return {field name: {parent id: [items]}} for nested lists."""
+
+        parent_ids = [row['id'] for row in rows]
+        children = {}
+
+        for name, (reader_class, foreign_key) in self.nested.items():
+            if name not in self.field_names:
+                continue
+
+            child_reader = reader_class(
+                self.context,
+                self.field_spec.child(name) if self.field_spec else None
+            )
+            # Children are grouped by the key to their parent
+            columns = list(dict.fromkeys([*child_reader.columns, foreign_key]))
+            child_rows = list(
+                reader_class.model.objects.filter(**{
+                    f'{foreign_key}__in': parent_ids
+                }).order_by(*reader_class.ordering).values(*columns)
+            )
+
+            grouped = {}
+            items = child_reader.render(child_rows)
+            for child_row, item in zip(child_rows, items):
+                grouped.setdefault(child_row[foreign_key], []).append(item)
+            children[name] = grouped
+
+        return children
+
+    def prepare(self, rows):
+        """Hook to load data for a whole batch before rendering."""
+
+    def render(self, rows):
+        if not rows:
+            return []
+
+        self.prepare(rows)
+        children = self.read_children(rows) if self.nested else {}
+
+        accessors = []
+        for name, kind, accessor, _ in self.fields:
+            if kind == COMPUTED:
+                accessor = getattr(self, accessor)
+            accessors.append((name, kind, accessor))
+
+        items = []
+        for row in rows:
+            item = {}
+            for name, kind, accessor in accessors:
+                if kind == NESTED:
+                    item[name] = children[name].get(row['id'], [])
+                else:
+                    item[name] = accessor(row)
+            items.append(self.finish(item, row))
+
+        return items
+
+    def finish(self, item, row):
+        """Hook to adjust an item after its fields are rendered."""
+
+        return item
+
+
+class LanguageReader(RowReader):
+    model = Language
+    serializer_class = serializers.LanguageSerializer
+
+
+class TextBlockReader(RowReader):
+    model = TextBlock
+    serializer_class = serializers.TextBlockSerializer
+    ordering = prefetch.TEXTBLOCK_ORDERING
+    computed = {'image_url': ['image']}
+
+    def get_image_url(self, row):
+        return serializers.image_url(row['image'])
+
+
+class LessonReader(RowReader):
+    model = Lesson
+    serializer_class = serializers.LessonSerializer
+    nested = {'lesson_textblocks': (TextBlockReader, 'lesson')}
+
+
+class ExerciseReader(RowReader):
+    model = Exercise
+    serializer_class = serializers.ExerciseSerializer
+    computed = {
+        'exercise_starter_code': ['starter_code', 'starter_code_inline'],
+        'expected_output_code': ['expected_output', 'expected_output_inline'],
+    }
+    nested = {'exercise_textblocks': (TextBlockReader, 'exercise')}
+
+    def prepare(self, rows):
+        """Fetch the S3 code of every exercise in one batch."""
+
+        context = self.context
+        if serializers.EXERCISE_CODE_CONTEXT_KEY in context:
+            return
+
+        code = {}
+        if serializers.get_code_delivery(context) == \
+                serializers.CODE_DELIVERY_INLINE:
+            fields = [
+                (field, inline_field)
+                for field, inline_field in
+                serializers.INLINE_CODE_FIELDS.items()
+                if serializers.CODE_FIELDS[field] in self.field_names
+            ]
+            keys = [
+                serializers.code_object_key(row[field])
+                for row in rows
+                for field, inline_field in fields
+                if row[field] and row[inline_field] is None
+            ]
+            if keys:
+                code = get_default_client().read_objects(keys)
+
+        context[serializers.EXERCISE_CODE_CONTEXT_KEY] = code
+
+    def read_code(self, row, field):
+        return serializers.read_exercise_code(
+            self.context,
+            row['id'],
+            row[field],
+            row[serializers.INLINE_CODE_FIELDS[field]]
+        )
+
+    def get_exercise_starter_code(self, row):
+        return self.read_code(row, 'starter_code')
+
+    def get_expected_output_code(self, row):
+        return self.read_code(row, 'expected_output')
+
+    def finish(self, item, row):
+        unavailable = self.context.get(
+            serializers.CODE_UNAVAILABLE_CONTEXT_KEY, ()
+        )
+        if row['id'] in unavailable:
+            item['code_unavailable'] = True
+        return item
+
+
+class TopicReader(RowReader):
+    model = Topic
+    serializer_class = serializers.TopicSerializer
+    nested = {
+        'topic_exercises': (ExerciseReader, 'topic'),
+        'lessons': (LessonReader, 'topic'),
+    }
+
+
+class ModuleReader(RowReader):
+    model = Module
+    serializer_class = serializers.ModuleSerializer
+    nested = {'topics': (TopicReader, 'module')}
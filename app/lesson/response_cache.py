@@ -0,0 +1,148 @@
+"""
+Shared cache of curriculum read responses.
+
+Entries are keyed by the response's ETag, which covers the request path,
+query, Accept header and the revisions of every row in the response.
+The save and delete signals bump the revision of a changed row and of
+every row above it, so a change leaves exactly the entries for the
+affected subtree unreachable. They are never served again and age out
+of the cache backend.
+
+The compressed bytes of a cached response are kept alongside it, one
+entry per encoding, so a hit from a client that accepts compression is
+neither rendered nor compressed again.
+
+Hits, misses and rebuild times are counted per worker process.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'lesson:response:'
+
+
+class ResponseCacheStats:
+    """Thread-safe counters for the response cache."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.hits = 0
+            self.compressed_hits = 0
+            self.misses = 0
+            self.rebuilds = 0
+            self.rebuild_seconds = 0.0
+            self.max_rebuild_seconds = 0.0
+
+    def counted(self, hit, compressed=False):
+        with self._lock:
+            if hit:
+                self.hits += 1
+                self.compressed_hits += compressed
+            else:
+                self.misses += 1
+
+    def rebuilt(self, seconds):
+        with self._lock:
+            self.rebuilds += 1
+            self.rebuild_seconds += seconds
+            self.max_rebuild_seconds = max(self.max_rebuild_seconds, seconds)
+
+    def stats(self):
+        """Return the cache counters and rebuild times in seconds."""
+
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'compressed_hits': self.compressed_hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else None,
+                'rebuilds': self.rebuilds,
+                'mean_rebuild_seconds':
+                    self.rebuild_seconds / self.rebuilds
+                    if self.rebuilds else None,
+                'max_rebuild_seconds': self.max_rebuild_seconds,
+            }
+
+
+response_stats = ResponseCacheStats()
+
+
+def enabled():
+    return settings.LESSON_RESPONSE_CACHE_ENABLED
+
+
+def get_cache():
+    return caches[settings.LESSON_RESPONSE_CACHE_ALIAS]
+
+
+def _key(etag, encoding=None):
+    etag = etag.strip('"')
+    return f'{KEY_PREFIX}{encoding}:{etag}' if encoding \
+        else KEY_PREFIX + etag
+
+
+def _read(key):
+    try:
+        return get_cache().get(key)
+    except Exception:
+        logger.exception('Failed to read the response cache')
+        return None
+
+
+def _write(key, value):
+    try:
+        get_cache().set(key, value, settings.LESSON_RESPONSE_CACHE_TIMEOUT)
+    except Exception:
+        logger.exception('Failed to write the response cache')
+
+
+def get_compressed(etag, encoding):
+    """
+    Return (content type, Vary header, compressed bytes) of the
+    response with an ETag, or None. Only hits are counted; a miss falls
+    back to get().
+    """
+    entry = _read(_key(etag, encoding))
+    if entry is not None:
+        response_stats.counted(True, compressed=True)
+    return entry
+
+
+def store_compressed(etag, encoding, content_type, vary, content):
+    """Cache the compressed bytes of the response with an ETag."""
+
+    _write(_key(etag, encoding), (content_type, vary, content))
+
+
+def get(etag):
+    """Return the cached data of the response with an ETag, or None."""
+
+    data = _read(_key(etag))
+    response_stats.counted(data is not None)
+    return data
+
+
+def rebuild(etag, build, cacheable):
+    """
+    Build a response with ``build()`` and cache its data if
+    ``cacheable(response)`` is true.
+    """
+    started = time.perf_counter()
+    response = build()
+    response_stats.rebuilt(time.perf_counter() - started)
+
+    if cacheable(response):
+        _write(_key(etag), response.data)
+
+    return response
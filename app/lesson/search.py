@@ -0,0 +1,195 @@
+"""
+Full-text search over lessons and exercises.
+
+Every lesson and exercise has a ``search_vector`` built from its name
+(weight A), its topic's name (B) and the text of its textblocks (C),
+with a GIN index. Vectors are rebuilt with one UPDATE per model
+whenever a row they are built from changes, so a search only reads
+the index and ranks the rows that match.
+
+Hits from both models are ranked together and paged by keyset on
+(rank, type, id), so a page costs the same however deep it is. Ranks
+are cast to double precision: ts_rank returns a real, which does not
+compare equal to itself once read back into a cursor as a float.
+"""
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (
+    SearchHeadline,
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+)
+from django.db.models import (
+    F,
+    FloatField,
+    OuterRef,
+    Q,
+    Subquery,
+    TextField,
+    Value,
+)
+from django.db.models.functions import Cast, Coalesce, Concat
+
+from core.models import Lesson, Exercise, Topic, TextBlock
+
+
+LESSON = 'lesson'
+EXERCISE = 'exercise'
+
+# Searchable models by hit type, with their name field and the foreign
+# key from their textblocks
+SEARCHABLE = {
+    EXERCISE: (Exercise, 'exercise_name', 'exercise'),
+    LESSON: (Lesson, 'lesson_name', 'lesson'),
+}
+
+
+def _config():
+    return settings.LESSON_SEARCH_CONFIG
+
+
+def _textblock_text(parent_field):
+    """Return the text of a row's textblocks, in order, as a subquery."""
+
+    return Subquery(
+        TextBlock.objects.filter(**{parent_field: OuterRef('pk')})
+        .order_by()
+        .values(parent_field)
+        .annotate(text=StringAgg(
+            'text',
+            ' ',
+            ordering=['position', 'id'],
+            output_field=TextField()
+        ))
+        .values('text')
+    )
+
+
+def vector_expression(name_field, parent_field):
+    """Return the expression a lesson or exercise vector is built from."""
+
+    topic_name = Subquery(
+        Topic.objects.filter(pk=OuterRef('topic_id')).values('topic_name')
+    )
+
+    return (
+        SearchVector(name_field, weight='A', config=_config()) +
+        SearchVector(topic_name, weight='B', config=_config()) +
+        SearchVector(
+            _textblock_text(parent_field), weight='C', config=_config()
+        )
+    )
+
+
+def reindex(paths):
+    """
+    Rebuild the vectors built from the rows on the given curriculum
+    paths: a changed textblock, lesson or exercise changes its own
+    lesson or exercise, and a changed topic all of its rows.
+    """
+    ids = {LESSON: set(), EXERCISE: set()}
+    topic_ids = set()
+
+    for path in paths:
+        found = False
+        for kind in SEARCHABLE:
+            if kind in path:
+                ids[kind].add(path[kind])
+                found = True
+        if not found and 'topic' in path:
+            topic_ids.add(path['topic'])
+
+    for kind, (model, name_field, parent_field) in SEARCHABLE.items():
+        if ids[kind] or topic_ids:
+            model.objects.filter(
+                Q(pk__in=ids[kind]) | Q(topic_id__in=topic_ids)
+            ).update(
+                search_vector=vector_expression(name_field, parent_field)
+            )
+
+
+def _after(kind, cursor):
+    """Return the filter for hits of a type that follow a cursor."""
+
+    if cursor is None:
+        return Q()
+
+    rank, cursor_kind, cursor_id = cursor
+    if kind > cursor_kind:
+        return Q(rank__lte=rank)
+    if kind < cursor_kind:
+        return Q(rank__lt=rank)
+    return Q(rank__lt=rank) | Q(rank=rank, id__gt=cursor_id)
+
+
+def search(text, cursor=None, limit=20):
+    """
+    Return up to ``limit`` hits for a web-style search query, after
+    ``cursor`` (a (rank, type, id) tuple) if given, best first.
+
+    Each hit is a dict with the type, id, name, topic, rank and a
+    snippet of the matching text.
+    """
+    query = SearchQuery(text, search_type='websearch', config=_config())
+    hits = []
+
+    for kind, (model, name_field, parent_field) in SEARCHABLE.items():
+        rows = model.objects.filter(search_vector=query) \
+            .annotate(rank=Cast(
+                SearchRank(F('search_vector'), query), FloatField()
+            )) \
+            .filter(_after(kind, cursor)) \
+            .order_by('-rank', 'id') \
+            .values('id', 'rank', 'topic_id', name=F(name_field))[:limit]
+
+        hits += [{'type': kind, **row} for row in rows]
+
+    hits.sort(key=lambda hit: (-hit['rank'], hit['type'], hit['id']))
+    hits = hits[:limit]
+
+    snippets = _snippets(query, hits)
+    return [
+        {
+            'type': hit['type'],
+            'id': hit['id'],
+            'name': hit['name'],
+            'topic': hit['topic_id'],
+            'rank': hit['rank'],
+            'snippet': snippets.get((hit['type'], hit['id'])),
+        }
+        for hit in hits
+    ]
+
+
+def _snippets(query, hits):
+    """Return {(type, id): snippet} for a page of hits."""
+
+    snippets = {}
+
+    for kind, (model, name_field, parent_field) in SEARCHABLE.items():
+        ids = [hit['id'] for hit in hits if hit['type'] == kind]
+        if not ids:
+            continue
+
+        document = Concat(
+            F(name_field),
+            Value(' '),
+            Coalesce(_textblock_text(parent_field), Value('')),
+            output_field=TextField()
+        )
+        rows = model.objects.filter(pk__in=ids).annotate(
+            snippet=SearchHeadline(
+                document,
+                query,
+                config=_config(),
+                start_sel='<mark>',
+                stop_sel='</mark>',
+                max_words=settings.LESSON_SEARCH_SNIPPET_WORDS,
+                min_words=settings.LESSON_SEARCH_SNIPPET_WORDS // 2,
+            )
+        ).values_list('id', 'snippet')
+
+        snippets.update(((kind, pk), snippet) for pk, snippet in rows)
+
+    return snippets
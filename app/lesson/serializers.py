@@ -1,12 +1,258 @@
 from rest_framework import serializers
 from core import models
-from lesson.client.S3Client import S3Client
+from lesson.client.S3Client import get_default_client, S3WriteError
+from lesson.fields import FIELD_SPEC_CONTEXT_KEY
 from django.conf import settings
+from django.db.models import Manager
 
 import os
+import urllib.parse
 
+from collections import OrderedDict
 
-class LanguageSerializer(serializers.ModelSerializer):
+
+EXERCISE_CODE_CONTEXT_KEY = 'exercise_code'
+
+# Ids of exercises whose code could not be read for this response
+CODE_UNAVAILABLE_CONTEXT_KEY = 'exercise_code_unavailable'
+
+# How exercise code is delivered to clients: the code itself, a
+# short-lived presigned S3 URL, or a URL on the bucket's public domain
+CODE_DELIVERY_INLINE = 'inline'
+CODE_DELIVERY_PRESIGNED = 'presigned'
+CODE_DELIVERY_PUBLIC = 'public'
+CODE_DELIVERY_CHOICES = [
+    CODE_DELIVERY_INLINE,
+    CODE_DELIVERY_PRESIGNED,
+    CODE_DELIVERY_PUBLIC,
+]
+
+
+# Maps each S3 code key field on Exercise to its inline counterpart
+INLINE_CODE_FIELDS = {
+    'starter_code': 'starter_code_inline',
+    'expected_output': 'expected_output_inline',
+}
+
+
+# Maps each S3 code key field on Exercise to the field rendering it
+CODE_FIELDS = {
+    'starter_code': 'exercise_starter_code',
+    'expected_output': 'expected_output_code',
+}
+
+
+def code_object_key(code_id):
+    """Return the S3 key a piece of exercise code is stored under."""
+
+    return f'{code_id}.txt'
+
+
+def fits_inline(code):
+    """Return True if code is small enough to store in the database."""
+
+    max_bytes = settings.EXERCISE_INLINE_CODE_MAX_BYTES
+    return len(code.encode('utf-8')) <= max_bytes
+
+
+def get_code_delivery(context):
+    """
+    Return the code delivery mode for a response, taken from the
+    context, the ``code_delivery`` query parameter or the project
+    default.
+    """
+    request = context.get('request')
+    mode = context.get('code_delivery')
+
+    if mode is None and request is not None:
+        query_params = getattr(request, 'query_params', request.GET)
+        mode = query_params.get('code_delivery')
+
+    if mode not in CODE_DELIVERY_CHOICES:
+        mode = settings.EXERCISE_CODE_DELIVERY
+
+    return mode
+
+
+def iter_exercises(instance, spec=None):
+    """
+    Yield (exercise, field spec) for every exercise nested under a
+    module, topic or exercise, skipping relations the spec leaves out.
+    """
+    if isinstance(instance, models.Module):
+        relation = 'topics'
+    elif isinstance(instance, models.Topic):
+        relation = 'topic_exercises'
+    elif isinstance(instance, models.Exercise):
+        yield instance, spec
+        return
+    else:
+        return
+
+    if spec is not None:
+        if not spec.includes(relation, nested=True):
+            return
+        spec = spec.child(relation)
+
+    for child in getattr(instance, relation).all():
+        yield from iter_exercises(child, spec)
+
+
+def exercise_code_keys(instances, spec=None):
+    """
+    Return the S3 keys of all code stored for the given instances,
+    leaving out code fields the spec does not render.
+    """
+    keys = []
+    for instance in instances:
+        for exercise, exercise_spec in iter_exercises(instance, spec):
+            for field, inline_field in INLINE_CODE_FIELDS.items():
+                if exercise_spec is not None and \
+                        not exercise_spec.includes(CODE_FIELDS[field]):
+                    continue
+
+                code_id = getattr(exercise, field)
+                if code_id and getattr(exercise, inline_field) is None:
+                    keys.append(code_object_key(code_id))
+
+    return keys
+
+
+def prefetch_exercise_code(instances, context):
+    """
+    Fetch the code for every exercise under the given instances
+    concurrently, returning a dict of S3 key to code.
+
+    Nothing is fetched when the response delivers code as URLs.
+    """
+    if get_code_delivery(context) != CODE_DELIVERY_INLINE:
+        return {}
+
+    keys = exercise_code_keys(instances, context.get(FIELD_SPEC_CONTEXT_KEY))
+    if not keys:
+        return {}
+
+    return get_default_client().read_objects(keys)
+
+
+def image_url(name):
+    """Return the URL of an uploaded image, or None if there is none."""
+
+    if name:
+        BUCKET_URL = settings.AWS_S3_CUSTOM_DOMAIN
+        url = f'https://{BUCKET_URL}/{name}'
+        return url
+    else:
+        return None
+
+
+def read_exercise_code(context, exercise_id, code_id, inline_code):
+    """
+    Return an exercise's code from the row if stored inline,
+    otherwise from the prefetched batch, falling back to S3.
+
+    In presigned or public delivery modes a URL to the code is
+    returned instead. If the code cannot be read, None is returned
+    and the exercise is flagged with ``code_unavailable``.
+    """
+    delivery = get_code_delivery(context)
+
+    if inline_code is not None:
+        if delivery != CODE_DELIVERY_INLINE:
+            return 'data:text/plain;charset=utf-8,' + \
+                urllib.parse.quote(inline_code)
+        return inline_code
+
+    if not code_id:
+        return None
+
+    key = code_object_key(code_id)
+
+    if delivery == CODE_DELIVERY_PRESIGNED:
+        return get_default_client().presigned_url(key)
+    if delivery == CODE_DELIVERY_PUBLIC:
+        return f'https://{settings.AWS_S3_CUSTOM_DOMAIN}/{key}'
+
+    prefetched = context.get(EXERCISE_CODE_CONTEXT_KEY, {})
+
+    if key in prefetched:
+        code = prefetched[key]
+    else:
+        code = get_default_client().read_object_or_none(key)
+
+    if code is None:
+        # Degrade to a null field rather than failing the response
+        context.setdefault(CODE_UNAVAILABLE_CONTEXT_KEY, set()) \
+            .add(exercise_id)
+
+    return code
+
+
+class SparseFieldsMixin:
+    """
+    Leave out the fields and nested relations that the request's field
+    spec does not ask for.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+
+        spec = self.context.get(FIELD_SPEC_CONTEXT_KEY)
+        if spec is None:
+            return fields
+
+        # Find this serializer's place in the tree from its parents
+        path = []
+        node = self
+        while node.parent is not None:
+            if node.field_name:
+                path.append(node.field_name)
+            node = node.parent
+
+        for name in reversed(path):
+            spec = spec.child(name)
+
+        return OrderedDict(
+            (name, field) for name, field in fields.items()
+            if spec.includes(
+                name,
+                nested=isinstance(field, serializers.BaseSerializer)
+            )
+        )
+
+
+class ExerciseCodeListSerializer(serializers.ListSerializer):
+    """
+    List serializer which fetches the exercise code for the whole
+    response before rendering any item.
+    """
+
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, Manager) else data
+
+        if EXERCISE_CODE_CONTEXT_KEY not in self.context:
+            iterable = list(iterable)
+            self.context[EXERCISE_CODE_CONTEXT_KEY] = \
+                prefetch_exercise_code(iterable, self.context)
+
+        return super().to_representation(iterable)
+
+
+class ExerciseCodeMixin:
+    """
+    Fetch exercise code up front when serializing a single instance
+    that is not already part of a prefetched response.
+    """
+
+    def to_representation(self, instance):
+        if EXERCISE_CODE_CONTEXT_KEY not in self.context:
+            self.context[EXERCISE_CODE_CONTEXT_KEY] = \
+                prefetch_exercise_code([instance], self.context)
+
+        return super().to_representation(instance)
+
+
+class LanguageSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for Language Model"""
 
     class Meta:
@@ -16,14 +262,14 @@ class LanguageSerializer(serializers.ModelSerializer):
 
 
 
-class TextBlockSerializer(serializers.ModelSerializer):
+class TextBlockSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for Text Blocks"""
 
     image_url = serializers.SerializerMethodField()
 
     class Meta:
         model = models.TextBlock
-        exclude = ['image']
+        exclude = ['image', 'position', 'revision']
     
 
     def create(self, validated_data):
@@ -31,24 +277,127 @@ class TextBlockSerializer(serializers.ModelSerializer):
 
         textblock = models.TextBlock.objects.create(**validated_data)
         return textblock
+
+    def update(self, instance, validated_data):
+        """
+        Update a textblock, placing it again by paragraph number if
+        that or its parent changes.
+        """
+        if any(
+            field in validated_data and
+            validated_data[field] != getattr(instance, field)
+            for field in ('paragraph_number', 'lesson', 'exercise')
+        ):
+            instance.position = None
+
+        return super().update(instance, validated_data)
     
     def get_image_url(self, obj):
-        if obj.image:
-            BUCKET_URL = settings.AWS_S3_CUSTOM_DOMAIN
-            url = f'https://{BUCKET_URL}/{obj.image.name}'
-            return url
-        else:
-            return None
- 
-
-class LessonSerializer(serializers.ModelSerializer):
+        return image_url(obj.image.name if obj.image else None)
+
+
+class TextBlockBulkItemSerializer(serializers.ModelSerializer):
+    """A textblock in a bulk change; blocks with an id are updated."""
+
+    id = serializers.IntegerField(required=False)
+
+    class Meta:
+        model = models.TextBlock
+        fields = ['id', 'text', 'text_format']
+        extra_kwargs = {'text_format': {'required': False}}
+
+
+class TextBlockMoveSerializer(serializers.Serializer):
+    """Where to move a textblock within its lesson or exercise."""
+
+    after = serializers.PrimaryKeyRelatedField(
+        queryset=models.TextBlock.objects.all(),
+        allow_null=True
+    )
+
+    def validate_after(self, value):
+        """Check the block to move after, or None for first, is a sibling."""
+
+        textblock = self.context['textblock']
+
+        if value is not None and \
+                not textblock.siblings().filter(pk=value.pk).exists():
+            raise serializers.ValidationError(
+                'Textblocks can only be moved after another textblock '
+                'of the same lesson or exercise.'
+            )
+
+        return value
+
+
+class TextBlockBulkSerializer(serializers.Serializer):
+    """The complete, ordered list of textblocks of a lesson or exercise."""
+
+    lesson = serializers.PrimaryKeyRelatedField(
+        queryset=models.Lesson.objects.all(),
+        required=False
+    )
+    exercise = serializers.PrimaryKeyRelatedField(
+        queryset=models.Exercise.objects.all(),
+        required=False
+    )
+    textblocks = TextBlockBulkItemSerializer(many=True)
+
+    def validate_textblocks(self, value):
+        if len(value) > settings.LESSON_BULK_MAX_TEXTBLOCKS:
+            raise serializers.ValidationError(
+                f'At most {settings.LESSON_BULK_MAX_TEXTBLOCKS} textblocks '
+                'can be sent at once.'
+            )
+
+        ids = [item['id'] for item in value if 'id' in item]
+        if len(ids) != len(set(ids)):
+            raise serializers.ValidationError(
+                'A textblock is listed more than once.'
+            )
+
+        if any('id' not in item and 'text_format' not in item
+               for item in value):
+            raise serializers.ValidationError(
+                'New textblocks need a text_format.'
+            )
+
+        return value
+
+    def validate(self, attrs):
+        parents = [
+            field for field in ('lesson', 'exercise') if attrs.get(field)
+        ]
+        if len(parents) != 1:
+            raise serializers.ValidationError(
+                'Set exactly one of lesson or exercise.'
+            )
+
+        parent_field = parents[0]
+        ids = {item['id'] for item in attrs['textblocks'] if 'id' in item}
+        owned = set(models.TextBlock.objects.filter(
+            pk__in=ids,
+            **{parent_field: attrs[parent_field]}
+        ).values_list('id', flat=True))
+
+        if ids - owned:
+            raise serializers.ValidationError({
+                'textblocks': f'Textblocks {sorted(ids - owned)} do not '
+                              f'belong to this {parent_field}.'
+            })
+
+        attrs['parent_field'] = parent_field
+        return attrs
+
+
+class LessonSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for Lessons"""
 
     lesson_textblocks = TextBlockSerializer(many=True, required=False)
 
     class Meta:
         model = models.Lesson
-        fields = '__all__'
+        exclude = ['revision', 'search_vector']
     
     def create(self, validated_data):
         """Create a lesson."""
@@ -57,71 +406,108 @@ class LessonSerializer(serializers.ModelSerializer):
         return lesson
 
 
-class ExerciseSerializer(serializers.ModelSerializer):
+class ExerciseSerializer(SparseFieldsMixin, ExerciseCodeMixin,
+                         serializers.ModelSerializer):
     """Serializer for Exercises"""    
 
 
+    # The code itself, which is stored inline or in S3 on save; the
+    # model fields only hold S3 keys, so they cannot limit its length
+    starter_code = serializers.CharField(
+        write_only=True, required=False, allow_blank=True, allow_null=True
+    )
+    expected_output = serializers.CharField(
+        write_only=True, required=False, allow_blank=True, allow_null=True
+    )
+
     exercise_starter_code = serializers.SerializerMethodField()
     expected_output_code = serializers.SerializerMethodField()
     exercise_textblocks = TextBlockSerializer(many=True, required=False)
 
     class Meta:
         model = models.Exercise
-        fields = '__all__'
+        exclude = [
+            *INLINE_CODE_FIELDS.values(), 'revision', 'search_vector'
+        ]
+        list_serializer_class = ExerciseCodeListSerializer
     
-    def create(self, validated_data):
-        """Create an exercise"""
-        starter_code = validated_data.pop('starter_code', '')
-        expected_output = validated_data.pop('expected_output', '')
-        
-        starter_code_id = self.write_to_s3_object(starter_code)
-        if starter_code_id:
-            expected_output_id = self.write_to_s3_object(expected_output)
-            if expected_output_id:
-                exercise = models.Exercise.objects.create(
-                    **validated_data, 
-                    starter_code=starter_code_id, 
-                    expected_output=expected_output_id
+    def store_code(self, validated_data, fields):
+        """
+        Replace the code posted for ``fields`` in validated_data with
+        the values of the S3 key and inline fields that store it.
+
+        Small code is stored inline on the row; larger code is uploaded
+        to S3 concurrently, and the row is only saved once every upload
+        succeeds.
+        """
+        code = {
+            field: validated_data.pop(field, None) or '' for field in fields
+        }
+
+        for field in fields:
+            inline_field = INLINE_CODE_FIELDS[field]
+            if fits_inline(code[field]):
+                validated_data[field] = None
+                validated_data[inline_field] = code.pop(field)
+            else:
+                validated_data[inline_field] = None
+
+        if code:
+            try:
+                results = get_default_client().write_objects(
+                    list(code.values())
                 )
-                print('CREATED EXERCISE: ', exercise)
-                return exercise
-        else:
-            error = 'Error saving code to S3. Cancelling post...'
-            return serializers.ValidationError(error)
+            except S3WriteError:
+                error = 'Error saving code to S3. Cancelling post...'
+                raise serializers.ValidationError(error)
+
+            for field, (file_id, _) in zip(code, results):
+                validated_data[field] = file_id
+
+    def create(self, validated_data):
+        """Create an exercise, storing its code inline or in S3."""
+
+        self.store_code(validated_data, list(INLINE_CODE_FIELDS))
+
+        # Uploaded code is left in S3 if the row is not created; see
+        # S3Client.write_objects
+        return models.Exercise.objects.create(**validated_data)
+
+    def update(self, instance, validated_data):
+        """Update an exercise, storing any new code like create()."""
+
+        self.store_code(validated_data, [
+            field for field in INLINE_CODE_FIELDS if field in validated_data
+        ])
+
+        return super().update(instance, validated_data)
     
     def get_exercise_starter_code(self, obj):
-        client = S3Client(
-            region='us-east-2',
-            access_key=settings.AWS_ACCESS_KEY_ID,
-            secret_key=settings.AWS_SECRET_ACCESS_KEY
-        )
-
-        starter_code = client.read_object(f'{obj.starter_code}.txt')
-        return starter_code
+        return self.read_code(obj, 'starter_code')
     
     def get_expected_output_code(self, obj):
-        client = S3Client(
-            region='us-east-2',
-            access_key=settings.AWS_ACCESS_KEY_ID,
-            secret_key=settings.AWS_SECRET_ACCESS_KEY
+        return self.read_code(obj, 'expected_output')
+
+    def read_code(self, obj, field):
+        return read_exercise_code(
+            self.context,
+            obj.pk,
+            getattr(obj, field),
+            getattr(obj, INLINE_CODE_FIELDS[field])
         )
 
-        starter_code = client.read_object(f'{obj.expected_output}.txt')
-        return starter_code
-    
-    def write_to_s3_object(self, string):
+    def to_representation(self, instance):
+        ret = super().to_representation(instance)
 
-        client = S3Client(
-            region='us-east-2',
-            access_key=settings.AWS_ACCESS_KEY_ID,
-            secret_key=settings.AWS_SECRET_ACCESS_KEY
-        )
+        unavailable = self.context.get(CODE_UNAVAILABLE_CONTEXT_KEY, ())
+        if instance.pk in unavailable:
+            ret['code_unavailable'] = True
 
-        res = client.write_object(string)
-        return res
+        return ret
 
 
-class TopicSerializer(serializers.ModelSerializer):
+class TopicSerializer(SparseFieldsMixin, ExerciseCodeMixin,
+                      serializers.ModelSerializer):
     """Serializer for Topic Models"""
 
     topic_exercises = ExerciseSerializer(many=True, required=False)
@@ -129,21 +515,26 @@ class TopicSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = models.Topic
-        fields = '__all__'
+        exclude = [
+            'revision', 'lesson_count', 'exercise_count', 'textblock_count'
+        ]
+        list_serializer_class = ExerciseCodeListSerializer
     
     def create(self, validated_data):
         topic = models.Topic.objects.create(**validated_data)
         return topic
 
 
-class ModuleSerializer(serializers.ModelSerializer):
+class ModuleSerializer(SparseFieldsMixin, ExerciseCodeMixin,
+                       serializers.ModelSerializer):
     """Serializer for Modules"""
 
     topics = TopicSerializer(many=True, required=False)
     
     class Meta:
         model = models.Module
-        fields = '__all__'
+        exclude = ['revision', 'topic_count']
+        list_serializer_class = ExerciseCodeListSerializer
     
 
     def create(self, validated_data):
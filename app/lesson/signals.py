@@ -0,0 +1,278 @@
+"""
+Keep data derived from the curriculum in step with the rows it is
+built from.
+"""
+import threading
+
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.db.models.signals import (
+    pre_save,
+    post_save,
+    pre_delete,
+    post_delete,
+)
+
+from core.models import Language, Module, Topic, Lesson, Exercise, TextBlock
+from lesson import counters, documents, search
+
+
+CURRICULUM_MODELS = (Language, Module, Topic, Lesson, Exercise, TextBlock)
+
+# Curriculum levels from the top down, as keyed in curriculum paths
+LEVEL_MODELS = {
+    'language': Language,
+    'module': Module,
+    'topic': Topic,
+    'lesson': Lesson,
+    'exercise': Exercise,
+    'textblock': TextBlock,
+}
+
+# Lookups from a textblock's lesson or exercise to the rows above it
+PARENT_LOOKUPS = {
+    'topic': 'topic',
+    'module': 'topic__module',
+    'language': 'topic__module__language',
+}
+
+_local = threading.local()
+
+
+@contextmanager
+def suspended():
+    """
+    Skip the per-row signal handling below, for bulk changes that call
+    curriculum_changed() once for the whole batch instead.
+    """
+    previous = getattr(_local, 'suspended', False)
+    _local.suspended = True
+    try:
+        yield
+    finally:
+        _local.suspended = previous
+
+
+def _handles(raw=False):
+    return not raw and not getattr(_local, 'suspended', False)
+
+
+def _topic_path(topic_id):
+    row = Topic.objects.filter(pk=topic_id) \
+        .values('module_id', 'module__language_id').first()
+    if row is None:
+        return {}
+
+    return {
+        'topic': topic_id,
+        'module': row['module_id'],
+        'language': row['module__language_id'],
+    }
+
+
+def curriculum_path(instance):
+    """
+    Return the ids of a curriculum row and of every row above it,
+    keyed by level ('language', 'module', 'topic', 'lesson',
+    'exercise', 'textblock').
+    """
+    if isinstance(instance, Language):
+        path = {}
+    elif isinstance(instance, Module):
+        path = {'language': instance.language_id}
+    elif isinstance(instance, Topic):
+        path = {
+            'module': instance.module_id,
+            'language': Module.objects.filter(pk=instance.module_id)
+            .values_list('language_id', flat=True).first(),
+        }
+    elif isinstance(instance, (Lesson, Exercise)):
+        path = _topic_path(instance.topic_id)
+    else:
+        path = {}
+        for level, model in (('lesson', Lesson), ('exercise', Exercise)):
+            parent_id = getattr(instance, f'{level}_id')
+            topic_id = model.objects.filter(pk=parent_id) \
+                .values_list('topic_id', flat=True).first()
+            if topic_id is not None:
+                path.update(_topic_path(topic_id))
+                path[level] = parent_id
+
+    path[type(instance).__name__.lower()] = instance.pk
+    return {level: pk for level, pk in path.items() if pk is not None}
+
+
+def bump_revisions(paths):
+    """
+    Increment the revision of every row on the given paths.
+
+    Rows are updated from the top of the tree down, so concurrent
+    writers always take row locks in the same order.
+    """
+    for level, model in LEVEL_MODELS.items():
+        ids = {path[level] for path in paths if level in path}
+        if ids:
+            model.objects.filter(pk__in=ids) \
+                .update(revision=F('revision') + 1)
+
+
+def curriculum_changed(paths):
+    """Invalidate everything derived from the rows on the given paths."""
+
+    bump_revisions(paths)
+    search.reindex(paths)
+    documents.invalidate(
+        {path['module'] for path in paths if 'module' in path}
+    )
+
+
+def _under(level, pk, parent):
+    """
+    Return a filter for the textblocks whose ``parent`` ('lesson' or
+    'exercise') is deleted with the ``level`` row ``pk``.
+    """
+    if level == parent:
+        return Q(**{parent: pk})
+    if level in PARENT_LOOKUPS:
+        return Q(**{f'{parent}__{PARENT_LOOKUPS[level]}': pk})
+    return Q(pk__in=[])
+
+
+def _shared_paths(level, pk):
+    """
+    Return the paths of the lessons and exercises that share a textblock
+    with one deleted with the ``level`` row ``pk``.
+    """
+    lesson = _under(level, pk, 'lesson')
+    exercise = _under(level, pk, 'exercise')
+
+    rows = TextBlock.objects.filter(
+        (lesson & Q(exercise__isnull=False) & ~exercise) |
+        (exercise & Q(lesson__isnull=False) & ~lesson)
+    ).values(
+        'lesson', 'lesson__topic', 'lesson__topic__module',
+        'exercise', 'exercise__topic', 'exercise__topic__module',
+    )
+
+    return [
+        {
+            'module': row[f'{parent}__topic__module'],
+            'topic': row[f'{parent}__topic'],
+            parent: row[parent],
+        }
+        for row in rows
+        for parent in ('lesson', 'exercise')
+    ]
+
+
+def delete_curriculum(instance):
+    """
+    Delete a curriculum row and the rows below it, updating what is
+    derived from them once for the whole cascade.
+
+    The cascade runs with the per-row handlers suspended, so deleting a
+    populated module runs the same queries as deleting an empty one.
+    """
+    level = type(instance).__name__.lower()
+
+    with transaction.atomic():
+        path = curriculum_path(instance)
+        if level == 'textblock':
+            # The block's lesson or exercise is rebuilt without it
+            changed = [path]
+        else:
+            changed = _shared_paths(level, instance.pk)
+
+        # Locks the tree from the top down before any row is deleted
+        bump_revisions([path, *changed])
+        counters.removed(level, path, TextBlock.objects.filter(
+            _under(level, instance.pk, 'lesson') |
+            _under(level, instance.pk, 'exercise')
+        ))
+
+        with suspended():
+            instance.delete()
+
+        search.reindex(changed)
+        documents.invalidate(
+            {row['module'] for row in [path, *changed] if 'module' in row}
+        )
+
+
+def prepare_curriculum_save(sender, instance, raw=False, **kwargs):
+    """Record where an existing row sat before it is saved."""
+
+    if not _handles(raw):
+        return
+
+    previous = None
+    if instance.pk is not None:
+        previous = sender.objects.filter(pk=instance.pk).first()
+
+    # A row moved to another parent also changes its old tree
+    instance._previous_curriculum_path = \
+        curriculum_path(previous) if previous else None
+
+    if not instance._state.adding:
+        # Keep the stored revision and counts rather than writing back
+        # ones read earlier; only bump_revisions and counters change them
+        instance.revision = F('revision')
+        for field in counters.COUNTER_FIELDS.get(sender, []):
+            setattr(instance, field, F(field))
+
+
+def curriculum_saved(sender, instance, created=False, raw=False, **kwargs):
+    if not _handles(raw):
+        return
+
+    level = sender.__name__.lower()
+    paths = [curriculum_path(instance)]
+
+    previous = getattr(instance, '_previous_curriculum_path', None)
+    if previous and previous != paths[0]:
+        paths.append(previous)
+
+    curriculum_changed(paths)
+
+    if created:
+        counters.adjust(level, paths[0], 1)
+    elif previous:
+        counters.moved(level, previous, paths[0])
+
+    instance.refresh_from_db(
+        fields=['revision', *counters.COUNTER_FIELDS.get(sender, [])]
+    )
+
+
+def prepare_curriculum_delete(sender, instance, **kwargs):
+    """
+    Record where a row sits before it is deleted. A cascade may delete
+    the rows above it first, so its path cannot be found afterwards.
+    """
+    if _handles():
+        instance._deleted_curriculum_path = curriculum_path(instance)
+
+
+def curriculum_deleted(sender, instance, **kwargs):
+    """
+    Handle a row deleted without delete_curriculum(), one row of a
+    cascade at a time.
+    """
+    if not _handles():
+        return
+
+    path = getattr(instance, '_deleted_curriculum_path', None)
+    if path is None:
+        path = curriculum_path(instance)
+
+    curriculum_changed([path])
+    counters.adjust(sender.__name__.lower(), path, -1)
+
+
+for model in CURRICULUM_MODELS:
+    pre_save.connect(prepare_curriculum_save, sender=model)
+    post_save.connect(curriculum_saved, sender=model)
+    pre_delete.connect(prepare_curriculum_delete, sender=model)
+    post_delete.connect(curriculum_deleted, sender=model)
@@ -0,0 +1,177 @@
+"""Tests for the async curriculum views"""
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core import models
+from lesson.client.S3Client import code_cache
+
+from moto import mock_s3
+
+import boto3
+import json
+
+
+ASYNC_MODULE_LIST_URL = reverse('lesson:async-module-list')
+ASYNC_TOPIC_LIST_URL = reverse('lesson:async-topic-list')
+MODULE_LIST_URL = reverse('lesson:module-list')
+TOPIC_LIST_URL = reverse('lesson:topic-list')
+
+
+def async_topic_detail_url(topic_id):
+    return reverse('lesson:async-topic-detail', args=[topic_id])
+
+
+class PublicAsyncViewTests(TestCase):
+    """Tests for unauthenticated requests to the async views."""
+
+    def test_auth_required(self):
+        """Test 401 returned without a token."""
+
+        res = APIClient().get(ASYNC_MODULE_LIST_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@mock_s3
+class PrivateAsyncViewTests(TestCase):
+    """Tests for authenticated requests to the async views."""
+
+    def setUp(self):
+        code_cache.clear()
+
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='testpass123'
+        )
+        token = Token.objects.create(user=self.user)
+
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        s3_client = boto3.client('s3')
+        bucket_name = settings.AWS_STORAGE_BUCKET_NAME
+        s3_client.create_bucket(Bucket=bucket_name)
+
+        language = models.Language.objects.create(language_name='Test')
+        module = models.Module.objects.create(
+            language=language,
+            module_name='Test Module'
+        )
+        self.topic = models.Topic.objects.create(
+            module=module,
+            topic_name='Test Topic'
+        )
+        lesson = models.Lesson.objects.create(
+            topic=self.topic,
+            lesson_name='Test Lesson'
+        )
+        models.TextBlock.objects.create(
+            lesson=lesson,
+            text='Test Text',
+            text_format=1,
+            paragraph_number=1
+        )
+
+        for i in range(3):
+            s3_client.put_object(
+                Bucket=bucket_name,
+                Body=f'starter {i}',
+                Key=f'starter-{i}.txt'
+            )
+            exercise = models.Exercise.objects.create(
+                topic=self.topic,
+                exercise_name=f'Test Exercise {i}',
+                starter_code=f'starter-{i}',
+                expected_output_inline=f'output {i}'
+            )
+            models.TextBlock.objects.create(
+                exercise=exercise,
+                text='Exercise Text',
+                text_format=1,
+                paragraph_number=1
+            )
+
+    def test_module_list_matches_sync_view(self):
+        """Test the async module list returns the same JSON."""
+
+        res = self.client.get(ASYNC_MODULE_LIST_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        sync_res = self.client.get(MODULE_LIST_URL)
+        self.assertEqual(json.loads(res.content), json.loads(sync_res.content))
+
+        module = json.loads(res.content)['results'][0]
+        exercises = module['topics'][0]['topic_exercises']
+        self.assertEqual(exercises[0]['exercise_starter_code'], 'starter 0')
+        self.assertEqual(exercises[0]['expected_output_code'], 'output 0')
+
+    def test_topic_list_matches_sync_view(self):
+        """Test the async topic list returns the same JSON."""
+
+        res = self.client.get(ASYNC_TOPIC_LIST_URL)
+        sync_res = self.client.get(TOPIC_LIST_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(res.content), json.loads(sync_res.content))
+
+    def test_topic_detail_not_found(self):
+        """Test 404 returned for a missing topic."""
+
+        res = self.client.get(async_topic_detail_url(self.topic.id + 1))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_topic_list_paginated(self):
+        """Test the async topic list is paged like the sync view."""
+
+        for i in range(2):
+            models.Topic.objects.create(
+                module=self.topic.module,
+                topic_name=f'Topic {i}'
+            )
+
+        res = self.client.get(ASYNC_TOPIC_LIST_URL, {'page_size': 2})
+        sync_res = self.client.get(TOPIC_LIST_URL, {'page_size': 2})
+
+        data = json.loads(res.content)
+        sync_data = json.loads(sync_res.content)
+        self.assertEqual(data['results'], sync_data['results'])
+        self.assertIsNotNone(data['next'])
+
+        results = json.loads(self.client.get(data['next']).content)['results']
+        self.assertEqual(
+            [topic['topic_name'] for topic in results],
+            ['Topic 1']
+        )
+
+    def test_topic_list_sparse_fields(self):
+        """Test ?fields= and ?expand= match the sync view."""
+
+        params = {'fields': 'id,topic_name,lessons', 'expand': 'lessons'}
+
+        res = self.client.get(ASYNC_TOPIC_LIST_URL, params)
+        sync_res = self.client.get(TOPIC_LIST_URL, params)
+
+        self.assertEqual(json.loads(res.content), json.loads(sync_res.content))
+        self.assertEqual(
+            set(json.loads(res.content)['results'][0]),
+            {'id', 'topic_name', 'lessons'}
+        )
+
+    def test_topic_detail_not_modified(self):
+        """Test a matching If-None-Match is answered with 304."""
+
+        url = async_topic_detail_url(self.topic.id)
+        res = self.client.get(url)
+        self.assertTrue(res.has_header('ETag'))
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=res['ETag'])
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        models.Lesson.objects.create(topic=self.topic, lesson_name='New')
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=res['ETag'])
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
@@ -0,0 +1,325 @@
+"""
+Query count, S3 call and latency regression suite for lesson endpoints.
+
+Seeds a curriculum whose size is set with environment variables, e.g.
+
+    LESSON_BENCH_LANGUAGES=10 LESSON_BENCH_MODULES=20 \\
+    LESSON_BENCH_TOPICS=30 python manage.py test lesson.tests.test_benchmarks
+
+and records query counts, S3 GET calls and wall time for every list and
+retrieve endpoint. The defaults are kept small so the suite runs with
+the rest of the tests. Set LESSON_BENCH_MAX_MS to also fail on slow
+endpoints. The CPU time of the serializers and the fast readers is
+also compared on a lesson of LESSON_BENCH_LESSON_TEXTBLOCKS blocks, and
+the encode time and payload size of the JSON and MessagePack renderers
+on the seeded module trees, averaged over LESSON_BENCH_RENDER_ROUNDS.
+"""
+import json
+import os
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from app.renderers import ORJSONRenderer, MessagePackRenderer
+from core import models
+from lesson import readers, serializers, prefetch
+from lesson.client import S3Client as s3_client
+
+from moto import mock_s3
+
+import boto3
+import msgpack
+
+
+def bench_setting(name, default):
+    return int(os.environ.get(f'LESSON_BENCH_{name}', default))
+
+
+LANGUAGES = bench_setting('LANGUAGES', 1)
+MODULES = bench_setting('MODULES', 2)
+TOPICS = bench_setting('TOPICS', 3)
+ITEMS = bench_setting('ITEMS', 2)
+TEXTBLOCKS = bench_setting('TEXTBLOCKS', 3)
+MAX_MS = bench_setting('MAX_MS', 0)
+# Size of the lesson used to compare serializer and reader CPU time
+LESSON_TEXTBLOCKS = bench_setting('LESSON_TEXTBLOCKS', 1000)
+# Times each renderer encodes the module trees
+RENDER_ROUNDS = bench_setting('RENDER_ROUNDS', 20)
+
+# Number of distinct code objects shared by the seeded exercises
+CODE_OBJECTS = 5
+
+RESOURCES = ['language', 'module', 'topic', 'lesson', 'exercise', 'textblock']
+
+
+def seed_curriculum(s3, suffix=''):
+    """
+    Create a curriculum of the configured size, with exercise code
+    stored in S3 (large enough to bypass the inline tier).
+    """
+    code_ids = []
+    for i in range(CODE_OBJECTS):
+        code = f'// code {i}\n' + 'x = 1\n' * 1000
+        file_id = s3_client.content_hash(code)
+        s3.put_object(
+            Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+            Body=code,
+            Key=f'{file_id}.txt'
+        )
+        code_ids.append(file_id)
+
+    languages = models.Language.objects.bulk_create(
+        models.Language(language_name=f'Language {i}{suffix}')
+        for i in range(LANGUAGES)
+    )
+    modules = models.Module.objects.bulk_create(
+        models.Module(language=language, module_name=f'Module {i}')
+        for language in languages for i in range(MODULES)
+    )
+    topics = models.Topic.objects.bulk_create(
+        models.Topic(module=module, topic_name=f'Topic {i}')
+        for module in modules for i in range(TOPICS)
+    )
+    lessons = models.Lesson.objects.bulk_create(
+        models.Lesson(topic=topic, lesson_name=f'Lesson {i}')
+        for topic in topics for i in range(ITEMS)
+    )
+    exercises = models.Exercise.objects.bulk_create(
+        models.Exercise(
+            topic=topic,
+            exercise_name=f'Exercise {i}',
+            starter_code=code_ids[i % CODE_OBJECTS],
+            expected_output=code_ids[(i + 1) % CODE_OBJECTS]
+        )
+        for topic in topics for i in range(ITEMS)
+    )
+
+    textblocks = [
+        models.TextBlock(
+            text=f'Paragraph {i}',
+            text_format=models.TextBlock.PARAGRAPH,
+            paragraph_number=i,
+            position=(i + 1) * models.TextBlock.POSITION_STEP,
+            **{field: parent}
+        )
+        for field, parents in (('lesson', lessons), ('exercise', exercises))
+        for parent in parents
+        for i in range(TEXTBLOCKS)
+    ]
+    models.TextBlock.objects.bulk_create(textblocks)
+
+    return {
+        'language': languages[0],
+        'module': modules[0],
+        'topic': topics[0],
+        'lesson': lessons[0],
+        'exercise': exercises[0],
+        'textblock': models.TextBlock.objects.order_by('id').first(),
+    }
+
+
+@mock_s3
+@override_settings(LESSON_RESPONSE_CACHE_ENABLED=False)
+class LessonEndpointBenchmarks(TestCase):
+    """Record and check the cost of every lesson read endpoint."""
+
+    def setUp(self):
+        s3_client.reset_clients()
+        s3_client.code_cache.clear()
+        s3_client.read_breaker.reset()
+
+        self.s3 = boto3.client('s3')
+        self.s3.create_bucket(Bucket=settings.AWS_STORAGE_BUCKET_NAME)
+
+        self.s3_gets = 0
+        s3_client.get_default_client().client.meta.events.register(
+            'before-call.s3.GetObject', self.count_s3_get
+        )
+
+        user = get_user_model().objects.create_user(
+            email='bench@example.com',
+            password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def tearDown(self):
+        s3_client.reset_clients()
+        s3_client.code_cache.clear()
+
+    def count_s3_get(self, **kwargs):
+        self.s3_gets += 1
+
+    def urls(self, objects):
+        """Return the list and detail URL of every endpoint."""
+
+        urls = {}
+        for resource in RESOURCES:
+            urls[f'{resource}-list'] = reverse(f'lesson:{resource}-list')
+            urls[f'{resource}-detail'] = reverse(
+                f'lesson:{resource}-detail',
+                args=[objects[resource].id]
+            )
+        return urls
+
+    def measure(self, urls):
+        """Return (queries, S3 GETs, milliseconds) for each URL."""
+
+        results = {}
+
+        for name, url in urls.items():
+            s3_client.code_cache.clear()
+            self.s3_gets = 0
+
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                res = self.client.get(url)
+                elapsed = (time.perf_counter() - start) * 1000
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK, name)
+            results[name] = (len(queries), self.s3_gets, elapsed)
+
+        return results
+
+    def report(self, title, results):
+        print(f'\n{title}')
+        print(f'{"endpoint":<20}{"queries":>10}{"s3 gets":>10}{"ms":>10}')
+        for name, (queries, s3_gets, elapsed) in results.items():
+            print(f'{name:<20}{queries:>10}{s3_gets:>10}{elapsed:>10.1f}')
+
+    def test_endpoint_costs_do_not_grow_with_data(self):
+        """Test query and S3 call counts stay flat as the data grows."""
+
+        objects = seed_curriculum(self.s3)
+        urls = self.urls(objects)
+        base = self.measure(urls)
+        self.report('Curriculum x1', base)
+
+        seed_curriculum(self.s3, suffix=' (copy)')
+        grown = self.measure(urls)
+        self.report('Curriculum x2', grown)
+
+        for name in urls:
+            base_queries, base_s3_gets, _ = base[name]
+            queries, s3_gets, elapsed = grown[name]
+
+            self.assertEqual(
+                queries, base_queries,
+                f'{name} query count grew with data size'
+            )
+            # Code is content addressed, so S3 GETs are bounded by the
+            # number of distinct objects, not the number of exercises
+            self.assertLessEqual(s3_gets, CODE_OBJECTS, name)
+
+            if MAX_MS:
+                self.assertLessEqual(elapsed, MAX_MS, name)
+
+
+class SerializationBenchmarks(TestCase):
+    """Compare serializer and fast reader CPU time on a large lesson."""
+
+    def test_reader_cheaper_than_serializer(self):
+        """Test the fast read path renders the same data for less CPU."""
+
+        language = models.Language.objects.create(language_name='Bench')
+        module = models.Module.objects.create(
+            language=language,
+            module_name='Bench Module'
+        )
+        topic = models.Topic.objects.create(
+            module=module,
+            topic_name='Bench Topic'
+        )
+        lesson = models.Lesson.objects.create(
+            topic=topic,
+            lesson_name='Bench Lesson'
+        )
+        models.TextBlock.objects.bulk_create(
+            models.TextBlock(
+                lesson=lesson,
+                text=f'Paragraph {i} ' * 20,
+                text_format=models.TextBlock.PARAGRAPH,
+                paragraph_number=i,
+                position=(i + 1) * models.TextBlock.POSITION_STEP
+            )
+            for i in range(LESSON_TEXTBLOCKS)
+        )
+
+        queryset = models.Lesson.objects.order_by('id')
+
+        # process_time leaves out time spent waiting on the database
+        start = time.process_time()
+        expected = serializers.LessonSerializer(
+            queryset.prefetch_related(*prefetch.lesson_lookups()),
+            many=True
+        ).data
+        serializer_cpu = time.process_time() - start
+
+        start = time.process_time()
+        rendered = readers.LessonReader({}).read(queryset)
+        reader_cpu = time.process_time() - start
+
+        print(
+            f'\n{LESSON_TEXTBLOCKS} textblocks: '
+            f'serializer {serializer_cpu * 1000:.1f} ms CPU, '
+            f'reader {reader_cpu * 1000:.1f} ms CPU'
+        )
+
+        self.assertEqual(rendered, expected)
+        self.assertLess(reader_cpu, serializer_cpu)
+
+
+@mock_s3
+class RendererBenchmarks(TestCase):
+    """Compare renderer encode time and payload size on module trees."""
+
+    def setUp(self):
+        s3_client.reset_clients()
+        s3_client.code_cache.clear()
+        s3_client.read_breaker.reset()
+
+        self.s3 = boto3.client('s3')
+        self.s3.create_bucket(Bucket=settings.AWS_STORAGE_BUCKET_NAME)
+
+    def tearDown(self):
+        s3_client.reset_clients()
+        s3_client.code_cache.clear()
+
+    def test_renderers(self):
+        """Test orjson encodes the same bytes faster than DRF's JSON."""
+
+        seed_curriculum(self.s3)
+        data = readers.ModuleReader({}).read(
+            models.Module.objects.order_by('id')
+        )
+
+        payloads = {}
+        print(f'\n{"renderer":<20}{"ms CPU":>10}{"bytes":>10}')
+
+        for name, renderer in (
+            ('json', JSONRenderer()),
+            ('orjson', ORJSONRenderer()),
+            ('msgpack', MessagePackRenderer()),
+        ):
+            start = time.process_time()
+            for _ in range(RENDER_ROUNDS):
+                payload = renderer.render(data)
+            elapsed = (time.process_time() - start) * 1000 / RENDER_ROUNDS
+
+            payloads[name] = (payload, elapsed)
+            print(f'{name:<20}{elapsed:>10.2f}{len(payload):>10}')
+
+        self.assertEqual(payloads['orjson'][0], payloads['json'][0])
+        self.assertEqual(
+            msgpack.unpackb(payloads['msgpack'][0]),
+            json.loads(payloads['json'][0])
+        )
+        self.assertLess(payloads['orjson'][1], payloads['json'][1])
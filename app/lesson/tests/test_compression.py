@@ -0,0 +1,152 @@
+import gzip
+
+from django.test import TestCase, RequestFactory, override_settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from app import compression
+from core import models
+from lesson import response_cache
+
+from unittest.mock import patch
+
+import brotli
+
+
+TOPIC_LIST_URL = reverse('lesson:topic-list')
+
+
+class NegotiationTests(TestCase):
+    """Tests for choosing an encoding from Accept-Encoding."""
+
+    def test_negotiate(self):
+        """Test the best supported encoding is chosen."""
+
+        factory = RequestFactory()
+        cases = {
+            '': None,
+            'identity': None,
+            'gzip': 'gzip',
+            'gzip, deflate, br': 'br',
+            'br;q=0, gzip': 'gzip',
+            'br;q=0.5, gzip;q=0.8': 'gzip',
+            '*': 'br',
+            '*;q=0': None,
+        }
+
+        for accept_encoding, expected in cases.items():
+            request = factory.get('/', HTTP_ACCEPT_ENCODING=accept_encoding)
+            self.assertEqual(
+                compression.negotiate(request),
+                expected,
+                accept_encoding
+            )
+
+
+@override_settings(COMPRESSION_MIN_BYTES=200)
+class CompressionTests(TestCase):
+    """Tests for compressing API responses."""
+
+    def setUp(self):
+        cache.clear()
+        response_cache.response_stats.reset()
+
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user(
+                email='test@example.com',
+                password='testpass123'
+            )
+        )
+
+        module = models.Module.objects.create(
+            language=models.Language.objects.create(language_name='Python'),
+            module_name='Basics'
+        )
+        for i in range(10):
+            models.Topic.objects.create(module=module, topic_name=f'Topic {i}')
+
+        self.plain = self.client.get(TOPIC_LIST_URL).content
+
+    def test_gzip_response(self):
+        """Test responses are gzipped for clients that accept it."""
+
+        res = self.client.get(TOPIC_LIST_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', res['Vary'])
+        self.assertTrue(res['ETag'].startswith('W/"'))
+        self.assertEqual(gzip.decompress(res.content), self.plain)
+
+        res = self.client.get(
+            TOPIC_LIST_URL,
+            HTTP_ACCEPT_ENCODING='gzip',
+            HTTP_IF_NONE_MATCH=res['ETag']
+        )
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_brotli_response(self):
+        """Test brotli is preferred when the client accepts it."""
+
+        res = self.client.get(
+            TOPIC_LIST_URL,
+            HTTP_ACCEPT_ENCODING='gzip, br'
+        )
+
+        self.assertEqual(res['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(res.content), self.plain)
+
+    @override_settings(COMPRESSION_MIN_BYTES=1024 * 1024)
+    def test_small_response_not_compressed(self):
+        """Test responses below the threshold are sent as they are."""
+
+        res = self.client.get(TOPIC_LIST_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertFalse(res.has_header('Content-Encoding'))
+        self.assertEqual(res.content, self.plain)
+
+    def test_cached_response_not_recompressed(self):
+        """Test a cache hit is served with the stored compressed bytes."""
+
+        with patch.object(
+            compression, 'compress', side_effect=compression.compress
+        ) as patched_compress:
+            first = self.client.get(
+                TOPIC_LIST_URL,
+                HTTP_ACCEPT_ENCODING='gzip'
+            )
+            with self.assertNumQueries(1):
+                second = self.client.get(
+                    TOPIC_LIST_URL,
+                    HTTP_ACCEPT_ENCODING='gzip'
+                )
+
+        patched_compress.assert_called_once()
+        self.assertEqual(second['Content-Encoding'], 'gzip')
+        self.assertEqual(second['Content-Type'], first['Content-Type'])
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertEqual(second['Vary'], first['Vary'])
+        self.assertIn('Accept', second['Vary'])
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(
+            response_cache.response_stats.stats()['compressed_hits'], 1
+        )
+
+    def test_browsable_api_not_cached_compressed(self):
+        """Test browsable API pages are compressed but never shared."""
+
+        for _ in range(2):
+            res = self.client.get(
+                TOPIC_LIST_URL,
+                HTTP_ACCEPT='text/html',
+                HTTP_ACCEPT_ENCODING='gzip'
+            )
+            self.assertEqual(res['Content-Encoding'], 'gzip')
+
+        self.assertEqual(
+            response_cache.response_stats.stats()['compressed_hits'], 0
+        )
@@ -0,0 +1,195 @@
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core import models
+from lesson import serializers
+from lesson.client.S3Client import code_cache, read_breaker, reset_clients
+
+from moto import mock_s3
+
+
+MODULE_LIST_URL = reverse('lesson:module-list')
+TOPIC_LIST_URL = reverse('lesson:topic-list')
+
+
+def module_detail_url(module_id):
+    return reverse('lesson:module-detail', args=[module_id])
+
+
+def topic_detail_url(topic_id):
+    return reverse('lesson:topic-detail', args=[topic_id])
+
+
+def module_document(module):
+    return models.CurriculumDocument.objects.filter(
+        kind=models.CurriculumDocument.MODULE,
+        object_id=module.id
+    ).first()
+
+
+@mock_s3
+class CurriculumDocumentTests(TestCase):
+    """Tests for serving reads from materialized curriculum documents."""
+
+    def setUp(self):
+        code_cache.clear()
+        reset_clients()
+        read_breaker.reset()
+
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user(
+                email='test@example.com',
+                password='testpass123'
+            )
+        )
+
+        self.language = models.Language.objects.create(
+            language_name='Test Language'
+        )
+        self.module = models.Module.objects.create(
+            language=self.language,
+            module_name='Test Module'
+        )
+        self.topic = models.Topic.objects.create(
+            module=self.module,
+            topic_name='Test Topic'
+        )
+        self.lesson = models.Lesson.objects.create(
+            topic=self.topic,
+            lesson_name='Test Lesson'
+        )
+        models.Exercise.objects.create(
+            topic=self.topic,
+            exercise_name='Test Exercise',
+            starter_code_inline='starter',
+            expected_output_inline='output'
+        )
+
+    def assert_matches_serializer(self):
+        """Test module and topic reads match live serialization."""
+
+        modules = models.Module.objects.order_by('id')
+        topics = models.Topic.objects.order_by('id')
+
+        res = self.client.get(MODULE_LIST_URL)
+        self.assertEqual(
+            res.data['results'],
+            serializers.ModuleSerializer(modules, many=True).data
+        )
+
+        res = self.client.get(TOPIC_LIST_URL)
+        self.assertEqual(
+            res.data['results'],
+            serializers.TopicSerializer(topics, many=True).data
+        )
+
+        for topic in topics:
+            res = self.client.get(topic_detail_url(topic.id))
+            self.assertEqual(
+                res.data,
+                serializers.TopicSerializer(topic).data
+            )
+
+    def test_read_builds_documents(self):
+        """Test a read stores the module document."""
+
+        self.assertIsNone(module_document(self.module))
+
+        res = self.client.get(module_detail_url(self.module.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['module_name'], 'Test Module')
+        self.assertIsNotNone(module_document(self.module))
+
+        self.assert_matches_serializer()
+
+    def test_change_invalidates_document(self):
+        """Test saving a nested row replaces its module's document."""
+
+        self.client.get(MODULE_LIST_URL)
+
+        self.lesson.lesson_name = 'Renamed Lesson'
+        self.lesson.save()
+        self.assertIsNone(module_document(self.module))
+
+        res = self.client.get(module_detail_url(self.module.id))
+        lesson = res.data['topics'][0]['lessons'][0]
+        self.assertEqual(lesson['lesson_name'], 'Renamed Lesson')
+
+        models.TextBlock.objects.create(
+            lesson=self.lesson,
+            text='New Text',
+            text_format=1,
+            paragraph_number=1
+        )
+        self.assert_matches_serializer()
+
+        self.lesson.delete()
+        self.assert_matches_serializer()
+
+    def test_moved_row_invalidates_both_trees(self):
+        """Test moving a topic refreshes its old and new module."""
+
+        other_module = models.Module.objects.create(
+            language=self.language,
+            module_name='Other Module'
+        )
+        self.client.get(MODULE_LIST_URL)
+
+        self.topic.module = other_module
+        self.topic.save()
+
+        self.assertIsNone(module_document(self.module))
+        self.assertIsNone(module_document(other_module))
+        self.assert_matches_serializer()
+
+    def test_documents_rebuilt_on_commit(self):
+        """Test invalidated documents are rebuilt after the commit."""
+
+        self.client.get(MODULE_LIST_URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.topic.topic_name = 'Renamed Topic'
+            self.topic.save()
+
+        document = module_document(self.module)
+        self.assertIsNotNone(document)
+        self.assertIn('Renamed Topic', document.document)
+
+    def test_degraded_module_not_stored(self):
+        """Test a tree with unreadable code is served but not stored."""
+
+        models.Exercise.objects.create(
+            topic=self.topic,
+            exercise_name='Missing Code',
+            starter_code='missing-key'
+        )
+
+        res = self.client.get(module_detail_url(self.module.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        exercise = res.data['topics'][0]['topic_exercises'][1]
+        self.assertTrue(exercise['code_unavailable'])
+        self.assertIsNone(module_document(self.module))
+
+    def test_missing_rows_not_found(self):
+        """Test reads of missing modules and topics return 404."""
+
+        res = self.client.get(module_detail_url(self.module.id + 100))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+        res = self.client.get(topic_detail_url(self.topic.id + 100))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(CURRICULUM_DOCUMENTS_ENABLED=False)
+    def test_documents_disabled(self):
+        """Test reads are serialized live when documents are disabled."""
+
+        res = self.client.get(MODULE_LIST_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertFalse(models.CurriculumDocument.objects.exists())
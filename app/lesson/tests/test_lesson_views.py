@@ -1,17 +1,30 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.conf import settings
 from django.urls import reverse
+from django.db import connection
+from django.core.cache import cache
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APIClient
 from rest_framework import status
 
 from core import models
-from lesson import serializers
+from lesson import prefetch, serializers, response_cache
+from lesson.client.S3Client import (
+    S3Client,
+    S3WriteError,
+    code_cache,
+    content_hash,
+    read_breaker,
+    reset_clients
+)
 
 from unittest.mock import patch
 from moto import mock_s3
 
 import boto3
+import gzip
+import itertools
 
 
 MODULE_LIST_URL = reverse('lesson:module-list')
@@ -19,6 +32,11 @@ TOPIC_LIST_URL = reverse('lesson:topic-list')
 TEXTBLOCK_LIST_URL = reverse('lesson:textblock-list')
 LESSON_LIST_URL = reverse('lesson:lesson-list')
 EXERCISE_LIST_URL = reverse('lesson:exercise-list')
+METRICS_URL = reverse('lesson:metrics')
+TEXTBLOCK_BULK_URL = reverse('lesson:textblock-bulk')
+
+# Most pages a test follows before deciding next links loop
+MAX_PAGES = 50
 
 
 def module_detail_url(module_id):
@@ -29,6 +47,10 @@ def topic_detail_url(topic_id):
     return reverse('lesson:topic-detail', args=[topic_id])
 
 
+def exercise_detail_url(exercise_id):
+    return reverse('lesson:exercise-detail', args=[exercise_id])
+
+
 def create_user(**params):
     """Create and return a test user."""
 
@@ -129,7 +151,7 @@ class PrivateLessonAPITests(TestCase):
         res = self.client.get(MODULE_LIST_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 4)
+        self.assertEqual(len(res.data['results']), 4)
     
     def test_get_module_detail(self):
         """Test getting individual module"""
@@ -266,15 +288,315 @@ class PrivateLessonAPITests(TestCase):
         res = self.client.get(MODULE_LIST_URL)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
-        module = models.Module.objects.all()
+        # Ordered as the view orders its rows and nested relations
+        module = models.Module.objects.order_by('id') \
+            .prefetch_related(*prefetch.module_lookups())
         serializer = serializers.ModuleSerializer(module, many=True)
 
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
 
     
 
 
+def create_curriculum(module, topics=1, items=1):
+    """
+    Create topics under a module, each with lessons and exercises that
+    have a textblock. Exercise code is stored inline to avoid S3.
+    """
+    for i in range(topics):
+        topic = create_topic(f'Test Topic {i}', module)
+
+        for j in range(items):
+            lesson = models.Lesson.objects.create(
+                topic=topic,
+                lesson_name=f'Test Lesson {j}'
+            )
+            exercise = models.Exercise.objects.create(
+                topic=topic,
+                exercise_name=f'Test Exercise {j}',
+                starter_code_inline='starter',
+                expected_output_inline='output'
+            )
+
+            for parent in ({'lesson': lesson}, {'exercise': exercise}):
+                models.TextBlock.objects.create(
+                    text='Test Text',
+                    text_format=1,
+                    paragraph_number=1,
+                    **parent
+                )
+
+
+class QueryCountTests(TestCase):
+    """Tests that nested endpoints run a fixed number of queries."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return len(queries)
+
+    def test_query_count_independent_of_size(self):
+        """Test list endpoints do not run a query per nested object."""
+
+        module = create_module('Test Module')
+        create_curriculum(module, topics=1, items=1)
+
+        urls = [
+            MODULE_LIST_URL,
+            module_detail_url(module.id),
+            TOPIC_LIST_URL,
+            LESSON_LIST_URL,
+            EXERCISE_LIST_URL,
+        ]
+        small = [self.count_queries(url) for url in urls]
+
+        create_curriculum(module, topics=3, items=4)
+        create_curriculum(create_module('Other Module'), topics=2, items=2)
+        large = [self.count_queries(url) for url in urls]
+
+        self.assertEqual(small, large)
+
+    def test_delete_query_count_independent_of_size(self):
+        """Test deleting a module does not run queries per child row."""
+
+        def delete(topics, items):
+            module = create_module('Test Module')
+            create_curriculum(module, topics=topics, items=items)
+
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.delete(module_detail_url(module.id))
+
+            self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+            self.assertFalse(models.Topic.objects.exists())
+            self.assertFalse(models.TextBlock.objects.exists())
+            return len(queries)
+
+        self.assertEqual(delete(1, 1), delete(3, 4))
+
+    def test_delete_keeps_shared_counts(self):
+        """Test deleting a lesson updates a block's exercise topic."""
+
+        module = create_module('Test Module')
+        lesson_topic = create_topic('Lesson Topic', module)
+        exercise_topic = create_topic('Exercise Topic', module)
+        lesson = models.Lesson.objects.create(
+            topic=lesson_topic,
+            lesson_name='Test Lesson'
+        )
+        exercise = models.Exercise.objects.create(
+            topic=exercise_topic,
+            exercise_name='Test Exercise'
+        )
+        models.TextBlock.objects.create(
+            lesson=lesson,
+            exercise=exercise,
+            text='Shared',
+            text_format=1,
+            paragraph_number=1
+        )
+        exercise.refresh_from_db()
+
+        res = self.client.delete(
+            reverse('lesson:lesson-detail', args=[lesson.id])
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        exercise_topic.refresh_from_db()
+        self.assertEqual(exercise_topic.textblock_count, 0)
+        self.assertEqual(exercise_topic.exercise_count, 1)
+        self.assertEqual(
+            models.Exercise.objects.get().revision,
+            exercise.revision + 1
+        )
+
+
+class PaginationTests(TestCase):
+    """Tests for keyset pagination of list endpoints."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(self.user)
+
+        module = create_module('Test Module')
+        create_curriculum(module, topics=5, items=1)
+
+    def walk(self, url):
+        """Return the ids of every page, and any COUNT queries run."""
+
+        ids = []
+        counts = []
+        # Next links keep page_size, and query data would replace the
+        # cursor in them
+        next_url = f'{url}?page_size=2'
+
+        for pages in itertools.count(1):
+            if not next_url:
+                break
+            self.assertLessEqual(pages, MAX_PAGES, f'{url} never ends')
+
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.get(next_url)
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(res.data['results']), 2)
+
+            ids += [item['id'] for item in res.data['results']]
+            counts += [
+                query['sql'] for query in queries
+                if 'COUNT(' in query['sql'].upper()
+            ]
+            next_url = res.data['next']
+
+        return ids, counts
+
+    def assert_pages_cover(self, url, model):
+        ids, counts = self.walk(url)
+
+        self.assertEqual(
+            ids,
+            list(model.objects.order_by('id').values_list('id', flat=True))
+        )
+        self.assertEqual(counts, [])
+
+    def test_list_endpoints_paginated(self):
+        """Test pages cover every row in id order without counting."""
+
+        self.assert_pages_cover(TOPIC_LIST_URL, models.Topic)
+        self.assert_pages_cover(LESSON_LIST_URL, models.Lesson)
+        self.assert_pages_cover(EXERCISE_LIST_URL, models.Exercise)
+        self.assert_pages_cover(TEXTBLOCK_LIST_URL, models.TextBlock)
+
+    @override_settings(
+        CURRICULUM_FAST_READS_ENABLED=False,
+        CURRICULUM_DOCUMENTS_ENABLED=False
+    )
+    def test_serializer_path_paginated(self):
+        """Test pages are the same when rendered by serializers."""
+
+        self.assert_pages_cover(TOPIC_LIST_URL, models.Topic)
+        self.assert_pages_cover(LESSON_LIST_URL, models.Lesson)
+
+    @override_settings(LESSON_MAX_PAGE_SIZE=3)
+    def test_page_size_capped(self):
+        """Test clients cannot ask for pages above the maximum."""
+
+        res = self.client.get(TOPIC_LIST_URL, {'page_size': 100})
+
+        self.assertEqual(len(res.data['results']), 3)
+        self.assertIsNotNone(res.data['next'])
+        self.assertNotIn('count', res.data)
+
+
+class SparseFieldsTests(TestCase):
+    """Tests for the fields and expand query parameters."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(self.user)
+
+        self.module = create_module('Test Module')
+        create_curriculum(self.module, topics=2, items=2)
+
+        topic = models.Topic.objects.order_by('id').first()
+        models.Exercise.objects.create(
+            topic=topic,
+            exercise_name='S3 Exercise',
+            starter_code='starter-key',
+            expected_output='expected-key'
+        )
+
+    def test_navigation_single_query(self):
+        """Test a menu of topic names is served by one read query."""
+
+        # One query for the ETag revisions and one for the page
+        with self.assertNumQueries(2):
+            res = self.client.get(
+                TOPIC_LIST_URL,
+                {'fields': 'id,topic_name', 'expand': ''}
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        for topic in res.data['results']:
+            self.assertEqual(list(topic), ['id', 'topic_name'])
+
+    def test_expand_limits_nesting(self):
+        """Test only the named relations are nested."""
+
+        res = self.client.get(
+            module_detail_url(self.module.id),
+            {'expand': 'topics.lessons'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        topic = res.data['topics'][0]
+        self.assertNotIn('topic_exercises', topic)
+        self.assertIn('topic_name', topic)
+        self.assertNotIn('lesson_textblocks', topic['lessons'][0])
+
+    def test_dotted_fields(self):
+        """Test dotted field names limit nested items."""
+
+        res = self.client.get(
+            TOPIC_LIST_URL,
+            {'fields': 'topic_name,lessons.lesson_name'}
+        )
+
+        topic = res.data['results'][0]
+        self.assertEqual(list(topic), ['lessons', 'topic_name'])
+        self.assertEqual(list(topic['lessons'][0]), ['lesson_name'])
+
+    @override_settings(LESSON_RESPONSE_CACHE_ENABLED=False)
+    def test_excluded_code_not_fetched(self):
+        """Test S3 is not read when code fields are left out."""
+
+        for fast_reads in (True, False):
+            with self.settings(CURRICULUM_FAST_READS_ENABLED=fast_reads), \
+                    patch.object(S3Client, 'read_objects') as read_objects, \
+                    patch.object(S3Client, 'read_object') as read_object:
+                res = self.client.get(
+                    TOPIC_LIST_URL,
+                    {'fields': 'id,topic_exercises.exercise_name'}
+                )
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            read_objects.assert_not_called()
+            read_object.assert_not_called()
+
+    @override_settings(LESSON_RESPONSE_CACHE_ENABLED=False)
+    def test_serializer_path_matches(self):
+        """Test the serializers apply field specs like the readers."""
+
+        params = {
+            'fields': 'id,module_name,topics.topic_name,topics.lessons',
+            'expand': 'topics.lessons.lesson_textblocks',
+        }
+
+        res = self.client.get(MODULE_LIST_URL, params)
+        with self.settings(CURRICULUM_FAST_READS_ENABLED=False):
+            serialized = self.client.get(MODULE_LIST_URL, params)
+
+        self.assertEqual(res.content, serialized.content)
+
+
 class ExerciseListTests(TestCase):
     """
     Tests for interacting with S3 Objects
@@ -283,6 +605,7 @@ class ExerciseListTests(TestCase):
 
     @mock_s3
     def setUp(self):
+        code_cache.clear()
         self.s3_client = boto3.client('s3')
         self.client = APIClient()
 
@@ -353,11 +676,306 @@ class ExerciseListTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         print(res.data)
 
-        topics = models.Topic.objects.all()
+        # Ordered as the view orders its rows and nested relations
+        topics = models.Topic.objects.order_by('id') \
+            .prefetch_related(*prefetch.topic_lookups())
         serializer = serializers.TopicSerializer(topics, many=True)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
+
+    @mock_s3
+    def test_topic_list_fetches_code_in_one_batch(self):
+        """Test every exercise's code is fetched in a single batch."""
+
+        bucket_name = settings.AWS_STORAGE_BUCKET_NAME
+        self.s3_client.create_bucket(Bucket=bucket_name)
+
+        for i in range(3):
+            for key in (f'starter-{i}', f'expected-{i}'):
+                self.s3_client.put_object(
+                    Bucket=bucket_name,
+                    Body=f'{key} code',
+                    Key=f'{key}.txt'
+                )
+
+            models.Exercise.objects.create(
+                topic=self.topic,
+                exercise_name=f'Test Exercise {i}',
+                starter_code=f'starter-{i}',
+                expected_output=f'expected-{i}'
+            )
+
+        with patch.object(
+            S3Client, 'read_objects', autospec=True,
+            side_effect=S3Client.read_objects
+        ) as patched_read_objects:
+            res = self.client.get(TOPIC_LIST_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        patched_read_objects.assert_called_once()
+
+        exercises = res.data['results'][0]['topic_exercises']
+        self.assertEqual(len(exercises), 3)
+        for exercise in exercises:
+            i = exercise['exercise_name'][-1]
+            self.assertEqual(
+                exercise['exercise_starter_code'], f'starter-{i} code'
+            )
+            self.assertEqual(
+                exercise['expected_output_code'], f'expected-{i} code'
+            )
         
     
+@mock_s3
+class ExerciseCreateTests(TestCase):
+    """Tests for creating exercises with code stored in S3."""
+
+    def setUp(self):
+        code_cache.clear()
+        reset_clients()
+
+        self.s3_client = boto3.client('s3')
+        self.bucket_name = settings.AWS_STORAGE_BUCKET_NAME
+        self.s3_client.create_bucket(Bucket=self.bucket_name)
+
+        self.client = APIClient()
+        self.user = create_user(
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(self.user)
+
+        self.topic = create_topic_with_module('Test Topic')
+        self.payload = {
+            'topic': self.topic.id,
+            'exercise_name': 'Test Exercise',
+            # Both too large to store inline with the default settings
+            'starter_code': 'function helloWorld() {}\n' * 200,
+            'expected_output': '[1, 2, 3]\n' * 500
+        }
+
+    def test_exercise_post(self):
+        """Test POST request uploads code and creates the exercise."""
+
+        res = self.client.post(EXERCISE_LIST_URL, self.payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            res.data['exercise_starter_code'],
+            self.payload['starter_code']
+        )
+        self.assertNotIn('starter_code', res.data)
+
+        exercise = models.Exercise.objects.get()
+        self.assertEqual(
+            exercise.starter_code,
+            content_hash(self.payload['starter_code'])
+        )
+        self.assertIsNone(exercise.starter_code_inline)
+
+    def test_exercise_post_compresses_code(self):
+        """Test code posted through the API is stored gzip compressed."""
+
+        res = self.client.post(EXERCISE_LIST_URL, self.payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        obj = self.s3_client.get_object(
+            Bucket=self.bucket_name,
+            Key=f'{content_hash(self.payload["starter_code"])}.txt'
+        )
+        self.assertEqual(obj['ContentEncoding'], 'gzip')
+        self.assertEqual(
+            gzip.decompress(obj['Body'].read()).decode(),
+            self.payload['starter_code']
+        )
+
+    def test_exercise_post_upload_failure(self):
+        """Test a failed upload returns 400 and leaves shared code alone."""
+
+        real_store_object = S3Client.store_object
+
+        def store_object(client, txt_data):
+            if txt_data == self.payload['expected_output']:
+                raise S3WriteError('Upload failed')
+            return real_store_object(client, txt_data)
+
+        with patch.object(
+            S3Client, 'delete_object', autospec=True
+        ) as patched_delete, patch.object(
+            S3Client, 'store_object', autospec=True,
+            side_effect=store_object
+        ):
+            res = self.client.post(
+                EXERCISE_LIST_URL, self.payload, format='json'
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(models.Exercise.objects.exists())
+
+        # Content-addressed objects may be reused by other requests, so
+        # nothing is deleted until sweep_code_objects finds it orphaned
+        patched_delete.assert_not_called()
+
+    def test_exercise_post_small_code_inline(self):
+        """Test code below the size threshold is stored in the row."""
+
+        self.payload['expected_output'] = '[1, 2, 3]'
+
+        with patch.object(
+            S3Client, 'store_object', autospec=True,
+            side_effect=S3Client.store_object
+        ) as patched_store_object:
+            res = self.client.post(
+                EXERCISE_LIST_URL, self.payload, format='json'
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            res.data['expected_output_code'],
+            self.payload['expected_output']
+        )
+        self.assertNotIn('expected_output_inline', res.data)
+
+        exercise = models.Exercise.objects.get()
+        self.assertIsNone(exercise.expected_output)
+        self.assertEqual(
+            exercise.expected_output_inline,
+            self.payload['expected_output']
+        )
+        self.assertEqual(
+            exercise.starter_code,
+            content_hash(self.payload['starter_code'])
+        )
+        patched_store_object.assert_called_once()
+
+    def test_exercise_patch_code(self):
+        """Test PATCH stores new code like POST and drops the old copy."""
+
+        exercise = models.Exercise.objects.create(
+            topic=self.topic,
+            exercise_name='Test Exercise',
+            starter_code_inline='old starter',
+            expected_output=content_hash('old expected')
+        )
+
+        res = self.client.patch(
+            exercise_detail_url(exercise.id),
+            {
+                'starter_code': self.payload['starter_code'],
+                'expected_output': '[1, 2, 3]',
+            },
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data['exercise_starter_code'],
+            self.payload['starter_code']
+        )
+
+        exercise.refresh_from_db()
+        self.assertEqual(
+            exercise.starter_code,
+            content_hash(self.payload['starter_code'])
+        )
+        self.assertIsNone(exercise.starter_code_inline)
+        self.assertIsNone(exercise.expected_output)
+        self.assertEqual(exercise.expected_output_inline, '[1, 2, 3]')
+
+
+@mock_s3
+class CodeDeliveryTests(TestCase):
+    """Tests for delivering exercise code as URLs or inline."""
+
+    def setUp(self):
+        code_cache.clear()
+        reset_clients()
+        read_breaker.reset()
+
+        s3_client = boto3.client('s3')
+        s3_client.create_bucket(Bucket=settings.AWS_STORAGE_BUCKET_NAME)
+        s3_client.put_object(
+            Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+            Body='large starter code',
+            Key='starter-key.txt'
+        )
+
+        self.client = APIClient()
+        self.user = create_user(
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(self.user)
+
+        self.exercise = models.Exercise.objects.create(
+            topic=create_topic_with_module('Test Topic'),
+            exercise_name='Test Exercise',
+            starter_code='starter-key',
+            expected_output_inline='small output'
+        )
+
+    def test_presigned_delivery(self):
+        """Test presigned URLs are returned without fetching code."""
+
+        with patch.object(
+            S3Client, 'read_object', autospec=True
+        ) as patched_read_object:
+            res = self.client.get(
+                exercise_detail_url(self.exercise.id),
+                {'code_delivery': 'presigned'}
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        patched_read_object.assert_not_called()
+
+        url = res.data['exercise_starter_code']
+        self.assertTrue(url.startswith('https://'))
+        self.assertIn('starter-key.txt', url)
+        self.assertIn('Signature', url)
+
+        self.assertEqual(
+            res.data['expected_output_code'],
+            'data:text/plain;charset=utf-8,small%20output'
+        )
+
+    def test_public_delivery(self):
+        """Test bucket domain URLs are returned in public mode."""
+
+        res = self.client.get(
+            exercise_detail_url(self.exercise.id),
+            {'code_delivery': 'public'}
+        )
+
+        self.assertEqual(
+            res.data['exercise_starter_code'],
+            f'https://{settings.AWS_S3_CUSTOM_DOMAIN}/starter-key.txt'
+        )
+
+    def test_unreadable_code_degrades(self):
+        """Test code that cannot be read is null and flagged."""
+
+        self.exercise.starter_code = 'missing-key'
+        self.exercise.save()
+
+        res = self.client.get(exercise_detail_url(self.exercise.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsNone(res.data['exercise_starter_code'])
+        self.assertEqual(res.data['expected_output_code'], 'small output')
+        self.assertTrue(res.data['code_unavailable'])
+
+    def test_inline_delivery_by_default(self):
+        """Test the code itself is returned by default."""
+
+        res = self.client.get(exercise_detail_url(self.exercise.id))
+
+        self.assertEqual(
+            res.data['exercise_starter_code'],
+            'large starter code'
+        )
+        self.assertEqual(res.data['expected_output_code'], 'small output')
+
+
 class LessonTests(TestCase):
     """Tests for Lessons API"""
 
@@ -403,11 +1021,444 @@ class LessonTests(TestCase):
         res = self.client.get(LESSON_LIST_URL)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
-        lessons = models.Lesson.objects.all()
+        lessons = models.Lesson.objects.order_by('id') \
+            .prefetch_related(*prefetch.lesson_lookups())
         serializer = serializers.LessonSerializer(lessons, many=True)
 
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
+
+
+
+
+
+
+@mock_s3
+class ConditionalGetTests(TestCase):
+    """Tests for ETags and If-None-Match on curriculum reads."""
+
+    def setUp(self):
+        code_cache.clear()
+        reset_clients()
+        read_breaker.reset()
+
+        self.client = APIClient()
+        self.user = create_user(
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(self.user)
+
+        self.module = create_module('Test Module')
+        create_curriculum(self.module, topics=2, items=2)
+
+    def test_not_modified(self):
+        """Test a matching If-None-Match returns 304 without reading."""
+
+        url = module_detail_url(self.module.id)
+        res = self.client.get(url)
+        etag = res['ETag']
+
+        with self.assertNumQueries(1), \
+                patch.object(S3Client, 'read_objects') as read_objects:
+            res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+        self.assertEqual(res.content, b'')
+        read_objects.assert_not_called()
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=f'W/{etag}')
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_nested_change_changes_etag(self):
+        """Test changing a row deep in a tree changes the tree's ETag."""
+
+        url = module_detail_url(self.module.id)
+        etag = self.client.get(url)['ETag']
+
+        textblock = models.TextBlock.objects.filter(
+            lesson__topic__module=self.module
+        ).first()
+        textblock.text = 'Changed Text'
+        textblock.save()
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_list_etag(self):
+        """Test list pages get ETags that change with their rows."""
+
+        etag = self.client.get(TOPIC_LIST_URL)['ETag']
+
+        res = self.client.get(TOPIC_LIST_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        res = self.client.get(
+            TOPIC_LIST_URL,
+            {'fields': 'id'},
+            HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        create_topic('New Topic', self.module)
+
+        res = self.client.get(TOPIC_LIST_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_presigned_no_etag(self):
+        """Test responses with expiring URLs get no ETag."""
+
+        res = self.client.get(
+            EXERCISE_LIST_URL,
+            {'code_delivery': 'presigned'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertFalse(res.has_header('ETag'))
+
+    def test_degraded_no_etag(self):
+        """Test responses missing exercise code get no ETag."""
+
+        exercise = models.Exercise.objects.create(
+            topic=models.Topic.objects.first(),
+            exercise_name='Missing Code',
+            starter_code='missing-key'
+        )
+
+        res = self.client.get(exercise_detail_url(exercise.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.data['code_unavailable'])
+        self.assertFalse(res.has_header('ETag'))
+
+
+class ResponseCacheTests(TestCase):
+    """Tests for serving curriculum reads from the response cache."""
+
+    def setUp(self):
+        cache.clear()
+        response_cache.response_stats.reset()
+
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_superuser(
+            email='admin@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(self.user)
+
+        self.module = create_module('Test Module')
+        create_curriculum(self.module, topics=2, items=2)
 
+    def test_repeat_read_cached(self):
+        """Test a repeated read is served from the cache."""
 
+        url = module_detail_url(self.module.id)
+        res = self.client.get(url)
 
+        with self.assertNumQueries(1):
+            cached = self.client.get(url)
 
+        self.assertEqual(cached.status_code, status.HTTP_200_OK)
+        self.assertEqual(cached.content, res.content)
+        self.assertEqual(cached['ETag'], res['ETag'])
+
+    def test_change_invalidates_subtree(self):
+        """Test a change is served fresh only where it is visible."""
+
+        other_module = create_module('Other Module')
+        create_curriculum(other_module)
+
+        self.client.get(module_detail_url(self.module.id))
+        self.client.get(module_detail_url(other_module.id))
+
+        lesson = models.Lesson.objects.filter(
+            topic__module=self.module
+        ).first()
+        lesson.lesson_name = 'Renamed Lesson'
+        lesson.save()
+
+        res = self.client.get(module_detail_url(self.module.id))
+        self.assertIn(b'Renamed Lesson', res.content)
+
+        with self.assertNumQueries(1):
+            self.client.get(module_detail_url(other_module.id))
+
+    def test_metrics(self):
+        """Test hits, misses and rebuild times are reported."""
+
+        self.client.get(TOPIC_LIST_URL)
+        self.client.get(TOPIC_LIST_URL)
+
+        res = self.client.get(METRICS_URL)
+
+        stats = res.data['response_cache']
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hit_ratio'], 0.5)
+        self.assertEqual(stats['rebuilds'], 1)
+        self.assertGreater(stats['max_rebuild_seconds'], 0)
+
+    @override_settings(LESSON_RESPONSE_CACHE_ENABLED=False)
+    def test_cache_disabled(self):
+        """Test reads are rebuilt every time when the cache is off."""
+
+        self.client.get(TOPIC_LIST_URL)
+        self.client.get(TOPIC_LIST_URL)
+
+        self.assertEqual(response_cache.response_stats.stats()['hits'], 0)
+
+
+class BulkTextBlockTests(TestCase):
+    """Tests for replacing the textblocks of a lesson in one request."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(self.user)
+
+        self.module = create_module('Test Module')
+        topic = create_topic('Test Topic', self.module)
+        self.lesson = models.Lesson.objects.create(
+            topic=topic,
+            lesson_name='Test Lesson'
+        )
+        self.textblocks = [
+            models.TextBlock.objects.create(
+                lesson=self.lesson,
+                text=f'Block {i}',
+                text_format=models.TextBlock.PARAGRAPH,
+                paragraph_number=i
+            )
+            for i in range(1, 4)
+        ]
+
+    def lesson_texts(self):
+        return list(
+            self.lesson.lesson_textblocks
+            .order_by('paragraph_number')
+            .values_list('text', 'paragraph_number')
+        )
+
+    def test_bulk_replace(self):
+        """Test blocks are created, updated, deleted and reordered."""
+
+        first, second, _ = self.textblocks
+        payload = {
+            'lesson': self.lesson.id,
+            'textblocks': [
+                {'id': second.id},
+                {'text': 'New Block', 'text_format': 1},
+                {'id': first.id, 'text': 'Edited Block'},
+            ],
+        }
+
+        res = self.client.put(TEXTBLOCK_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        expected = [
+            ('Block 2', 1),
+            ('New Block', 2),
+            ('Edited Block', 3),
+        ]
+        self.assertEqual(self.lesson_texts(), expected)
+        self.assertEqual(
+            [(block['text'], block['paragraph_number']) for block in res.data],
+            expected
+        )
+
+    def test_query_count_independent_of_size(self):
+        """Test a bulk change runs a fixed number of queries."""
+
+        def put(count):
+            payload = {
+                'lesson': self.lesson.id,
+                'textblocks': [
+                    {'text': f'Block {i}', 'text_format': 1}
+                    for i in range(count)
+                ],
+            }
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.put(
+                    TEXTBLOCK_BULK_URL, payload, format='json'
+                )
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            return len(queries)
+
+        put(5)
+        small = put(5)
+        large = put(50)
+
+        self.assertEqual(small, large)
+        self.assertEqual(len(self.lesson_texts()), 50)
+
+    def test_invalid_change_rejected(self):
+        """Test a change with a foreign block is rejected as a whole."""
+
+        other_lesson = models.Lesson.objects.create(
+            topic=self.lesson.topic,
+            lesson_name='Other Lesson'
+        )
+        other_block = models.TextBlock.objects.create(
+            lesson=other_lesson,
+            text='Other Block',
+            text_format=1,
+            paragraph_number=1
+        )
+        before = self.lesson_texts()
+
+        for payload in (
+            {
+                'lesson': self.lesson.id,
+                'textblocks': [{'id': other_block.id}],
+            },
+            {
+                'lesson': self.lesson.id,
+                'textblocks': [{'text': 'No Format'}],
+            },
+            {
+                'lesson': self.lesson.id,
+                'exercise': models.Exercise.objects.create(
+                    topic=self.lesson.topic,
+                    exercise_name='Test Exercise'
+                ).id,
+                'textblocks': [],
+            },
+        ):
+            res = self.client.put(TEXTBLOCK_BULK_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.assertEqual(self.lesson_texts(), before)
+
+    def test_bulk_change_invalidates_tree(self):
+        """Test a bulk change refreshes the lesson's module."""
+
+        url = module_detail_url(self.module.id)
+        etag = self.client.get(url)['ETag']
+
+        payload = {
+            'lesson': self.lesson.id,
+            'textblocks': [{'id': self.textblocks[0].id, 'text': 'Edited'}],
+        }
+        self.client.put(TEXTBLOCK_BULK_URL, payload, format='json')
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        lesson = res.data['topics'][0]['lessons'][0]
+        self.assertEqual(
+            [block['text'] for block in lesson['lesson_textblocks']],
+            ['Edited']
+        )
+
+
+class TextBlockOrderingTests(TestCase):
+    """Tests for ordered textblocks and moving them."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(self.user)
+
+        topic = create_topic_with_module('Test Topic')
+        self.lesson = models.Lesson.objects.create(
+            topic=topic,
+            lesson_name='Test Lesson'
+        )
+        self.textblocks = [
+            models.TextBlock.objects.create(
+                lesson=self.lesson,
+                text=f'Block {i}',
+                text_format=1,
+                paragraph_number=i
+            )
+            for i in (3, 1, 2)
+        ]
+
+    def lesson_texts(self):
+        res = self.client.get(
+            reverse('lesson:lesson-detail', args=[self.lesson.id])
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [block['text'] for block in res.data['lesson_textblocks']]
+
+    def move(self, textblock, after):
+        return self.client.post(
+            reverse('lesson:textblock-move', args=[textblock.id]),
+            {'after': after.id if after else None},
+            format='json'
+        )
+
+    def test_nested_blocks_ordered(self):
+        """Test nested textblocks are returned in order."""
+
+        self.assertEqual(
+            self.lesson_texts(),
+            ['Block 1', 'Block 2', 'Block 3']
+        )
+
+    def test_move_updates_one_row(self):
+        """Test moving a block only writes the block's own row."""
+
+        block_3, block_1, block_2 = self.textblocks
+
+        def positions():
+            return dict(models.TextBlock.objects.values_list('id', 'position'))
+
+        before = positions()
+        res = self.move(block_3, block_1)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        after = positions()
+        self.assertNotEqual(after[block_3.id], before[block_3.id])
+        for textblock in (block_1, block_2):
+            self.assertEqual(after[textblock.id], before[textblock.id])
+        self.assertEqual(
+            self.lesson_texts(),
+            ['Block 1', 'Block 3', 'Block 2']
+        )
+
+        res = self.move(block_3, None)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            self.lesson_texts(),
+            ['Block 3', 'Block 1', 'Block 2']
+        )
+
+    def test_move_after_other_parent_rejected(self):
+        """Test a block cannot be moved after another lesson's block."""
+
+        other_block = models.TextBlock.objects.create(
+            lesson=models.Lesson.objects.create(
+                topic=self.lesson.topic,
+                lesson_name='Other Lesson'
+            ),
+            text='Other Block',
+            text_format=1
+        )
+
+        res = self.move(self.textblocks[0], other_block)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_paragraph_number_change_reorders(self):
+        """Test changing a paragraph number moves the block."""
+
+        res = self.client.patch(
+            reverse('lesson:textblock-detail', args=[self.textblocks[1].id]),
+            {'paragraph_number': 4}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            self.lesson_texts(),
+            ['Block 2', 'Block 3', 'Block 1']
+        )
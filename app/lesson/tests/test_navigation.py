@@ -0,0 +1,136 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core import models
+
+
+NAVIGATION_URL = reverse('lesson:navigation')
+TEXTBLOCK_BULK_URL = reverse('lesson:textblock-bulk')
+
+
+class CounterTests(TestCase):
+    """Tests for the counts kept on modules and topics."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user(
+                email='test@example.com',
+                password='testpass123'
+            )
+        )
+
+        self.language = models.Language.objects.create(language_name='Python')
+        self.module = models.Module.objects.create(
+            language=self.language,
+            module_name='Basics'
+        )
+        self.topic = models.Topic.objects.create(
+            module=self.module,
+            topic_name='Loops'
+        )
+        self.lesson = models.Lesson.objects.create(
+            topic=self.topic,
+            lesson_name='While loops'
+        )
+        models.Exercise.objects.create(topic=self.topic, exercise_name='Count')
+        for i in range(3):
+            models.TextBlock.objects.create(
+                lesson=self.lesson,
+                text=f'Block {i}',
+                text_format=models.TextBlock.PARAGRAPH
+            )
+
+    def counts(self, topic):
+        topic.refresh_from_db()
+        return topic.lesson_count, topic.exercise_count, topic.textblock_count
+
+    def test_counts_follow_creates_and_deletes(self):
+        """Test counts change as rows are created and deleted."""
+
+        self.module.refresh_from_db()
+        self.assertEqual(self.module.topic_count, 1)
+        self.assertEqual(self.counts(self.topic), (1, 1, 3))
+
+        self.lesson.lesson_textblocks.first().delete()
+        self.assertEqual(self.counts(self.topic), (1, 1, 2))
+
+        self.lesson.delete()
+        self.assertEqual(self.counts(self.topic), (0, 1, 0))
+
+    def test_counts_follow_moves(self):
+        """Test moving a lesson moves its counts to the new topic."""
+
+        other = models.Topic.objects.create(
+            module=self.module,
+            topic_name='Functions'
+        )
+
+        self.lesson.topic = other
+        self.lesson.save()
+
+        self.assertEqual(self.counts(self.topic), (0, 1, 0))
+        self.assertEqual(self.counts(other), (1, 0, 3))
+
+    def test_stale_instance_keeps_counts(self):
+        """Test saving a topic read earlier keeps the stored counts."""
+
+        stale = models.Topic.objects.get(pk=self.topic.pk)
+        models.Lesson.objects.create(topic=self.topic, lesson_name='For')
+
+        stale.topic_name = 'Iteration'
+        stale.save()
+
+        self.assertEqual(stale.lesson_count, 2)
+        self.assertEqual(self.counts(self.topic), (2, 1, 3))
+
+    def test_bulk_textblocks_counted(self):
+        """Test bulk textblock changes adjust the topic's count."""
+
+        first = self.lesson.lesson_textblocks.first()
+        payload = {
+            'lesson': self.lesson.id,
+            'textblocks': [
+                {'id': first.id},
+                {'text': 'New A', 'text_format': 1},
+                {'text': 'New B', 'text_format': 1},
+                {'text': 'New C', 'text_format': 1},
+            ],
+        }
+
+        res = self.client.put(TEXTBLOCK_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.counts(self.topic), (1, 1, 4))
+
+    def test_navigation(self):
+        """Test navigation lists modules and topics with their counts."""
+
+        models.Module.objects.create(
+            language=models.Language.objects.create(language_name='Go'),
+            module_name='Other'
+        )
+
+        with self.assertNumQueries(2):
+            res = self.client.get(
+                NAVIGATION_URL,
+                {'language': self.language.id}
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], [{
+            'id': self.module.id,
+            'module_name': 'Basics',
+            'language': self.language.id,
+            'topic_count': 1,
+            'topics': [{
+                'id': self.topic.id,
+                'topic_name': 'Loops',
+                'lesson_count': 1,
+                'exercise_count': 1,
+                'textblock_count': 3,
+            }],
+        }])
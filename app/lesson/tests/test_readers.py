@@ -0,0 +1,170 @@
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core import models
+from lesson import views
+from lesson.client.S3Client import code_cache, read_breaker, reset_clients
+
+from moto import mock_s3
+
+import boto3
+
+
+RESOURCES = ['language', 'module', 'topic', 'lesson', 'exercise', 'textblock']
+
+SERIALIZED = override_settings(
+    CURRICULUM_FAST_READS_ENABLED=False,
+    CURRICULUM_DOCUMENTS_ENABLED=False
+)
+
+
+@mock_s3
+@override_settings(LESSON_RESPONSE_CACHE_ENABLED=False)
+class ReaderParityTests(TestCase):
+    """Tests the fast read path renders exactly what serializers do."""
+
+    def setUp(self):
+        code_cache.clear()
+        reset_clients()
+        read_breaker.reset()
+
+        s3 = boto3.client('s3')
+        s3.create_bucket(Bucket=settings.AWS_STORAGE_BUCKET_NAME)
+        s3.put_object(
+            Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+            Body='large starter code',
+            Key='starter-key.txt'
+        )
+
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user(
+                email='test@example.com',
+                password='testpass123'
+            )
+        )
+
+        language = models.Language.objects.create(language_name='Python')
+        module = models.Module.objects.create(
+            language=language,
+            module_name='Basics'
+        )
+        topic = models.Topic.objects.create(module=module, topic_name='Loops')
+        models.Topic.objects.create(module=module, topic_name='Empty Topic')
+
+        lesson = models.Lesson.objects.create(
+            topic=topic,
+            lesson_name='For Loops'
+        )
+        exercises = [
+            models.Exercise.objects.create(
+                topic=topic,
+                exercise_name='S3 Code',
+                starter_code='starter-key',
+                expected_output_inline='small output'
+            ),
+            models.Exercise.objects.create(
+                topic=topic,
+                exercise_name='Missing Code',
+                starter_code='missing-key'
+            ),
+            models.Exercise.objects.create(
+                topic=topic,
+                exercise_name='No Code'
+            ),
+        ]
+
+        for i, parent in enumerate([{'lesson': lesson}, *(
+            {'exercise': exercise} for exercise in exercises
+        )]):
+            models.TextBlock.objects.create(
+                text='Ünïcode "quoted" text',
+                text_format=models.TextBlock.PARAGRAPH,
+                paragraph_number=2,
+                **parent
+            )
+            models.TextBlock.objects.create(
+                text=None,
+                text_format=models.TextBlock.IMAGE,
+                paragraph_number=1 if i else None,
+                image='textblock/image.png',
+                **parent
+            )
+
+        self.objects = {
+            'language': language,
+            'module': module,
+            'topic': topic,
+            'lesson': lesson,
+            'exercise': exercises[0],
+            'textblock': models.TextBlock.objects.order_by('id').first(),
+        }
+
+    def urls(self):
+        for resource in RESOURCES:
+            yield reverse(f'lesson:{resource}-list')
+            yield reverse(
+                f'lesson:{resource}-detail',
+                args=[self.objects[resource].id]
+            )
+
+    def get(self, url, params):
+        code_cache.clear()
+        res = self.client.get(url, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK, url)
+        return res.content
+
+    def test_responses_byte_identical(self):
+        """Test every read endpoint returns the same bytes either way."""
+
+        for params in ({}, {'code_delivery': 'public'}):
+            for url in self.urls():
+                fast = self.get(url, params)
+                with SERIALIZED:
+                    serialized = self.get(url, params)
+
+                self.assertEqual(fast, serialized, f'{url} {params}')
+
+    def test_readers_match_serializers(self):
+        """Test each reader renders a queryset like its serializer."""
+
+        renderer = JSONRenderer()
+
+        for viewset in (
+            views.LanguageViewSet,
+            views.ModuleViewSet,
+            views.TopicViewSet,
+            views.LessonViewSet,
+            views.ExerciseViewSet,
+            views.TextBlockViewSet,
+        ):
+            reader_class = viewset.reader_class
+            queryset = viewset.queryset.all()
+
+            code_cache.clear()
+            expected = reader_class.serializer_class(
+                queryset, many=True, context={}
+            ).data
+            code_cache.clear()
+            rendered = reader_class({}).read(queryset)
+
+            self.assertEqual(
+                renderer.render(rendered),
+                renderer.render(expected),
+                reader_class.__name__
+            )
+
+    def test_missing_object_not_found(self):
+        """Test a missing or malformed id returns 404."""
+
+        for url in (
+            reverse('lesson:lesson-detail', args=[0]),
+            reverse('lesson:lesson-detail', args=['abc']),
+        ):
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
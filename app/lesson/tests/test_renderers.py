@@ -0,0 +1,115 @@
+import datetime
+import decimal
+import json
+import uuid
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from app.renderers import ORJSONRenderer
+from core import models
+
+import msgpack
+
+
+MODULE_LIST_URL = reverse('lesson:module-list')
+LANGUAGE_LIST_URL = reverse('lesson:language-list')
+
+
+class ORJSONRendererTests(TestCase):
+    """Tests the orjson renderer matches DRF's JSON renderer."""
+
+    def test_same_bytes(self):
+        """Test awkward values are encoded exactly as DRF does."""
+
+        data = {
+            'text': 'Ünïcode "quoted" line\u2028and\u2029breaks',
+            'lazy': gettext_lazy('Lazy text'),
+            'datetime': datetime.datetime(
+                2026, 10, 18, 12, 30, 15, 500, tzinfo=datetime.timezone.utc
+            ),
+            'date': datetime.date(2026, 10, 18),
+            'decimal': decimal.Decimal('1.5'),
+            'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+            'tuple': (1, None, True),
+            1: 'integer key',
+            'nested': [{'a': [], 'b': {}}],
+        }
+
+        self.assertEqual(
+            ORJSONRenderer().render(data),
+            JSONRenderer().render(data)
+        )
+
+    def test_indent_falls_back(self):
+        """Test indented output is left to DRF's renderer."""
+
+        data = {'a': [1, 2]}
+
+        self.assertEqual(
+            ORJSONRenderer().render(
+                data, 'application/json; indent=4'
+            ),
+            JSONRenderer().render(data, 'application/json; indent=4')
+        )
+
+
+class RendererEndpointTests(TestCase):
+    """Tests JSON and MessagePack requests and responses."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user(
+                email='test@example.com',
+                password='testpass123'
+            )
+        )
+
+        language = models.Language.objects.create(language_name='Python')
+        models.Module.objects.create(language=language, module_name='Basics')
+
+    def test_msgpack_response(self):
+        """Test MessagePack is returned when a client asks for it."""
+
+        res = self.client.get(
+            MODULE_LIST_URL,
+            HTTP_ACCEPT='application/msgpack'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/msgpack')
+        self.assertEqual(
+            msgpack.unpackb(res.content),
+            json.loads(self.client.get(MODULE_LIST_URL).content)
+        )
+
+    def test_msgpack_request(self):
+        """Test MessagePack request bodies are parsed."""
+
+        res = self.client.post(
+            LANGUAGE_LIST_URL,
+            msgpack.packb({'language_name': 'Go'}),
+            content_type='application/msgpack'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(
+            models.Language.objects.filter(language_name='Go').exists()
+        )
+
+    def test_invalid_json_rejected(self):
+        """Test a malformed JSON body is a bad request."""
+
+        res = self.client.post(
+            LANGUAGE_LIST_URL,
+            '{"language_name": ',
+            content_type='application/json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,351 @@
+"""Tests for the S3 client used to store exercise code"""
+
+from django.test import SimpleTestCase, override_settings
+from django.conf import settings
+
+from moto import mock_s3
+
+from lesson.client import S3Client as s3_client
+from lesson.client.breaker import CircuitBreaker
+from lesson.client.cache import CodeCache
+from lesson.client.disk_cache import DiskCodeCache
+
+from unittest.mock import patch
+
+import boto3
+import gzip
+import os
+import tempfile
+
+
+@mock_s3
+class S3ClientTests(SimpleTestCase):
+    """Tests for reading and writing code objects."""
+
+    def setUp(self):
+        s3_client.reset_clients()
+        s3_client.code_cache.clear()
+        s3_client.read_breaker.reset()
+        boto3.client('s3').create_bucket(
+            Bucket=settings.AWS_STORAGE_BUCKET_NAME
+        )
+
+    def tearDown(self):
+        s3_client.reset_clients()
+
+    def test_boto_client_is_shared(self):
+        """Test the boto3 client is built once and reused."""
+
+        client = s3_client.get_default_client()
+        other = s3_client.get_default_client()
+
+        self.assertIs(client, other)
+        self.assertIs(client.client, other.client)
+
+    def test_write_and_read_object(self):
+        """Test code written to S3 can be read back."""
+
+        client = s3_client.get_default_client()
+        file_id = client.write_object('print("hello")')
+
+        self.assertEqual(
+            client.read_object(f'{file_id}.txt'),
+            'print("hello")'
+        )
+
+    def test_read_objects_batch(self):
+        """Test several objects are read back in one batch."""
+
+        client = s3_client.get_default_client()
+        keys = [
+            f'{client.write_object(f"code {i}")}.txt' for i in range(5)
+        ]
+
+        res = client.read_objects(keys)
+
+        self.assertEqual(
+            res,
+            {key: f'code {i}' for i, key in enumerate(keys)}
+        )
+
+    def test_read_object_cached(self):
+        """Test repeated reads are served from the code cache."""
+
+        client = s3_client.get_default_client()
+        key = f'{client.write_object("cached code")}.txt'
+        # Writes fill the cache too, so start from an empty one
+        s3_client.code_cache.clear()
+
+        with patch.object(
+            client.client, 'get_object', wraps=client.client.get_object
+        ) as patched_get_object:
+            client.read_object(key)
+            client.read_object(key)
+            client.read_objects([key])
+
+        patched_get_object.assert_called_once()
+        stats = s3_client.code_cache.stats()
+        self.assertEqual(stats['hits'], 2)
+        self.assertEqual(stats['misses'], 1)
+
+    def test_write_object_content_addressed(self):
+        """Test identical code is stored once under its content hash."""
+
+        client = s3_client.get_default_client()
+
+        with patch.object(
+            client.client, 'put_object', wraps=client.client.put_object
+        ) as patched_put_object:
+            file_id = client.write_object('boilerplate')
+            s3_client.code_cache.clear()
+            other_id = client.write_object('boilerplate')
+
+        self.assertEqual(file_id, other_id)
+        self.assertEqual(file_id, s3_client.content_hash('boilerplate'))
+        patched_put_object.assert_called_once()
+
+    @override_settings(AWS_S3_CODE_COMPRESSION_MIN_BYTES=100)
+    def test_large_code_stored_compressed(self):
+        """Test large code is gzipped in S3 and read back transparently."""
+
+        client = s3_client.get_default_client()
+        code = 'print("hello")\n' * 100
+        key = f'{client.write_object(code)}.txt'
+
+        obj = client.client.get_object(
+            Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+            Key=key
+        )
+        self.assertEqual(obj['ContentEncoding'], 'gzip')
+        self.assertEqual(gzip.decompress(obj['Body'].read()).decode(), code)
+
+        s3_client.code_cache.clear()
+        self.assertEqual(client.read_object(key), code)
+
+    def test_rewrite_refreshes_object(self):
+        """Test writing stored code again renews the object in S3."""
+
+        client = s3_client.get_default_client()
+        code = 'print("hello")\n' * 100
+        key = f'{client.write_object(code)}.txt'
+
+        with patch.object(
+            client.client, 'put_object'
+        ) as patched_put_object, patch.object(
+            client.client, 'copy_object'
+        ) as patched_copy_object:
+            self.assertEqual(client.store_object(code), (key[:-4], False))
+
+        patched_put_object.assert_not_called()
+        patched_copy_object.assert_called_once_with(
+            Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+            Key=key,
+            CopySource={
+                'Bucket': settings.AWS_STORAGE_BUCKET_NAME,
+                'Key': key,
+            },
+            MetadataDirective='REPLACE',
+            ContentType='text/plain; charset=utf-8',
+            ContentEncoding='gzip'
+        )
+
+    def test_rewrite_restores_swept_object(self):
+        """Test cached code is uploaded again if S3 no longer has it."""
+
+        client = s3_client.get_default_client()
+        key = f'{client.write_object("swept code")}.txt'
+        client.client.delete_object(
+            Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+            Key=key
+        )
+        self.assertIn(key, s3_client.code_cache)
+
+        self.assertEqual(
+            client.store_object('swept code'),
+            (key[:-4], True)
+        )
+        s3_client.code_cache.clear()
+        self.assertEqual(client.read_object(key), 'swept code')
+
+    def test_uncompressed_object_readable(self):
+        """Test objects stored without compression are still readable."""
+
+        boto3.client('s3').put_object(
+            Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+            Body='legacy code',
+            Key='legacy.txt'
+        )
+
+        client = s3_client.get_default_client()
+        self.assertEqual(client.read_object('legacy.txt'), 'legacy code')
+
+    def test_read_object_from_disk_cache(self):
+        """Test a cold worker reads code from the shared disk cache."""
+
+        client = s3_client.get_default_client()
+
+        with tempfile.TemporaryDirectory() as directory, patch.object(
+            s3_client, 'disk_cache', DiskCodeCache(directory, 1024)
+        ):
+            key = f'{client.write_object("shared code")}.txt'
+            s3_client.code_cache.clear()
+
+            with patch.object(
+                client.client, 'get_object'
+            ) as patched_get_object:
+                self.assertEqual(client.read_object(key), 'shared code')
+
+            patched_get_object.assert_not_called()
+            self.assertIn(key, s3_client.code_cache)
+
+    def test_read_objects_marks_failed_reads(self):
+        """Test keys that cannot be read map to None in a batch."""
+
+        client = s3_client.get_default_client()
+        key = f'{client.write_object("present")}.txt'
+        s3_client.code_cache.clear()
+
+        res = client.read_objects([key, 'missing.txt'])
+
+        self.assertEqual(res, {key: 'present', 'missing.txt': None})
+
+    def test_open_breaker_fails_fast(self):
+        """Test reads are not attempted while the breaker is open."""
+
+        client = s3_client.get_default_client()
+        s3_client.read_breaker._open()
+
+        with patch.object(
+            client.client, 'get_object'
+        ) as patched_get_object:
+            with self.assertRaises(s3_client.S3ReadError):
+                client.read_object('code.txt')
+
+        patched_get_object.assert_not_called()
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    """Tests for the S3 read circuit breaker."""
+
+    def setUp(self):
+        self.breaker = CircuitBreaker(
+            failure_rate=0.5,
+            window=4,
+            min_calls=4,
+            reset_timeout=30
+        )
+
+    def test_opens_at_failure_rate(self):
+        """Test the circuit opens once enough calls have failed."""
+
+        self.breaker.record_success()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.assertTrue(self.breaker.allow())
+
+        self.breaker.record_failure()
+
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(self.breaker.allow())
+        self.assertEqual(self.breaker.stats()['rejected'], 1)
+
+    @patch('lesson.client.breaker.time.monotonic')
+    def test_half_open_trial(self, patched_monotonic):
+        """Test a single trial call closes the circuit on success."""
+
+        patched_monotonic.return_value = 0
+        self.breaker._open()
+
+        patched_monotonic.return_value = 31
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.allow())
+
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(self.breaker.allow())
+
+
+class CodeCacheTests(SimpleTestCase):
+    """Tests for the in-memory code cache."""
+
+    def test_evicts_least_recently_used(self):
+        """Test entries are evicted once the byte limit is exceeded."""
+
+        cache = CodeCache(max_bytes=10)
+        cache.set('a', 'aaaa')
+        cache.set('b', 'bbbb')
+        cache.get('a')
+        cache.set('c', 'cccc')
+
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertIn('c', cache)
+        self.assertEqual(cache.stats()['bytes'], 8)
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_oversized_value_not_cached(self):
+        """Test values larger than the cache are skipped."""
+
+        cache = CodeCache(max_bytes=4)
+        cache.set('a', 'too large')
+
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats()['bytes'], 0)
+
+
+class DiskCodeCacheTests(SimpleTestCase):
+    """Tests for the shared on-disk code cache."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_set_and_get(self):
+        """Test entries are written to disk and read back."""
+
+        cache = DiskCodeCache(self.directory.name, 1024)
+        cache.set('a.txt', 'code')
+        cache.set('empty.txt', '')
+
+        other_worker = DiskCodeCache(self.directory.name, 1024)
+        self.assertEqual(other_worker.get('a.txt'), 'code')
+        self.assertEqual(other_worker.get('empty.txt'), '')
+        self.assertIsNone(other_worker.get('missing.txt'))
+
+    def test_evicts_oldest_entries(self):
+        """Test the oldest entries are removed past the size limit."""
+
+        cache = DiskCodeCache(self.directory.name, 100)
+
+        for i in range(5):
+            cache.set(f'{i}.txt', str(i) * 30)
+            path = cache._path(f'{i}.txt')
+            os.utime(path, (i, i))
+
+        cache.evict()
+
+        self.assertIsNone(cache.get('0.txt'))
+        self.assertIsNone(cache.get('1.txt'))
+        self.assertEqual(cache.get('4.txt'), '4' * 30)
+
+    def test_evicts_stale_temporary_files(self):
+        """Test temporary files left by a dead writer are removed."""
+
+        cache = DiskCodeCache(self.directory.name, 100)
+        cache.set('a.txt', 'code')
+
+        shard = os.path.dirname(cache._path('a.txt'))
+        stale = os.path.join(shard, 'dead.tmp')
+        fresh = os.path.join(shard, 'writing.tmp')
+        for path in (stale, fresh):
+            with open(path, 'w') as f:
+                f.write('x' * 10)
+        os.utime(stale, (0, 0))
+
+        cache.evict()
+
+        self.assertFalse(os.path.exists(stale))
+        self.assertTrue(os.path.exists(fresh))
+        self.assertEqual(cache.get('a.txt'), 'code')
@@ -0,0 +1,141 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core import models
+
+
+SEARCH_URL = reverse('lesson:search')
+
+# Most pages a test follows before deciding next links loop
+MAX_PAGES = 20
+
+
+class SearchTests(TestCase):
+    """Tests for searching lessons and exercises."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user(
+                email='test@example.com',
+                password='testpass123'
+            )
+        )
+
+        module = models.Module.objects.create(
+            language=models.Language.objects.create(language_name='Python'),
+            module_name='Basics'
+        )
+        self.topic = models.Topic.objects.create(
+            module=module,
+            topic_name='Control flow'
+        )
+        self.lesson = models.Lesson.objects.create(
+            topic=self.topic,
+            lesson_name='Loops'
+        )
+        self.exercise = models.Exercise.objects.create(
+            topic=self.topic,
+            exercise_name='Counting'
+        )
+        self.textblock = models.TextBlock.objects.create(
+            lesson=self.lesson,
+            text='A while loop repeats until its condition is false.',
+            text_format=models.TextBlock.PARAGRAPH
+        )
+        models.TextBlock.objects.create(
+            exercise=self.exercise,
+            text='Print the numbers from one to ten with a loop.',
+            text_format=models.TextBlock.PARAGRAPH
+        )
+
+    def search(self, q, **params):
+        return self.client.get(SEARCH_URL, {'q': q, **params})
+
+    def walk(self, q, page_size):
+        """Return the (type, id) of the hits on every page, in order."""
+
+        seen = []
+        res = self.search(q, page_size=page_size)
+
+        for _ in range(MAX_PAGES):
+            self.assertLessEqual(len(res.data['results']), page_size)
+            seen += [(hit['type'], hit['id']) for hit in res.data['results']]
+            if res.data['next'] is None:
+                return seen
+            res = self.client.get(res.data['next'])
+
+        self.fail(f'Search for {q!r} did not finish in {MAX_PAGES} pages')
+
+    def test_ranked_hits_with_snippets(self):
+        """Test a name match ranks above a text match."""
+
+        res = self.search('loops')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(hit['type'], hit['id']) for hit in res.data['results']],
+            [('lesson', self.lesson.id), ('exercise', self.exercise.id)]
+        )
+        self.assertIn('<mark>loop</mark>', res.data['results'][0]['snippet'])
+        self.assertEqual(res.data['results'][0]['topic'], self.topic.id)
+        self.assertIsNone(res.data['next'])
+
+    def test_vectors_follow_changes(self):
+        """Test textblock and topic changes are searchable at once."""
+
+        self.textblock.text = 'Iteration over a range of numbers.'
+        self.textblock.save()
+        self.topic.topic_name = 'Repetition'
+        self.topic.save()
+
+        res = self.search('iteration')
+        self.assertEqual(
+            [hit['id'] for hit in res.data['results']],
+            [self.lesson.id]
+        )
+
+        res = self.search('repetition')
+        self.assertEqual(len(res.data['results']), 2)
+
+    def test_pages_cover_all_hits(self):
+        """Test following next links returns every hit once."""
+
+        for i in range(4):
+            models.Lesson.objects.create(
+                topic=self.topic,
+                lesson_name=f'Loop {i}'
+            )
+
+        expected = [
+            (hit['type'], hit['id'])
+            for hit in self.search('loop').data['results']
+        ]
+
+        self.assertEqual(len(expected), 6)
+        self.assertEqual(self.walk('loop', 2), expected)
+
+    def test_pages_cover_tied_hits(self):
+        """Test hits with the same rank are paged without repeats."""
+
+        lessons = [
+            models.Lesson.objects.create(topic=self.topic, lesson_name='Tie')
+            for _ in range(7)
+        ]
+
+        self.assertEqual(
+            self.walk('tie', 3),
+            [('lesson', lesson.id) for lesson in lessons]
+        )
+
+    def test_query_required(self):
+        """Test a missing query or invalid cursor is rejected."""
+
+        res = self.client.get(SEARCH_URL)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.search('loop', cursor='not-a-cursor')
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -1,5 +1,5 @@
 from django.urls import path, include
-from lesson import views
+from lesson import views, async_views
 from rest_framework.routers import DefaultRouter
 
 app_name = 'lesson'
@@ -13,5 +13,42 @@ router.register('lessons', views.LessonViewSet)
 router.register('exercises', views.ExerciseViewSet)
 
 urlpatterns = [
-    path('', include(router.urls))
-]
\ No newline at end of file
+    path('', include(router.urls)),
+    path('metrics/', views.MetricsView.as_view(), name='metrics'),
+    path(
+        'navigation/',
+        views.NavigationView.as_view(),
+        name='navigation'
+    ),
+    path('search/', views.SearchView.as_view(), name='search'),
+    path(
+        'async/modules/',
+        async_views.ModuleView.as_view(),
+        name='async-module-list'
+    ),
+    path(
+        'async/modules/<int:pk>/',
+        async_views.ModuleView.as_view(),
+        name='async-module-detail'
+    ),
+    path(
+        'async/topics/',
+        async_views.TopicView.as_view(),
+        name='async-topic-list'
+    ),
+    path(
+        'async/topics/<int:pk>/',
+        async_views.TopicView.as_view(),
+        name='async-topic-detail'
+    ),
+    path(
+        'async/exercises/',
+        async_views.ExerciseView.as_view(),
+        name='async-exercise-list'
+    ),
+    path(
+        'async/exercises/<int:pk>/',
+        async_views.ExerciseView.as_view(),
+        name='async-exercise-detail'
+    ),
+]
@@ -1,62 +1,604 @@
 from rest_framework import viewsets, status
+from rest_framework.decorators import action
 from rest_framework.authentication import TokenAuthentication
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import (
+    IsAuthenticated,
+    IsAdminUser,
+    SAFE_METHODS
+)
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from app import compression
+from app.renderers import MessagePackRenderer, ORJSONRenderer
 from core.models import Module, Topic, Language, TextBlock, Lesson, Exercise
-from lesson import serializers
+from lesson import (
+    bulk,
+    serializers,
+    prefetch,
+    documents,
+    readers,
+    response_cache,
+    search,
+    signals
+)
+from lesson.client import S3Client as s3_client
+from lesson.fields import FieldSpec, FIELD_SPEC_CONTEXT_KEY
+from lesson.pagination import CurriculumCursorPagination, SearchPagination
 
-from lesson.client.S3Client import S3Client
 from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.http import Http404, HttpResponse
+from django.utils.http import parse_etags
 
-class ModuleViewSet(viewsets.ModelViewSet):
+import functools
+import hashlib
+
+
+def has_unavailable_code(data):
+    """Return True if any exercise in a response lacks its code."""
+
+    if isinstance(data, dict):
+        if data.get('code_unavailable'):
+            return True
+        values = data.values()
+    elif isinstance(data, list):
+        values = data
+    else:
+        return False
+
+    return any(
+        has_unavailable_code(value) for value in values
+        if isinstance(value, (dict, list))
+    )
+
+
+# Renderers whose output is the same for every user, so its compressed
+# bytes can be shared through the response cache; the browsable API
+# shows who is signed in
+SHARED_RENDERERS = (ORJSONRenderer, MessagePackRenderer)
+
+
+def curriculum_etag(request, model, revisions):
+    """
+    Return the strong ETag of a curriculum response from the revisions
+    of the rows in it.
+    """
+    parts = [
+        model._meta.label,
+        request.get_full_path(),
+        request.META.get('HTTP_ACCEPT', ''),
+        settings.EXERCISE_CODE_DELIVERY,
+        revisions,
+    ]
+    digest = hashlib.sha256(repr(parts).encode('utf-8')).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(request, etag):
+    """Return True if a request's If-None-Match matches an ETag."""
+
+    # Compressed responses carry the weak form of the same ETag
+    if_none_match = {
+        tag[2:] if tag.startswith('W/') else tag
+        for tag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+    }
+    return etag in if_none_match or '*' in if_none_match
+
+class ConditionalGetMixin:
+    """
+    Emit strong ETags on list and retrieve, answer a matching
+    If-None-Match with 304 before anything is rendered, and serve
+    responses with a known ETag from the shared response cache,
+    already compressed where the client accepts it.
+
+    The ETag covers the revisions of the rows in the response, which
+    change whenever a row or anything below it changes, together with
+    the request path, query and Accept header. Presigned code URLs
+    expire and degraded responses should not be cached, so neither
+    gets an ETag.
+    """
+
+    def etag_enabled(self):
+        context = self.get_serializer_context()
+        return serializers.get_code_delivery(context) != \
+            serializers.CODE_DELIVERY_PRESIGNED
+
+    def make_etag(self, revisions):
+        return curriculum_etag(self.request, self.queryset.model, revisions)
+
+    def list_etag(self):
+        rows = self.filter_queryset(self.get_queryset()) \
+            .prefetch_related(None).values('id', 'revision')
+
+        # Page the revisions the same way the response will be paged
+        paginator = self.pagination_class() \
+            if self.pagination_class else None
+        page = paginator.paginate_queryset(rows, self.request, view=self) \
+            if paginator else None
+
+        if page is None:
+            return self.make_etag([
+                (row['id'], row['revision']) for row in rows
+            ])
+
+        return self.make_etag([
+            [(row['id'], row['revision']) for row in page],
+            getattr(paginator, 'has_next', None),
+            getattr(paginator, 'has_previous', None),
+        ])
+
+    def detail_etag(self):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+
+        try:
+            revision = self.get_queryset().prefetch_related(None).filter(**{
+                self.lookup_field: self.kwargs[lookup_url_kwarg]
+            }).values_list('revision', flat=True).first()
+        except (TypeError, ValueError, ValidationError):
+            return None
+
+        if revision is None:
+            return None
+        return self.make_etag(revision)
+
+    def conditional(self, request, etag, render):
+        if etag is None:
+            return render()
+
+        if etag_matches(request, etag):
+            return Response(
+                status=status.HTTP_304_NOT_MODIFIED,
+                headers={'ETag': etag}
+            )
+
+        def cacheable(response):
+            return response.status_code == 200 and \
+                not has_unavailable_code(response.data)
+
+        if not response_cache.enabled():
+            response = render()
+            if cacheable(response):
+                response['ETag'] = etag
+            return response
+
+        shared = isinstance(
+            getattr(request, 'accepted_renderer', None), SHARED_RENDERERS
+        )
+        accepted_encoding = compression.negotiate(request) if shared else None
+        if accepted_encoding is not None:
+            cached = response_cache.get_compressed(etag, accepted_encoding)
+            if cached is not None:
+                content_type, vary, content = cached
+                response = HttpResponse(content_type=content_type)
+                if vary:
+                    response['Vary'] = vary
+                response['ETag'] = etag
+                compression.set_encoded(response, content, accepted_encoding)
+                return response
+
+        data = response_cache.get(etag)
+        if data is not None:
+            response = Response(data)
+        else:
+            response = response_cache.rebuild(etag, render, cacheable)
+            if not cacheable(response):
+                return response
+
+        response['ETag'] = etag
+        if shared:
+            # Keep the bytes CompressionMiddleware produces for later hits
+            response.compressed_cache = \
+                lambda encoding, content: response_cache.store_compressed(
+                    etag, encoding, response['Content-Type'],
+                    response.get('Vary'), content
+                )
+        return response
+
+    def list(self, request, *args, **kwargs):
+        etag = self.list_etag() if self.etag_enabled() else None
+        return self.conditional(
+            request,
+            etag,
+            lambda: super(ConditionalGetMixin, self).list(
+                request, *args, **kwargs
+            )
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        etag = self.detail_etag() if self.etag_enabled() else None
+        return self.conditional(
+            request,
+            etag,
+            lambda: super(ConditionalGetMixin, self).retrieve(
+                request, *args, **kwargs
+            )
+        )
+
+
+class FieldSpecMixin:
+    """
+    Read ``?fields=`` and ``?expand=`` on GET requests into the
+    serializer context, and only prefetch the relations they render.
+    """
+
+    prefetch_lookups = None
+
+    def get_field_spec(self):
+        request = getattr(self, 'request', None)
+        if request is None or request.method not in SAFE_METHODS:
+            return None
+        return FieldSpec.from_request(request)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context[FIELD_SPEC_CONTEXT_KEY] = self.get_field_spec()
+        return context
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+
+        spec = self.get_field_spec()
+        if spec is None or self.prefetch_lookups is None:
+            return queryset
+
+        return queryset.prefetch_related(None).prefetch_related(*(
+            lookup for lookup in self.prefetch_lookups()
+            if spec.allows(lookup.prefetch_through.split('__'))
+        ))
+
+
+class FastReadMixin:
+    """
+    Render list and retrieve with a RowReader rather than the
+    serializer, which is still used for writes.
+    """
+
+    reader_class = None
+
+    def use_reader(self):
+        return settings.CURRICULUM_FAST_READS_ENABLED
+
+    def get_reader(self):
+        return self.reader_class(
+            self.get_serializer_context(),
+            self.get_field_spec()
+        )
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_reader():
+            return super().list(request, *args, **kwargs)
+
+        reader = self.get_reader()
+        rows = reader.rows(self.filter_queryset(self.get_queryset()))
+
+        # The paginator accepts rows as dicts, so a page is rendered
+        # without loading model instances
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(reader.render(page))
+
+        return Response(reader.render(list(rows)))
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.use_reader():
+            return super().retrieve(request, *args, **kwargs)
+
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset())
+
+        try:
+            queryset = queryset.filter(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            )
+            data = self.get_reader().read(queryset)
+        except (TypeError, ValueError, ValidationError):
+            raise Http404
+
+        if not data:
+            raise Http404
+        return Response(data[0])
+
+
+class CurriculumDocumentMixin:
+    """
+    Serve list and retrieve from materialized curriculum documents when
+    the response uses the default representation.
+    """
+
+    document_list = None
+    document_detail = None
+
+    def use_documents(self):
+        # Documents only hold the full tree
+        return self.get_field_spec() is None and \
+            documents.documents_enabled(self.get_serializer_context())
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_documents():
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        ids = queryset.prefetch_related(None).values('id')
+
+        page = self.paginate_queryset(ids)
+        if page is not None:
+            return self.get_paginated_response(
+                self.document_list([row['id'] for row in page])
+            )
+
+        return Response(self.document_list([row['id'] for row in ids]))
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.use_documents():
+            return super().retrieve(request, *args, **kwargs)
+
+        try:
+            pk = int(self.kwargs[self.lookup_field])
+        except ValueError:
+            raise Http404
+
+        data = self.document_detail(pk)
+        if data is None:
+            raise Http404
+        return Response(data)
+
+
+class AtomicWriteMixin:
+    """
+    Run each write in one transaction with the signal handlers it
+    triggers, so the revisions, counts and search vectors they maintain
+    never disagree with the rows that were written.
+    """
+
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            super().perform_create(serializer)
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            super().perform_update(serializer)
+
+    def perform_destroy(self, instance):
+        # Handles the whole cascade at once, in its own transaction
+        signals.delete_curriculum(instance)
+
+
+class ModuleViewSet(ConditionalGetMixin, CurriculumDocumentMixin,
+                    FastReadMixin, FieldSpecMixin, AtomicWriteMixin,
+                    viewsets.ModelViewSet):
     serializer_class = serializers.ModuleSerializer
-    queryset = Module.objects.all()
+    queryset = Module.objects.order_by('id').prefetch_related(
+        *prefetch.module_lookups()
+    )
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
+    prefetch_lookups = staticmethod(prefetch.module_lookups)
+    reader_class = readers.ModuleReader
+    document_list = staticmethod(documents.module_list)
+    document_detail = staticmethod(documents.module_detail)
 
 
-class TopicViewSet(viewsets.ModelViewSet):
+class TopicViewSet(ConditionalGetMixin, CurriculumDocumentMixin,
+                   FastReadMixin, FieldSpecMixin, AtomicWriteMixin,
+                   viewsets.ModelViewSet):
     serializer_class = serializers.TopicSerializer
-    queryset = Topic.objects.all()
+    queryset = Topic.objects.order_by('id').prefetch_related(
+        *prefetch.topic_lookups()
+    )
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
+    prefetch_lookups = staticmethod(prefetch.topic_lookups)
+    reader_class = readers.TopicReader
+    document_list = staticmethod(documents.topic_list)
+    document_detail = staticmethod(documents.topic_detail)
 
-    def list(self, request):
-        queryset = self.get_queryset()        
-        serializer = serializers.TopicSerializer(queryset, many=True)
-        print(serializer.data)
-        return Response(serializer.data)
 
-
-class LanguageViewSet(viewsets.ModelViewSet):
+class LanguageViewSet(ConditionalGetMixin, FastReadMixin, FieldSpecMixin,
+                      AtomicWriteMixin, viewsets.ModelViewSet):
     serializer_class = serializers.LanguageSerializer
-    queryset = Language.objects.all()
+    queryset = Language.objects.order_by('id')
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
+    reader_class = readers.LanguageReader
 
 
-class LessonViewSet(viewsets.ModelViewSet):
+class LessonViewSet(ConditionalGetMixin, FastReadMixin, FieldSpecMixin,
+                    AtomicWriteMixin, viewsets.ModelViewSet):
     """View for Lesson API"""
 
     serializer_class = serializers.LessonSerializer
-    queryset = Lesson.objects.all()
+    queryset = Lesson.objects.order_by('id') \
+        .defer('search_vector') \
+        .prefetch_related(*prefetch.lesson_lookups())
     authentication_classes= [TokenAuthentication]
     permission_classes = [IsAuthenticated]
+    prefetch_lookups = staticmethod(prefetch.lesson_lookups)
+    reader_class = readers.LessonReader
 
 
-class TextBlockViewSet(viewsets.ModelViewSet):
+class TextBlockViewSet(ConditionalGetMixin, FastReadMixin, FieldSpecMixin,
+                       AtomicWriteMixin, viewsets.ModelViewSet):
     serializer_class = serializers.TextBlockSerializer
-    queryset = TextBlock.objects.all()
+    queryset = TextBlock.objects.order_by(*prefetch.TEXTBLOCK_ORDERING)
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
+    reader_class = readers.TextBlockReader
+
+    @action(
+        detail=True,
+        methods=['post'],
+        serializer_class=serializers.TextBlockMoveSerializer
+    )
+    def move(self, request, pk=None):
+        """
+        Move a textblock after another block of its lesson or exercise,
+        or first if ``after`` is null. Only the moved row is updated,
+        unless its siblings have to be renumbered to make room.
+        """
+        textblock = self.get_object()
+
+        with transaction.atomic():
+            # Bumping the tree locks its rows from the top down, like
+            # every other write, before the blocks are locked
+            signals.bump_revisions([signals.curriculum_path(textblock)])
+            list(
+                textblock.siblings().select_for_update()
+                .order_by('id').values_list('id', flat=True)
+            )
+            # Positions read before the lock may be stale
+            textblock.refresh_from_db()
+
+            serializer = self.get_serializer(
+                data=request.data,
+                context={
+                    **self.get_serializer_context(),
+                    'textblock': textblock
+                }
+            )
+            serializer.is_valid(raise_exception=True)
+
+            textblock.place_after(serializer.validated_data['after'])
+            textblock.save(update_fields=['position'])
+
+        return Response(serializers.TextBlockSerializer(
+            textblock,
+            context=self.get_serializer_context()
+        ).data)
+
+    @action(
+        detail=False,
+        methods=['put'],
+        serializer_class=serializers.TextBlockBulkSerializer
+    )
+    def bulk(self, request):
+        """
+        Replace every textblock of a lesson or exercise in one request.
+
+        Blocks with an id are updated, blocks without one are created,
+        and unlisted blocks are deleted. Blocks are numbered in the
+        order they are listed.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        data = serializer.validated_data
+        parent_field = data['parent_field']
+        textblocks = bulk.replace_textblocks(
+            parent_field,
+            data[parent_field],
+            data['textblocks']
+        )
 
+        return Response(serializers.TextBlockSerializer(
+            textblocks,
+            many=True,
+            context=self.get_serializer_context()
+        ).data)
 
-class ExerciseViewSet(viewsets.ModelViewSet):
+
+class ExerciseViewSet(ConditionalGetMixin, FastReadMixin, FieldSpecMixin,
+                      AtomicWriteMixin, viewsets.ModelViewSet):
     """View for Exercise API"""
 
     serializer_class = serializers.ExerciseSerializer
-    queryset = Exercise.objects.all()
+    queryset = Exercise.objects.order_by('id') \
+        .defer('search_vector') \
+        .prefetch_related(*prefetch.exercise_lookups())
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    prefetch_lookups = staticmethod(prefetch.exercise_lookups)
+    reader_class = readers.ExerciseReader
+
+
+class MetricsView(APIView):
+    """
+    Report S3 code cache, circuit breaker and response cache metrics.
+
+    Figures are for the worker process that serves the request.
+    """
+
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        disk_cache = s3_client.disk_cache
+
+        return Response({
+            'code_cache': s3_client.code_cache.stats(),
+            'disk_cache': disk_cache.stats() if disk_cache else None,
+            's3_read_breaker': s3_client.read_breaker.stats(),
+            'response_cache': response_cache.response_stats.stats(),
+        })
+
+
+class NavigationView(APIView):
+    """
+    List modules with their topics and the number of rows under each,
+    for navigation menus, without loading the curriculum below topics.
+
+    Filter by language with ``?language=<id>``. Modules are paged like
+    the other curriculum lists; each page takes two queries.
+    """
+
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
 
+    def get(self, request):
+        modules = Module.objects.order_by('id').values(
+            'id', 'module_name', 'language', 'topic_count'
+        )
+
+        language = request.query_params.get('language')
+        if language is not None:
+            try:
+                modules = modules.filter(language=int(language))
+            except ValueError:
+                return Response(
+                    {'language': ['A valid integer is required.']},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        paginator = CurriculumCursorPagination()
+        page = paginator.paginate_queryset(modules, request, view=self)
+
+        topics = {row['id']: [] for row in page}
+        rows = Topic.objects.filter(module__in=topics).order_by('id').values(
+            'id', 'module', 'topic_name',
+            'lesson_count', 'exercise_count', 'textblock_count'
+        )
+        for topic in rows:
+            topics[topic.pop('module')].append(topic)
+
+        return paginator.get_paginated_response([
+            {**row, 'topics': topics[row['id']]} for row in page
+        ])
+
+
+class SearchView(APIView):
+    """
+    Search lesson and exercise names, topic names and textblock text.
+
+    ``q`` takes web-style syntax: quoted phrases, ``or`` and ``-word``.
+    Hits are ranked best first, each with a snippet of the matching
+    text, and paged by cursor.
+    """
+
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            return Response(
+                {'q': ['This query parameter is required.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        paginator = SearchPagination()
+        hits = paginator.paginate_search(
+            functools.partial(search.search, text),
+            request
+        )
+        return paginator.get_paginated_response(hits)
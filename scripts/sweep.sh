@@ -0,0 +1,10 @@
+#!/bin/sh
+
+set -e
+
+python manage.py wait_for_db
+
+while true; do
+    python manage.py sweep_code_objects
+    sleep "${CODE_SWEEP_INTERVAL_SECONDS:-86400}"
+done